@@ -1,9 +1,17 @@
+import os
+
 from flask import Flask, request, jsonify, render_template, flash
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from flask_migrate import Migrate
+
+from app.database import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
+migrate = Migrate()
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
 
 
 def create_app(test_config=None):
@@ -16,7 +24,18 @@ def create_app(test_config=None):
         app.config.update(test_config)
 
         # initialize extensions
+    from app import database
+    database.configure(app)
     db.init_app(app)
+    database.install(app, db)
+    # schema changes are versioned migrations: `flask --app run db upgrade`
+    migrate.init_app(app, db, directory=MIGRATIONS_DIR, render_as_batch=True)
+    from app import serialization
+    serialization.init_app(app)
+    # registered before the other after_request hooks so it runs last, on the finished response
+    from app import assets, compression
+    compression.init_app(app)
+    assets.init_app(app)
     login_manager.init_app(app)
     login_manager.login_view = 'pages.login_page'
     login_manager.login_message = 'Please log in to access this page.'
@@ -28,30 +47,50 @@ def create_app(test_config=None):
     from app.suggestions.routes import sugg_bp
     from app.pages.routes import pages_bp
     from app.resources.routes import resources_bp
+    from app.export.routes import export_bp
+    from app.enrichment.routes import enrichment_bp
+    from app.stats.routes import stats_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(collections_bp)
     app.register_blueprint(sugg_bp)
     app.register_blueprint(pages_bp)
     app.register_blueprint(resources_bp)
+    app.register_blueprint(export_bp)
+    app.register_blueprint(enrichment_bp)
+    app.register_blueprint(stats_bp)
+
+    from app.cli import register_commands
+    register_commands(app)
+
+    from app import instrumentation
+    instrumentation.init_app(app)
+
+    # version counters behind ETag / If-None-Match / If-Match
+    from app import versioning
+    versioning.init_app(app)
+
+    # tombstones for the delta-sync endpoint
+    from app import sync
+    sync.init_app(app)
+
+    from app import response_cache
+    response_cache.init_app(app)
 
-    # create tables for dev convenience
-    with app.app_context():
-        try:
-            db.create_all()
-        except Exception:
-            pass
+    # set user loader (cached, see app/auth/identity.py)
+    from app.auth import hashing, identity
 
-    # set user loader
-    from app.models import User
+    hashing.init_app(app)
+    identity.init_app(app)
+    login_manager.user_loader(identity.load_user)
 
+    from app.suggestions import cache as suggestions_cache, client as metadata_client
+    suggestions_cache.init_app(app)
+    metadata_client.init_app(app)
 
-    @login_manager.user_loader
-    def load_user(user_id):
-        try:
-            return User.query.get(int(user_id))
-        except Exception:
-            return None
+    # background enrichment runs outside the request path (off unless ENRICHMENT_WORKER is set)
+    from app.enrichment import worker as enrichment_worker
+    enrichment_worker.init_app(app)
 
     @login_manager.unauthorized_handler
     def unauthorized():
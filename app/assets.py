@@ -0,0 +1,108 @@
+"""
+Fingerprinted static assets
+
+``flask --app run build-assets`` copies every file under app/static into
+app/static/dist/ under a name carrying a hash of its content
+(``js/validation.js`` becomes ``dist/js/validation.3f9a0c21b7d4.js``). It
+writes gzip versions of the text-like files next to them, plus brotli ones
+when the ``brotli`` package is installed, and records the mapping in
+``dist/manifest.json``. Templates link assets with ``asset_url('style.css')``:
+the hashed URL when the manifest lists the file, the plain static URL
+otherwise, so a checkout that was never built still works.
+
+A hashed name never changes content, so those files are served with
+``Cache-Control: public, max-age=31536000, immutable`` and browsers stop
+revalidating them; a new build makes new names. For a hashed file the
+static view sends the precompressed copy the client accepts. Run the build
+as part of each deploy. The dist/ directory is a build artifact, not
+checked in.
+"""
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from flask import current_app, request, send_from_directory, url_for
+
+from app.compression import SUFFIXES, available_codings, compress, compressible, negotiate
+
+BUILD_DIR = 'dist'
+MANIFEST = 'manifest.json'
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+HASH_LENGTH = 12
+
+
+def _hashed_name(name, digest):
+    root, ext = os.path.splitext(name)
+    return f'{root}.{digest[:HASH_LENGTH]}{ext}'
+
+
+def build(static_folder):
+    """Rebuild static_folder/dist from the files around it; returns the manifest"""
+    out = os.path.join(static_folder, BUILD_DIR)
+    # start clean so files from earlier builds do not pile up
+    shutil.rmtree(out, ignore_errors=True)
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        if root == static_folder and BUILD_DIR in dirs:
+            dirs.remove(BUILD_DIR)
+        for filename in sorted(files):
+            source = os.path.join(root, filename)
+            name = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as fh:
+                data = fh.read()
+            hashed = _hashed_name(name, hashlib.sha256(data).hexdigest())
+            target = os.path.join(out, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as fh:
+                fh.write(data)
+            mimetype = mimetypes.guess_type(name)[0] or ''
+            if compressible(mimetype):
+                for coding in available_codings():
+                    with open(target + SUFFIXES[coding], 'wb') as fh:
+                        fh.write(compress(data, coding, gzip_level=9, brotli_quality=11))
+            manifest[name] = f'{BUILD_DIR}/{hashed}'
+    with open(os.path.join(out, MANIFEST), 'w') as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, BUILD_DIR, MANIFEST)) as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return {}
+
+
+def asset_url(filename):
+    """URL of a static file, fingerprinted when the asset build has run"""
+    manifest = current_app.extensions['assets']
+    return url_for('static', filename=manifest.get(filename, filename))
+
+
+def _static(filename):
+    static_folder = current_app.static_folder
+    if not filename.startswith(BUILD_DIR + '/'):
+        return current_app.send_static_file(filename)
+
+    path = os.path.join(static_folder, filename)
+    available = [c for c in available_codings() if os.path.isfile(path + SUFFIXES[c])]
+    coding = negotiate(request.accept_encodings, available) if available else None
+    mimetype = mimetypes.guess_type(filename)[0]
+    response = send_from_directory(static_folder, filename + (SUFFIXES[coding] if coding else ''),
+                                   mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.immutable = True
+    if available:
+        response.vary.add('Accept-Encoding')
+    if coding:
+        response.headers['Content-Encoding'] = coding
+    return response
+
+
+def init_app(app):
+    # in debug mode templates link the sources, so edits show up without a rebuild
+    app.extensions['assets'] = {} if app.debug else load_manifest(app.static_folder)
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.view_functions['static'] = _static
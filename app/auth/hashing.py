@@ -0,0 +1,166 @@
+"""
+Password hashing off the request threads
+
+Hashing a password is deliberately expensive (tens of milliseconds of CPU
+with the default scrypt settings). ``PasswordHasher`` runs it in a small
+process pool, so a burst of logins or registrations uses other cores instead
+of holding the GIL that every cheap read request in this process needs.
+The number of hashes waiting for the pool is bounded: past
+``PASSWORD_HASH_MAX_PENDING`` the request fails at once with ``HashingBusy``
+(503 with Retry-After) rather than joining a queue it would time out in.
+A hash the request stopped waiting for still holds its slot until a worker
+has finished it. The workers are forked when the app is created, while the
+process has no other threads yet.
+
+``PASSWORD_HASH_METHOD`` takes a werkzeug method string, i.e. the algorithm
+and its cost (``scrypt:32768:8:1``, ``pbkdf2:sha256:600000``). A stored hash
+records the parameters it was made with; when they differ from the current
+setting, a successful login re-hashes the password with the new ones.
+``PASSWORD_HASH_WORKERS = 0`` hashes inline, e.g. for tests.
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+
+def _start_context():
+    """fork while this is the only thread; otherwise forkserver, as forking a threaded process can deadlock the child
+
+    fork is preferred because spawn and forkserver re-import the main module
+    (and build an app) in every worker, which only ever runs werkzeug's hash
+    functions.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    if 'fork' in methods and threading.active_count() == 1:
+        return multiprocessing.get_context('fork')
+    if 'forkserver' in methods:
+        return multiprocessing.get_context('forkserver')
+    return None
+
+
+class HashingBusy(Exception):
+    """Too many password hashes are already waiting for a worker"""
+
+
+class PasswordHasher:
+
+    def __init__(self, method=DEFAULT_METHOD, workers=2, max_pending=16, timeout=10):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._pool = None
+        self._pool_pid = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._prefix = None
+        self.stats = {'hashed': 0, 'verified': 0, 'rejected_busy': 0}
+
+    def start(self):
+        """Create the pool and launch its workers now; call while this process has no other threads"""
+        if self.workers:
+            self._executor().submit(abs, 0).result()
+
+    def _executor(self):
+        if self._pool is None or self._pool_pid != os.getpid():
+            # a pool inherited through fork (e.g. a preloading server) belongs to the parent
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=_start_context())
+            self._pool_pid = os.getpid()
+            atexit.register(self._pool.shutdown, wait=False, cancel_futures=True)
+        return self._pool
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def _run(self, stat, fn, *args):
+        with self._lock:
+            self.stats[stat] += 1
+        if not self.workers:
+            return fn(*args)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.stats['rejected_busy'] += 1
+                raise HashingBusy(f'{self._pending} password hashes already queued')
+            self._pending += 1
+            pool = self._executor()
+        try:
+            future = pool.submit(fn, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        # the slot stays taken until a worker is done with the hash, even if this request gave up on it
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise HashingBusy(f'password hash not done within {self.timeout}s')
+        except BrokenProcessPool:
+            # a worker died (e.g. killed for memory); start a fresh pool for the next caller
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+            raise
+
+    def hash(self, password):
+        return self._run('hashed', generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run('verified', check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True when pwhash was made with another algorithm or cost than the configured method"""
+        if self._prefix is None:
+            # werkzeug fills in defaults (e.g. "scrypt" -> "scrypt:32768:8:1"); hash once to learn them
+            self._prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return pwhash.split('$', 1)[0] != self._prefix
+
+    def metrics(self):
+        with self._lock:
+            return dict(self.stats, pending=self._pending, workers=self.workers, method=self.method)
+
+
+def init_app(app):
+    workers = app.config.get('PASSWORD_HASH_WORKERS', 2)
+    hasher = app.extensions['password_hasher'] = PasswordHasher(
+        method=app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD),
+        workers=workers,
+        max_pending=app.config.get('PASSWORD_HASH_MAX_PENDING') or 8 * max(workers, 1),
+        timeout=app.config.get('PASSWORD_HASH_TIMEOUT', 10),
+    )
+    # fork the workers now, before the enrichment worker or any request starts a thread
+    hasher.start()
+
+
+def _hasher():
+    if has_app_context():
+        return current_app.extensions.get('password_hasher')
+    return None
+
+
+def hash_password(password):
+    hasher = _hasher()
+    if hasher is None:
+        return generate_password_hash(password, DEFAULT_METHOD)
+    return hasher.hash(password)
+
+
+def verify_password(pwhash, password):
+    hasher = _hasher()
+    if hasher is None:
+        return check_password_hash(pwhash, password)
+    return hasher.verify(pwhash, password)
+
+
+def needs_rehash(pwhash):
+    hasher = _hasher()
+    return hasher is not None and hasher.needs_rehash(pwhash)
@@ -0,0 +1,83 @@
+"""
+Cached user loading for Flask-Login
+
+``load_user`` runs on every request that touches ``current_user``. Instead of
+a SELECT each time, the user's columns are kept in a short-lived cache and the
+``User`` is re-attached to the session without a query. The password hash is
+never cached; reading it (e.g. in change_password) loads it on demand.
+
+Anything that changes a user row must call ``invalidate_user`` after the
+commit so the next request sees the new state.
+"""
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from app import db
+from app.cache import make_backend
+from app.models import User
+
+CACHED_FIELDS = ('id', 'email', 'username', 'role', 'is_deleted', 'created_at', 'updated_at')
+DATETIME_FIELDS = ('created_at', 'updated_at')
+
+
+def init_app(app):
+    app.extensions['user_cache'] = make_backend(
+        app.config.get('USER_CACHE_BACKEND', 'memory'),
+        maxsize=app.config.get('USER_CACHE_SIZE', 4096),
+        ttl=app.config.get('USER_CACHE_TTL', 30),
+        prefix='sutra:user:',
+    )
+
+
+def _cache():
+    return current_app.extensions['user_cache']
+
+
+def _snapshot(user):
+    data = {field: getattr(user, field) for field in CACHED_FIELDS}
+    for field in DATETIME_FIELDS:
+        if data[field] is not None:
+            data[field] = data[field].isoformat()
+    return data
+
+
+def _restore(data):
+    """Rebuild a persistent User from a snapshot without touching the database"""
+    key = inspect(User).identity_key_from_primary_key((data['id'],))
+    existing = db.session.identity_map.get(key)
+    if existing is not None:
+        return existing
+    values = dict(data)
+    for field in DATETIME_FIELDS:
+        if values[field] is not None:
+            values[field] = datetime.fromisoformat(values[field])
+    user = User(**values)
+    make_transient_to_detached(user)
+    db.session.add(user)
+    return user
+
+
+def load_user(user_id):
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+    data = _cache().get(user_id)
+    if data is None:
+        user = db.session.get(User, user_id)
+        if user is None or user.is_deleted:
+            return None
+        _cache().set(user_id, _snapshot(user))
+        return user
+
+    if data['is_deleted']:
+        return None
+    return _restore(data)
+
+
+def invalidate_user(user_id):
+    _cache().delete(int(user_id))
@@ -1,12 +1,23 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_user, logout_user, login_required, current_user
+from sqlalchemy.exc import IntegrityError
 from app import db
 from app.models import User
 from app.utils import validate_json_input, get_validated_json
+from app.auth.hashing import HashingBusy, hash_password, needs_rehash, verify_password
+from app.auth.identity import invalidate_user
+from app.database import release_transaction
+from app.versioning import conditional_get, check_if_match, set_validators, row_validators
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
 
+@auth_bp.errorhandler(HashingBusy)
+def hashing_busy(e):
+    # shed load early; the client can retry once the login burst has drained
+    return jsonify({'error': 'Server busy, please retry shortly'}), 503, {'Retry-After': '2'}
+
+
 @auth_bp.route('/register', methods=['POST'])
 @validate_json_input(required_fields=['email', 'password'], optional_fields=['username'])
 def register():
@@ -57,10 +68,18 @@ def register():
     if username and User.query.filter_by(username=username).first():
         return jsonify({'error': 'Username already taken'}), 409
 
-    user = User(email=email, username=username)
-    user.set_password(password)
+    # a 409 costs no hash; the hash itself runs without the transaction (and its write lock)
+    release_transaction()
+    password_hash = hash_password(password)
+
+    user = User(email=email, username=username, password_hash=password_hash)
     db.session.add(user)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # the same email was registered while we were hashing
+        db.session.rollback()
+        return jsonify({'error': 'Email already registered'}), 409
     return jsonify({'message': 'User created successfully', 'user': user.to_dict()}), 201
 
 
@@ -90,9 +109,24 @@ def login():
         # Fallback to simple email match if sqlalchemy import fails
         user = User.query.filter_by(email=identifier.lower(), is_deleted=False).first()
 
-    if not user or not user.check_password(password):
+    if not user:
+        return jsonify({'error': 'Invalid credentials'}), 401
+
+    stored_hash = user.password_hash
+    release_transaction()
+    if not verify_password(stored_hash, password):
         return jsonify({'error': 'Invalid credentials'}), 401
 
+    if needs_rehash(stored_hash):
+        # hash settings changed since this password was stored; upgrade it while we have the plaintext
+        try:
+            new_hash = hash_password(password)
+            user.password_hash = new_hash
+            db.session.commit()
+            invalidate_user(user.id)
+        except HashingBusy:
+            db.session.rollback()
+
     login_user(user)
     return jsonify({'message': 'Logged in successfully', 'user': user.to_dict()}), 200
 
@@ -109,6 +143,9 @@ def logout():
 @login_required
 def get_me():
     user = current_user
+    not_modified = conditional_get(*row_validators(user))
+    if not_modified:
+        return not_modified
     return jsonify(user.to_dict()), 200
 
 
@@ -118,6 +155,9 @@ def get_me():
 def update_me():
     data = get_validated_json()
     user = current_user
+    precondition_failed = check_if_match(row_validators(user)[0])
+    if precondition_failed:
+        return precondition_failed
     
     if 'username' in data:
         username = data['username'].strip()
@@ -141,6 +181,8 @@ def update_me():
         user.username = username
     
     db.session.commit()
+    invalidate_user(user.id)
+    set_validators(*row_validators(user))
     return jsonify(user.to_dict()), 200
 
 
@@ -157,7 +199,9 @@ def change_password():
         return jsonify({'error': 'Password too long'}), 400
     
     user = current_user
-    if not user.check_password(current_password):
+    stored_hash = user.password_hash
+    release_transaction()
+    if not verify_password(stored_hash, current_password):
         return jsonify({'error': 'Current password is incorrect'}), 401
     
     # Check if new password is same as current
@@ -177,6 +221,8 @@ def change_password():
     if not any(c.isdigit() for c in new_password):
         return jsonify({'error': 'New password must contain at least one number'}), 400
     
-    user.set_password(new_password)
+    new_hash = hash_password(new_password)
+    user.password_hash = new_hash
     db.session.commit()
+    invalidate_user(user.id)
     return jsonify({'message': 'Password updated successfully'}), 200
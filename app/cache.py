@@ -0,0 +1,103 @@
+"""
+Small caching primitives shared by the app
+
+``TTLCache`` is a thread-safe in-process LRU with per-entry expiry and is the
+default backend everywhere. ``RedisBackend`` offers the same get/set/delete
+interface on a shared store so several workers see the same entries and
+invalidations. ``make_backend`` builds either from a config value; a config
+value that is already an object with get/set/delete is used as-is, which is
+how tests swap in a local stand-in.
+"""
+import importlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Bounded LRU mapping whose entries expire ``ttl`` seconds after being set"""
+
+    def __init__(self, maxsize=1024, ttl=60, clock=time.monotonic, prefix=None):
+        # prefix is accepted for interface parity with shared backends; keys are process-local anyway
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires <= self._clock():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisBackend:
+    """Shared backend on Redis; values must be JSON-serializable"""
+
+    def __init__(self, url, prefix='sutra:', ttl=60, **_):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError('RedisBackend requires the "redis" package (pip install redis)') from e
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def get(self, key, default=None):
+        raw = self._client.get(self.prefix + str(key))
+        return default if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self._client.setex(self.prefix + str(key), max(1, int(self.ttl if ttl is None else ttl)), json.dumps(value))
+
+    def delete(self, key):
+        self._client.delete(self.prefix + str(key))
+
+    def clear(self):
+        for key in self._client.scan_iter(match=self.prefix + '*'):
+            self._client.delete(key)
+
+
+def make_backend(spec, maxsize=1024, ttl=60, prefix='sutra:'):
+    """Build a cache backend from a config value
+
+    ``'memory'`` (or empty) gives a TTLCache, a ``redis://`` URL gives a
+    RedisBackend, ``'package.module:Class'`` instantiates that class with the
+    same keyword arguments, and any other object is returned unchanged.
+    """
+    if not isinstance(spec, str):
+        return spec
+    if not spec or spec == 'memory':
+        return TTLCache(maxsize=maxsize, ttl=ttl)
+    if spec.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(spec, prefix=prefix, ttl=ttl)
+    module_name, _, class_name = spec.partition(':')
+    backend_class = getattr(importlib.import_module(module_name), class_name)
+    return backend_class(maxsize=maxsize, ttl=ttl, prefix=prefix)
@@ -0,0 +1,79 @@
+"""
+Management commands, run with ``flask --app run <command>``
+"""
+import click
+from flask.cli import with_appcontext
+
+
+def register_commands(app):
+    app.cli.add_command(enrichment_worker)
+    app.cli.add_command(rebuild_stats)
+    app.cli.add_command(check_query_plans)
+    app.cli.add_command(prune_tombstones)
+    app.cli.add_command(build_assets)
+
+
+@click.command('enrichment-worker')
+@click.option('--once', is_flag=True, help='Process a single batch and exit.')
+@with_appcontext
+def enrichment_worker(once):
+    """Run the metadata enrichment worker in this process."""
+    from flask import current_app
+    from app.enrichment.worker import EnrichmentWorker
+
+    worker = EnrichmentWorker.from_config(current_app._get_current_object())
+    if once:
+        click.echo(f'Processed {worker.run_once()} jobs.')
+        return
+    click.echo('Enrichment worker running; press Ctrl+C to stop.')
+    try:
+        worker.run_forever()
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+@click.command('rebuild-stats')
+@click.option('--user-id', type=int, default=None, help="Only rebuild this user's rollups.")
+@with_appcontext
+def rebuild_stats(user_id):
+    """Recompute the daily status rollups from the status event log."""
+    from app.stats.service import rebuild_rollups
+
+    click.echo(f'Wrote {rebuild_rollups(user_id)} rollup rows.')
+
+
+@click.command('prune-tombstones')
+@click.option('--days', type=int, default=None, help='Keep this many days (default: DELTA_SYNC_RETENTION_DAYS).')
+@with_appcontext
+def prune_tombstones(days):
+    """Delete delta-sync tombstones older than the retention window."""
+    from app.sync import prune_tombstones as prune
+
+    click.echo(f'Deleted {prune(days)} tombstones.')
+
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets():
+    """Write content-hashed, precompressed copies of the static files to app/static/dist."""
+    from flask import current_app
+    from app.assets import build
+
+    manifest = build(current_app.static_folder)
+    for name, hashed in sorted(manifest.items()):
+        click.echo(f'{name} -> {hashed}')
+
+
+@click.command('check-query-plans')
+@click.option('--database-url', default=None,
+              help='Disposable database to seed and check (default: a temporary SQLite file).')
+@click.option('--verbose', is_flag=True, help='List every scenario, not only the failing ones.')
+def check_query_plans(database_url, verbose):
+    """Fail if an endpoint query falls back to a full table scan or a temp B-tree sort."""
+    import os
+    import pytest
+
+    if database_url:
+        os.environ['QUERY_PLANS_DATABASE_URL'] = database_url
+    tests = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests', 'test_query_plans.py')
+    raise SystemExit(pytest.main([tests, '-v' if verbose else '-q']))
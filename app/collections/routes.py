@@ -1,34 +1,73 @@
-from flask import Blueprint, request, jsonify
+import io
+from datetime import datetime
+from flask import Blueprint, request, jsonify, abort, current_app
 from flask_login import login_required, current_user
+from sqlalchemy import and_, or_
 from app import db
-from app.models import Collection, Resource, StatusEnum
-from app.utils import validate_id, validate_ownership, validate_json_input, get_validated_json, safe_query_param, validate_enum_value
+from app.models import Author, Collection, Resource, ResourceAuthor, StatusEnum
+from app.resources.formats import READERS, CONTENT_TYPES
+from app.resources.service import clean_resource_fields, import_resources, ResourceValidationError
+from app.collections.service import collection_summaries, collection_with_summary
+from app.database import release_transaction
+from app.search import search
+from app import sync
+from app.enrichment.worker import enqueue as enqueue_enrichment
+from app.versioning import (conditional_get, check_if_match, set_validators, collection_validators,
+                            user_collections_validators, query_fingerprint, collection_scope, user_scope)
+from app.response_cache import cached_body, cached_json
+from app.serialization import (requested_fields, resource_columns, resource_rows, collection_columns, collection_rows,
+                               RESOURCE_FIELDS, COLLECTION_FIELDS)
+from app.utils import (validate_id, validate_ownership, validate_json_input, get_validated_json, safe_query_param,
+                       validate_enum_value, safe_limit_param, encode_cursor, decode_cursor)
 
 collections_bp = Blueprint('collections', __name__, url_prefix='/api/collections')
 
+# sort key -> (column, descending)
+RESOURCE_SORTS = {
+    'created_at': (Resource.created_at, True),
+    'title': (Resource.title, False),
+    'status': (Resource.status, False),
+}
+
 
 @collections_bp.route('', methods=['GET'])
 @login_required
 def list_collections():
-    query = Collection.query.filter_by(user_id=current_user.id)
+    etag, last_modified = user_collections_validators(current_user.id, query_fingerprint())
+    not_modified = conditional_get(etag, last_modified)
+    if not_modified:
+        return not_modified
+    return cached_json(etag, [user_scope(current_user.id)], _collections_payload)
+
+
+def collections_json():
+    """The body GET /api/collections returns for the current query string, for pages to embed"""
+    etag, _ = user_collections_validators(current_user.id, query_fingerprint())
+    body, _ = cached_body(etag, [user_scope(current_user.id)], _collections_payload, 'collections.list_collections')
+    return body
+
+
+def _collections_payload():
+    fields = requested_fields(COLLECTION_FIELDS)
+    query = db.session.query(*collection_columns(fields)).filter(Collection.user_id == current_user.id)
     
     # Search query with safe parameter handling
     q = safe_query_param('q', '', 200)
+    rank = None
     if q:
-        query = query.filter(
-            (Collection.name.ilike(f'%{q}%')) | 
-            (Collection.description.ilike(f'%{q}%'))
-        )
+        query, rank = search(query, Collection, q)
     
-    # Sort options with validation
-    sort_by = safe_query_param('sort', 'created_at', 20)
+    # Sort options with validation; searches rank by relevance unless a sort is given
+    sort_by = safe_query_param('sort', 'relevance' if rank is not None else 'created_at', 20)
     if sort_by == 'name':
         query = query.order_by(Collection.name)
+    elif sort_by == 'relevance' and rank is not None:
+        query = query.order_by(rank, Collection.id)
     else:  # default: created_at
         query = query.order_by(Collection.created_at.desc())
     
-    cols = query.all()
-    return jsonify({'collections': [c.to_dict() for c in cols]}), 200
+    rows = query.all()
+    return {'collections': collection_rows(rows, fields)}
 
 
 @collections_bp.route('', methods=['POST'])
@@ -56,7 +95,19 @@ def create_collection():
 def get_collection(cid):
     cid = validate_id(cid, "Collection ID")
     col = validate_ownership(Collection, cid)
-    return jsonify({'collection': col.to_dict()}), 200
+    not_modified = conditional_get(*collection_validators(cid, updated_at=col.updated_at))
+    if not_modified:
+        return not_modified
+    return jsonify(_collection_payload(col)), 200
+
+
+def collection_json(col):
+    """The body GET /api/collections/<cid> returns, for pages to embed"""
+    return current_app.json.dumps(_collection_payload(col))
+
+
+def _collection_payload(col):
+    return {'collection': collection_with_summary(col, collection_summaries([col]))}
 
 
 @collections_bp.route('/<int:cid>', methods=['PUT'])
@@ -65,6 +116,9 @@ def get_collection(cid):
 def update_collection(cid):
     cid = validate_id(cid, "Collection ID")
     col = validate_ownership(Collection, cid)
+    precondition_failed = check_if_match(collection_validators(cid)[0])
+    if precondition_failed:
+        return precondition_failed
     data = get_validated_json()
     
     if 'name' in data:
@@ -82,6 +136,7 @@ def update_collection(cid):
         col.description = description
     
     db.session.commit()
+    set_validators(*collection_validators(cid, updated_at=col.updated_at))
     return jsonify({'collection': col.to_dict()}), 200
 
 
@@ -90,6 +145,9 @@ def update_collection(cid):
 def delete_collection(cid):
     cid = validate_id(cid, "Collection ID")
     col = validate_ownership(Collection, cid)
+    precondition_failed = check_if_match(collection_validators(cid)[0])
+    if precondition_failed:
+        return precondition_failed
     db.session.delete(col)
     db.session.commit()
     return jsonify({'message': 'Collection deleted successfully'}), 200
@@ -101,17 +159,24 @@ def delete_collection(cid):
 def list_resources(cid):
     cid = validate_id(cid, "Collection ID")
     col = validate_ownership(Collection, cid)
-    
-    # Build query with filters
-    query = Resource.query.filter_by(collection_id=cid)
+    etag, last_modified = collection_validators(cid, 'resources', query_fingerprint(), updated_at=col.updated_at)
+    not_modified = conditional_get(etag, last_modified)
+    if not_modified:
+        return not_modified
+    return cached_json(etag, [collection_scope(cid)], lambda: _resources_payload(cid))
+
+
+def _resources_payload(cid):
+    fields = requested_fields(RESOURCE_FIELDS)
+
+    # Build query with filters; only the needed columns are selected, as plain rows
+    query = db.session.query(*resource_columns(fields, *RESOURCE_SORTS)).filter(Resource.collection_id == cid)
     
     # Search query with safe parameter handling
     q = safe_query_param('q', '', 200)
+    rank = None
     if q:
-        query = query.filter(
-            (Resource.title.ilike(f'%{q}%')) | 
-            (Resource.authors.ilike(f'%{q}%'))
-        )
+        query, rank = search(query, Resource, q)
     
     # Status filter with validation
     status = safe_query_param('status', '', 20)
@@ -123,19 +188,97 @@ def list_resources(cid):
     # Author filter
     author = safe_query_param('author', '', 100)
     if author:
-        query = query.filter(Resource.authors.ilike(f'%{author}%'))
-    
-    # Sort options with validation
-    sort_by = safe_query_param('sort', 'created_at', 20)
-    if sort_by == 'title':
-        query = query.order_by(Resource.title)
-    elif sort_by == 'status':
-        query = query.order_by(Resource.status)
-    else:  # default: created_at
-        query = query.order_by(Resource.created_at.desc())
+        # any word of an author's name, by prefix: "smi" finds "John Smith"
+        matching = (db.session.query(ResourceAuthor.resource_id)
+                    .filter(Author.prefix_filter(author, ResourceAuthor.author_id)))
+        query = query.filter(Resource.id.in_(matching))
     
-    res = query.all()
-    return jsonify({'resources': [r.to_dict() for r in res]}), 200
+    # Sort options with validation; every sort is keyed on (column, id) so that
+    # pages can be resumed from a cursor without OFFSET scans
+    sort_by = safe_query_param('sort', 'relevance' if rank is not None else 'created_at', 20)
+    if sort_by == 'relevance' and rank is not None:
+        column, descending = rank, False
+        query = query.add_columns(rank)
+    else:
+        if sort_by not in RESOURCE_SORTS:
+            sort_by = 'created_at'
+        column, descending = RESOURCE_SORTS[sort_by]
+    if descending:
+        query = query.order_by(column.desc(), Resource.id.desc())
+    else:
+        query = query.order_by(column, Resource.id)
+
+    cursor = safe_query_param('cursor', '', 1000)
+    if cursor:
+        position = decode_cursor(cursor)
+        if position.get('sort') != sort_by:
+            abort(400, description="Cursor does not match the requested sort")
+        value = _cursor_value_in(sort_by, position.get('value'))
+        last_id = validate_id(position.get('id'), "cursor id")
+        if descending:
+            query = query.filter(or_(column < value, and_(column == value, Resource.id < last_id)))
+        else:
+            query = query.filter(or_(column > value, and_(column == value, Resource.id > last_id)))
+
+    limit = safe_limit_param()
+    res = query.limit(limit + 1).all()
+    if sort_by == 'relevance':
+        ranks = [row[-1] for row in res]
+    next_cursor = None
+    if len(res) > limit:
+        res = res[:limit]
+        last = res[-1]
+        value = ranks[limit - 1] if sort_by == 'relevance' else getattr(last, sort_by)
+        next_cursor = encode_cursor({
+            'sort': sort_by,
+            'value': _cursor_value_out(sort_by, value),
+            'id': last.id,
+        })
+    return {'resources': resource_rows(res, fields), 'next_cursor': next_cursor, 'limit': limit}
+
+
+@collections_bp.route('/<int:cid>/changes', methods=['GET'])
+@login_required
+def resource_changes(cid):
+    """Delta sync: resources changed and removed since a cursor (see app/sync.py)"""
+    cid = validate_id(cid, "Collection ID")
+    col = validate_ownership(Collection, cid)
+    # the collection version covers every write and removal, so an idle poll is a 304
+    not_modified = conditional_get(*collection_validators(cid, 'changes', query_fingerprint(),
+                                                          updated_at=col.updated_at))
+    if not_modified:
+        return not_modified
+    return jsonify(sync.changes(col)), 200
+
+
+def changes_json(col):
+    """The body GET /api/collections/<cid>/changes returns for the current query string, for pages to embed"""
+    return current_app.json.dumps(sync.changes(col))
+
+
+def _cursor_value_out(sort_by, value):
+    if sort_by == 'created_at':
+        return value.isoformat()
+    if sort_by == 'status':
+        return value.value
+    return value
+
+
+def _cursor_value_in(sort_by, value):
+    if sort_by == 'relevance':
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            abort(400, description="Invalid cursor")
+        return value
+    if not isinstance(value, str):
+        abort(400, description="Invalid cursor")
+    try:
+        if sort_by == 'created_at':
+            return datetime.fromisoformat(value)
+        if sort_by == 'status':
+            return StatusEnum(value)
+    except ValueError:
+        abort(400, description="Invalid cursor")
+    return value
 
 
 @collections_bp.route('/<int:cid>/resources', methods=['POST'])
@@ -145,33 +288,38 @@ def create_resource(cid):
     cid = validate_id(cid, "Collection ID")
     col = validate_ownership(Collection, cid)
     data = get_validated_json()
-    
-    title = data['title'].strip()
-    if len(title) > 300:
-        return jsonify({'error': 'Title too long (max 300 characters)'}), 400
-    
-    authors = data.get('authors', '').strip()
-    if len(authors) > 500:
-        return jsonify({'error': 'Authors field too long (max 500 characters)'}), 400
-    
-    url = data.get('url', '').strip()
-    if len(url) > 1000:
-        return jsonify({'error': 'URL too long (max 1000 characters)'}), 400
-    
-    # Validate URL format if provided
-    if url:
-        import re
-        url_pattern = r'^https?://.+'
-        if not re.match(url_pattern, url, re.IGNORECASE):
-            # Try to fix common URL issues
-            if not url.startswith(('http://', 'https://')):
-                url = 'https://' + url
-    
-    # Validate status
-    status = data.get('status')
-    status_val = validate_enum_value(status, StatusEnum, 'status') or StatusEnum.NOT_STARTED
 
-    res = Resource(title=title, authors=authors, url=url, status=status_val, collection_id=cid)
+    try:
+        fields = clean_resource_fields(data)
+    except ResourceValidationError as e:
+        return jsonify({'error': str(e)}), 400
+
+    res = Resource(title=fields['title'], url=fields['url'], status=fields['status'], collection_id=cid)
+    res.set_authors(fields['authors'])
     db.session.add(res)
+    enqueue_enrichment([res])
     db.session.commit()
     return jsonify({'resource': res.to_dict()}), 201
+
+
+@collections_bp.route('/<int:cid>/resources/import', methods=['POST'])
+@login_required
+def import_collection_resources(cid):
+    cid = validate_id(cid, "Collection ID")
+    validate_ownership(Collection, cid)
+    # don't hold the write lock while the client uploads; each chunk is saved in its own transaction
+    release_transaction()
+
+    # format=csv|jsonl|bibtex, or inferred from the Content-Type
+    fmt = safe_query_param('format', '', 10).lower() or CONTENT_TYPES.get(request.mimetype, '')
+    reader = READERS.get(fmt)
+    if reader is None:
+        return jsonify({'error': f"Unsupported import format. Valid values: {', '.join(READERS)}"}), 400
+    chunk_size = safe_limit_param('chunk_size', 'IMPORT_CHUNK_SIZE', 'IMPORT_CHUNK_MAX')
+
+    # read the body incrementally instead of buffering the whole upload
+    stream = io.TextIOWrapper(io.BufferedReader(request.stream), encoding='utf-8-sig', errors='replace', newline='')
+    report = import_resources(reader(stream), cid, chunk_size,
+                              current_app.config.get('IMPORT_MAX_REPORTED_ERRORS', 1000))
+    report['format'] = fmt
+    return jsonify(report), 200
@@ -0,0 +1,63 @@
+from sqlalchemy import func
+
+from app import db
+from app.models import Resource, ResourceTombstone, StatusEnum
+
+
+def empty_summary(collection):
+    return {
+        'resource_count': 0,
+        'status_counts': {status.value: 0 for status in StatusEnum},
+        'last_activity': collection.updated_at.isoformat() if collection.updated_at else None,
+    }
+
+
+def collection_summaries(collections):
+    """Resource count, per-status counts and last activity for each collection, keyed by id
+
+    All collections are summarized with one GROUP BY (collection_id, status)
+    over the resource table, plus one over the delta-sync tombstones, so a
+    dashboard costs two extra queries however many collections it shows. Last
+    activity is the newest of the collection's own updated_at, its resources'
+    updated_at and the time a resource was last deleted or moved out of it.
+    Tombstones are pruned after DELTA_SYNC_RETENTION_DAYS, so a removal older
+    than that stops counting.
+    """
+    collections = list(collections)
+    summaries = {col.id: empty_summary(col) for col in collections}
+    if not summaries:
+        return summaries
+
+    rows = (db.session.query(Resource.collection_id, Resource.status,
+                             func.count(Resource.id), func.max(Resource.updated_at))
+            .filter(Resource.collection_id.in_(summaries))
+            .group_by(Resource.collection_id, Resource.status)
+            .all())
+
+    removed = (db.session.query(ResourceTombstone.collection_id, func.max(ResourceTombstone.deleted_at))
+               .filter(ResourceTombstone.collection_id.in_(summaries))
+               .group_by(ResourceTombstone.collection_id)
+               .all())
+
+    latest = {col.id: col.updated_at for col in collections}
+
+    def touch(cid, when):
+        if when and (latest[cid] is None or when > latest[cid]):
+            latest[cid] = when
+
+    for cid, status, count, updated_at in rows:
+        summary = summaries[cid]
+        summary['resource_count'] += count
+        summary['status_counts'][status.value] = count
+        touch(cid, updated_at)
+    for cid, deleted_at in removed:
+        touch(cid, deleted_at)
+    for cid, when in latest.items():
+        summaries[cid]['last_activity'] = when.isoformat() if when else None
+    return summaries
+
+
+def collection_with_summary(collection, summaries):
+    data = collection.to_dict()
+    data.update(summaries.get(collection.id) or empty_summary(collection))
+    return data
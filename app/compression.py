@@ -0,0 +1,100 @@
+"""
+Response compression
+
+An ``after_request`` hook compresses text-like bodies (JSON, HTML, CSS,
+JavaScript, SVG, plain text) of at least COMPRESS_MIN_BYTES with the best
+coding the client's Accept-Encoding allows: brotli when the optional
+``brotli`` package is installed (``pip install brotli``), gzip otherwise.
+Smaller bodies go out as they are; the coding would cost more than it saves.
+Streamed and file responses are left alone. The static assets are
+compressed once, at build time (see app/assets.py).
+
+A compressed body is a different representation, so its ETag gets the
+coding as a suffix (``"abc"`` becomes ``"abc-gzip"``) and a shared cache can
+never hand the gzip bytes to a client that asked for brotli. Validators the
+client sends back in If-None-Match and If-Match have the suffix stripped
+before the views compare them with the ones in app/versioning.py, and a 304
+answer carries the suffix the client sent.
+"""
+import gzip
+import re
+
+from flask import g, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional accelerator
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/javascript', 'application/xml', 'image/svg+xml')
+# the codings app/assets.py precompresses to, and their file suffixes
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+_TAG_CODING = re.compile(r'-(br|gzip)"')
+
+
+def available_codings():
+    """Codings this process can produce, most preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encodings, codings=None):
+    """The coding from codings (default: all available) the client rates highest, or None for identity"""
+    best, best_quality = None, 0
+    for coding in available_codings() if codings is None else codings:
+        quality = accept_encodings[coding]
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(data, coding, gzip_level=6, brotli_quality=5):
+    if coding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+def compressible(mimetype):
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES or mimetype.endswith('+json')
+
+
+def init_app(app):
+    min_bytes = app.config.get('COMPRESS_MIN_BYTES', 1024)
+    if not min_bytes:
+        return
+    gzip_level = app.config.get('COMPRESS_GZIP_LEVEL', 6)
+    brotli_quality = app.config.get('COMPRESS_BROTLI_QUALITY', 5)
+
+    @app.before_request
+    def strip_coding_from_validators():
+        for key in ('HTTP_IF_NONE_MATCH', 'HTTP_IF_MATCH'):
+            value = request.environ.get(key)
+            match = value and _TAG_CODING.search(value)
+            if match:
+                g.etag_coding = match.group(1)
+                request.environ[key] = _TAG_CODING.sub('"', value)
+
+    @app.after_request
+    def compress_response(response):
+        if response.status_code == 304:
+            coding = g.get('etag_coding')
+            etag, weak = response.get_etag()
+            if coding and etag:
+                response.set_etag(f'{etag}-{coding}', weak)
+            return response
+        if (response.direct_passthrough or response.is_streamed or response.status_code < 200
+                or response.status_code in (204, 206) or 'Content-Encoding' in response.headers
+                or not compressible(response.mimetype or '')):
+            return response
+        data = response.get_data()
+        if len(data) < min_bytes:
+            return response
+        response.vary.add('Accept-Encoding')
+        coding = negotiate(request.accept_encodings)
+        if coding is None:
+            return response
+        response.set_data(compress(data, coding, gzip_level, brotli_quality))
+        response.headers['Content-Encoding'] = coding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f'{etag}-{coding}', weak)
+        return response
@@ -0,0 +1,164 @@
+"""
+Database engine configuration
+
+``configure(app)`` runs before ``db.init_app`` and turns the ``SQLITE_*`` /
+``DB_POOL_*`` settings into engine options for the configured dialect:
+
+* SQLite: every new connection switches to WAL (readers no longer block the
+  writer), ``synchronous=NORMAL`` (no fsync per commit; still durable across
+  application crashes), a busy timeout so a writer waits for the lock instead
+  of failing with ``database is locked``, plus memory-mapped I/O and a larger
+  page cache. Foreign keys are enforced, so ``ON DELETE CASCADE`` / ``SET
+  NULL`` behave as on PostgreSQL (SQLite leaves them off by default). Write
+  requests open their transaction with ``BEGIN IMMEDIATE``: a deferred
+  transaction that reads first and then writes cannot wait on the busy
+  timeout when another writer got in between, it fails straight away. Code
+  that writes outside a request (the enrichment worker) asks for the same
+  inside ``with write_transactions():``.
+
+  The flip side: from its first query, a write request holds the
+  database-wide write lock until it commits or rolls back, and every other
+  writer waits behind it (then fails once the busy timeout runs out). A
+  handler that does slow work after reading (hashing a password, reading a
+  streamed upload, calling another service) must end its transaction with
+  ``release_transaction()`` first and re-read what it needs afterwards.
+* PostgreSQL (and other servers): a sized connection pool with overflow,
+  pre-ping to discard connections the server dropped, and periodic recycling.
+
+With ``DATABASE_REPLICA_URL`` set, ``RoutingSession`` sends the reads of
+GET/HEAD requests to the replica and everything else, including any read
+issued while the session holds pending writes, to the primary. Replicas lag,
+so a client may briefly see its own write missing from a list it re-fetches.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, event
+
+REPLICA = 'replica'
+READ_METHODS = ('GET', 'HEAD')
+
+_writing = ContextVar('writing', default=False)
+
+
+def _is_sqlite(uri):
+    return uri.startswith('sqlite')
+
+
+def engine_options(config, uri):
+    """Engine keyword arguments for uri derived from the config"""
+    if _is_sqlite(uri):
+        options = {}
+        if config.get('SQLITE_BUSY_TIMEOUT_MS'):
+            # the driver's own lock wait; PRAGMA busy_timeout below covers raw connections too
+            options['connect_args'] = {'timeout': config['SQLITE_BUSY_TIMEOUT_MS'] / 1000}
+        return options
+    return {
+        'pool_size': config.get('DB_POOL_SIZE', 10),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 20),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', True),
+    }
+
+
+def sqlite_pragmas(config):
+    """PRAGMA statements run on every new SQLite connection; unset values keep SQLite's default"""
+    pragmas = []
+    if config.get('SQLITE_JOURNAL_MODE'):
+        pragmas.append(f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}")
+    if config.get('SQLITE_SYNCHRONOUS'):
+        pragmas.append(f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}")
+    if config.get('SQLITE_BUSY_TIMEOUT_MS'):
+        pragmas.append(f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}")
+    if config.get('SQLITE_MMAP_SIZE'):
+        pragmas.append(f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}")
+    if config.get('SQLITE_CACHE_SIZE'):
+        pragmas.append(f"PRAGMA cache_size={int(config['SQLITE_CACHE_SIZE'])}")
+    if config.get('SQLITE_FOREIGN_KEYS', True):
+        pragmas.append('PRAGMA foreign_keys=ON')
+    return pragmas
+
+
+@contextmanager
+def write_transactions():
+    """Begin SQLite transactions opened in this block with BEGIN IMMEDIATE, as write requests do"""
+    token = _writing.set(True)
+    try:
+        yield
+    finally:
+        _writing.reset(token)
+
+
+def release_transaction():
+    """End the session's transaction before slow work so it holds no locks (SQLite: the write lock)
+
+    Loaded objects are expired and reload, in a new transaction, on next access.
+    """
+    from app import db
+
+    db.session.rollback()
+
+
+def configure(app):
+    """Fill in engine options and the replica bind; call before db.init_app()"""
+    config = app.config
+    options = engine_options(config, config['SQLALCHEMY_DATABASE_URI'])
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    replica = config.get('DATABASE_REPLICA_URL')
+    if replica:
+        binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+        binds.setdefault(REPLICA, {'url': replica, **engine_options(config, replica)})
+        config['SQLALCHEMY_BINDS'] = binds
+
+
+def install(app, db):
+    """Attach the SQLite connection hooks to the app's engines; call after db.init_app()"""
+    pragmas = sqlite_pragmas(app.config)
+    immediate = app.config.get('SQLITE_BEGIN_IMMEDIATE', True)
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                _install_sqlite(engine, pragmas, immediate)
+
+
+def _install_sqlite(engine, pragmas, immediate):
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        if immediate:
+            # let SQLAlchemy's begin hook below issue BEGIN instead of the driver
+            dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    if immediate:
+        @event.listens_for(engine, 'begin')
+        def on_begin(connection):
+            write = _writing.get() or (has_request_context() and request.method not in READ_METHODS)
+            connection.exec_driver_sql('BEGIN IMMEDIATE' if write else 'BEGIN')
+
+
+class RoutingSession(Session):
+    """Session that reads from the replica bind during GET/HEAD requests when one is configured"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._use_replica(clause):
+            replica = self._db.engines.get(REPLICA)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _use_replica(self, clause):
+        if not has_request_context() or request.method not in READ_METHODS:
+            return False
+        if self._flushing or self.new or self.dirty or self.deleted:
+            return False
+        # ORM loads pass no clause or a SELECT; anything else may write
+        return clause is None or isinstance(clause, Select)
@@ -0,0 +1,63 @@
+from flask import Blueprint, jsonify
+from flask_login import login_required, current_user
+from sqlalchemy import func
+from app import db
+from app.models import Collection, EnrichmentJob, Resource, ResourceMetadata
+from app.utils import validate_id, validate_ownership, safe_query_param
+from app.enrichment.worker import enqueue
+
+enrichment_bp = Blueprint('enrichment', __name__, url_prefix='/api/enrichment')
+
+
+def _owned_resource_ids():
+    query = (db.session.query(Resource.id)
+             .join(Collection, Collection.id == Resource.collection_id)
+             .filter(Collection.user_id == current_user.id))
+    collection_id = safe_query_param('collection_id', '', 20)
+    if collection_id:
+        cid = validate_id(collection_id, "Collection ID")
+        validate_ownership(Collection, cid)
+        query = query.filter(Resource.collection_id == cid)
+    return query
+
+
+@enrichment_bp.route('', methods=['GET'])
+@login_required
+def enrichment_progress():
+    """Job counts per state for the user's resources, optionally for one collection"""
+    resource_ids = _owned_resource_ids()
+    scope = resource_ids.subquery()
+
+    counts = dict(db.session.query(EnrichmentJob.state, func.count(EnrichmentJob.id))
+                  .filter(EnrichmentJob.resource_id.in_(db.session.query(scope.c.id)))
+                  .group_by(EnrichmentJob.state)
+                  .all())
+    enriched = (db.session.query(func.count(ResourceMetadata.resource_id))
+                .filter(ResourceMetadata.resource_id.in_(db.session.query(scope.c.id)))
+                .scalar())
+    total = db.session.query(func.count()).select_from(scope).scalar()
+
+    return jsonify({
+        'jobs': {state: counts.get(state, 0) for state in EnrichmentJob.STATES},
+        'resources': total,
+        'enriched': enriched,
+    }), 200
+
+
+@enrichment_bp.route('/collections/<int:cid>', methods=['POST'])
+@login_required
+def enqueue_collection(cid):
+    """Queue every resource in the collection that has no metadata and no open job"""
+    cid = validate_id(cid, "Collection ID")
+    validate_ownership(Collection, cid)
+
+    open_jobs = (db.session.query(EnrichmentJob.resource_id)
+                 .filter(EnrichmentJob.state.in_([EnrichmentJob.PENDING, EnrichmentJob.RUNNING])))
+    resources = (Resource.query
+                 .filter(Resource.collection_id == cid,
+                         ~Resource.id.in_(db.session.query(ResourceMetadata.resource_id)),
+                         ~Resource.id.in_(open_jobs))
+                 .all())
+    enqueue(resources)
+    db.session.commit()
+    return jsonify({'queued': len(resources)}), 202
@@ -0,0 +1,195 @@
+"""
+Background metadata enrichment
+
+New and imported resources get an ``EnrichmentJob`` row in the same
+transaction that creates them. ``EnrichmentWorker`` claims pending jobs in
+batches, looks the titles up on the metadata API through a bounded thread
+pool (identical lookups within a batch are made once), and stores the result
+in ``ResourceMetadata``. Nothing here runs on a request thread: the worker is
+either a daemon thread started by ``create_app`` (``ENRICHMENT_WORKER``) or a
+separate process (``flask --app run enrichment-worker``). Several workers can
+share one queue; a job is owned by whichever claim wrote its token.
+"""
+import logging
+import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from sqlalchemy import and_, or_, update
+
+from app import db
+from app.database import write_transactions
+from app.models import EnrichmentJob, Resource, ResourceMetadata, split_authors, utcnow
+from app.suggestions.service import query_openlibrary
+
+log = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r'[^\w\s]', re.UNICODE)
+
+
+def normalize_title(title):
+    return ' '.join(_PUNCTUATION.sub(' ', title or '').split()).casefold()
+
+
+def enqueue(resources):
+    """Queue enrichment for resources in the current session; committed by the caller"""
+    for res in resources:
+        res.enrichment_jobs.append(EnrichmentJob())
+
+
+def _lookup_query(res):
+    authors = split_authors(res.authors)
+    return f'{res.title} {authors[0]}' if authors else res.title
+
+
+def _best_match(res, suggestions):
+    wanted = normalize_title(res.title)
+    for suggestion in suggestions:
+        if normalize_title(suggestion.get('title')) == wanted:
+            return suggestion
+    return suggestions[0] if suggestions else None
+
+
+class EnrichmentWorker:
+
+    def __init__(self, app, batch_size=50, concurrency=4, poll_interval=5, max_attempts=5,
+                 retry_delay=60, claim_timeout=600):
+        self.app = app
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.claim_timeout = claim_timeout
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_config(cls, app):
+        config = app.config
+        return cls(
+            app,
+            batch_size=config.get('ENRICHMENT_BATCH_SIZE', 50),
+            concurrency=config.get('ENRICHMENT_CONCURRENCY', 4),
+            poll_interval=config.get('ENRICHMENT_POLL_INTERVAL', 5),
+            max_attempts=config.get('ENRICHMENT_MAX_ATTEMPTS', 5),
+        )
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run_forever, name='enrichment-worker', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            try:
+                processed = self.run_once()
+            except Exception:
+                log.exception('enrichment batch failed')
+                processed = 0
+            if not processed:
+                self._stop.wait(self.poll_interval)
+
+    def run_once(self):
+        """Claim and process one batch; returns the number of jobs handled"""
+        with self.app.app_context():
+            try:
+                with write_transactions():
+                    jobs = self._claim()
+                if jobs:
+                    self._process(jobs)
+                return len(jobs)
+            finally:
+                db.session.remove()
+
+    def _claim(self):
+        now = utcnow()
+        claimable = or_(
+            and_(EnrichmentJob.state == EnrichmentJob.PENDING, EnrichmentJob.available_at <= now),
+            # a worker that died mid-batch leaves jobs running; take them back after claim_timeout
+            and_(EnrichmentJob.state == EnrichmentJob.RUNNING,
+                 EnrichmentJob.claimed_at < now - timedelta(seconds=self.claim_timeout)),
+        )
+        ids = [row.id for row in db.session.query(EnrichmentJob.id)
+               .filter(claimable).order_by(EnrichmentJob.id).limit(self.batch_size)]
+        if not ids:
+            return []
+        token = uuid.uuid4().hex
+        db.session.execute(
+            update(EnrichmentJob)
+            .where(EnrichmentJob.id.in_(ids), claimable)
+            .values(state=EnrichmentJob.RUNNING, claim_token=token, claimed_at=now,
+                    attempts=EnrichmentJob.attempts + 1)
+        )
+        db.session.commit()
+        return EnrichmentJob.query.filter_by(claim_token=token, state=EnrichmentJob.RUNNING).all()
+
+    def _process(self, jobs):
+        job_ids = [j.id for j in jobs]
+        token = jobs[0].claim_token
+        lookups = {res.id: _lookup_query(res)
+                   for res in Resource.query.filter(Resource.id.in_([j.resource_id for j in jobs]))}
+        # hold no transaction (on SQLite it could be the write lock) during the network lookups
+        db.session.rollback()
+        queries = dict.fromkeys(lookups.values())
+
+        client = self.app.extensions['metadata_client']
+
+        def lookup(q):
+            try:
+                return q, query_openlibrary(q, limit=5, client=client), None
+            except Exception as e:
+                return q, None, e
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for q, suggestions, error in pool.map(lookup, list(queries)):
+                queries[q] = (suggestions, error)
+
+        with write_transactions():
+            self._store(job_ids, token, lookups, queries)
+
+    def _store(self, job_ids, token, lookups, queries):
+        # read again: resources deleted during the lookups took their jobs with them (ON DELETE CASCADE)
+        jobs = EnrichmentJob.query.filter(EnrichmentJob.id.in_(job_ids), EnrichmentJob.claim_token == token).all()
+        resources = {r.id: r for r in Resource.query.filter(Resource.id.in_([j.resource_id for j in jobs]))}
+        for job in jobs:
+            res = resources.get(job.resource_id)
+            if res is None or res.id not in lookups:
+                db.session.delete(job)  # orphaned: only possible with SQLITE_FOREIGN_KEYS off
+                continue
+            suggestions, error = queries[lookups[res.id]]
+            if error is not None:
+                job.last_error = str(error)[:500]
+                if job.attempts >= self.max_attempts:
+                    job.state = EnrichmentJob.FAILED
+                else:
+                    job.state = EnrichmentJob.PENDING
+                    job.available_at = utcnow() + timedelta(seconds=self.retry_delay * 2 ** (job.attempts - 1))
+                continue
+            match = _best_match(res, suggestions)
+            if match is None:
+                job.state = EnrichmentJob.NO_MATCH
+                continue
+            meta = res.enrichment or ResourceMetadata(resource_id=res.id)
+            meta.canonical_title = (match.get('title') or '')[:300] or None
+            meta.normalized_title = normalize_title(match.get('title') or res.title)[:300]
+            meta.isbn = match.get('isbn')
+            meta.publish_year = match.get('year')
+            meta.fetched_at = utcnow()
+            res.enrichment = meta
+            job.state = EnrichmentJob.DONE
+            job.last_error = None
+        db.session.commit()
+
+
+def init_app(app):
+    if app.config.get('ENRICHMENT_WORKER') and not app.config.get('TESTING'):
+        worker = EnrichmentWorker.from_config(app)
+        app.extensions['enrichment_worker'] = worker
+        worker.start()
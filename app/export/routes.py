@@ -0,0 +1,79 @@
+from flask import Blueprint, Response, current_app, jsonify, stream_with_context
+from flask_login import login_required, current_user
+from sqlalchemy import select
+from app import db
+from app.models import Collection, Resource
+from app.resources.formats import WRITERS
+from app.utils import validate_id, validate_ownership, safe_query_param
+
+export_bp = Blueprint('export', __name__, url_prefix='/api/export')
+
+
+@export_bp.route('', methods=['GET'])
+@login_required
+def export_library():
+    """Stream the user's resources (or one collection's) ordered by id
+
+    Every record carries its id; a client whose download was cut off resumes
+    with ``after=<last id received>``.
+    """
+    fmt = safe_query_param('format', 'jsonl', 10).lower()
+    if fmt not in WRITERS:
+        return jsonify({'error': f"Unsupported export format. Valid values: {', '.join(WRITERS)}"}), 400
+    writer, mimetype, extension = WRITERS[fmt]
+
+    stmt = (select(Resource.id, Resource.collection_id, Collection.name, Resource.title, Resource.authors,
+                   Resource.url, Resource.status, Resource.last_read_date, Resource.created_at,
+                   Resource.updated_at)
+            .join(Collection, Collection.id == Resource.collection_id)
+            .where(Collection.user_id == current_user.id)
+            .order_by(Resource.id))
+
+    collection_id = safe_query_param('collection_id', '', 20)
+    if collection_id:
+        cid = validate_id(collection_id, "Collection ID")
+        validate_ownership(Collection, cid)
+        stmt = stmt.where(Resource.collection_id == cid)
+
+    after = safe_query_param('after', '', 20)
+    if after:
+        stmt = stmt.where(Resource.id > validate_id(after, "after"))
+
+    # server-side cursor: rows are fetched batch by batch as the client reads
+    stmt = stmt.execution_options(yield_per=current_app.config.get('EXPORT_BATCH_SIZE', 500))
+
+    def rows():
+        for row in db.session.execute(stmt):
+            yield {
+                'id': row.id,
+                'collection_id': row.collection_id,
+                'collection': row.name,
+                'title': row.title,
+                'authors': row.authors,
+                'url': row.url,
+                'status': row.status.value if row.status else None,
+                'last_read_date': row.last_read_date.isoformat() if row.last_read_date else None,
+                'created_at': row.created_at.isoformat() if row.created_at else None,
+                'updated_at': row.updated_at.isoformat() if row.updated_at else None,
+            }
+
+    filename = f'sutra-atlas-export.{extension}'
+    return Response(stream_with_context(_buffered(writer(rows()))), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'X-Accel-Buffering': 'no',
+    })
+
+
+def _buffered(chunks, size=64 * 1024):
+    """Coalesce small writer chunks into socket-sized writes"""
+    pending = []
+    pending_size = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        pending_size += len(chunk)
+        if pending_size >= size:
+            yield ''.join(pending)
+            pending = []
+            pending_size = 0
+    if pending:
+        yield ''.join(pending)
@@ -0,0 +1,363 @@
+"""
+Per-request instrumentation
+
+Two opt-in levels, both off by default so a normal deployment registers no
+engine listeners or request hooks at all:
+
+``SQL_STATEMENT_COUNTING``
+    Every statement the engine executes while a request is active is counted
+    on ``flask.g`` and the total is returned in an ``X-SQL-Statements``
+    response header, which makes query-count regressions (N+1 loads,
+    repeated ownership checks) visible from any client.
+
+``REQUEST_PROFILING``
+    Also records wall time, time spent in SQL, JSON serialization and
+    template rendering for each request and reports them in a
+    ``Server-Timing`` header (shown by browser dev tools). Statements run
+    more than once with the same parameters are counted as duplicates, and
+    the same SQL run ``N_PLUS_ONE_THRESHOLD`` times or more in one request
+    is logged as a likely N+1. Totals per endpoint are served in Prometheus
+    text format at ``/metrics`` to requests carrying ``METRICS_TOKEN``
+    (or to anyone with ``METRICS_PUBLIC``; otherwise it answers 404).
+    With ``PROFILE_SAMPLE_RATE`` > 0, that share of requests runs under
+    cProfile and the ``PROFILE_KEEP`` slowest ones taking at least
+    ``PROFILE_MIN_MS`` are written to ``PROFILE_DIR`` as ``.prof`` files
+    (open them with ``python -m pstats`` or snakeviz).
+
+Metrics are kept per process; scrape each worker, or run a single one when
+comparing numbers.
+"""
+import bisect
+import cProfile
+import hmac
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from flask import before_render_template, current_app, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+
+from app import db
+
+log = logging.getLogger(__name__)
+
+# request duration histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    __slots__ = ('started', 'sql_seconds', 'statements', 'serialize_seconds', 'render_seconds', 'render_started')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_seconds = 0.0
+        self.statements = Counter()
+        self.serialize_seconds = 0.0
+        self.render_seconds = 0.0
+        self.render_started = None
+
+    def duplicates(self):
+        return sum(n - 1 for n in self.statements.values() if n > 1)
+
+    def repeated_sql(self, threshold):
+        """SQL strings executed at least threshold times, whatever their parameters"""
+        per_sql = Counter()
+        for (statement, _), n in self.statements.items():
+            per_sql[statement] += n
+        return {statement: n for statement, n in per_sql.items() if n >= threshold}
+
+
+class Metrics:
+    """Per-endpoint counters and a duration histogram rendered in Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter()
+        self.durations = defaultdict(lambda: [0] * (len(BUCKETS) + 1))
+        self.duration_sum = Counter()
+        self.sql_seconds = Counter()
+        self.sql_statements = Counter()
+        self.sql_duplicates = Counter()
+        self.n_plus_one = Counter()
+        self.serialize_seconds = Counter()
+        self.render_seconds = Counter()
+
+    def observe(self, method, endpoint, status, seconds, stats, repeated):
+        with self._lock:
+            self.requests[(method, endpoint, str(status))] += 1
+            self.durations[endpoint][bisect.bisect_left(BUCKETS, seconds)] += 1
+            self.duration_sum[endpoint] += seconds
+            self.sql_seconds[endpoint] += stats.sql_seconds
+            self.sql_statements[endpoint] += sum(stats.statements.values())
+            self.sql_duplicates[endpoint] += stats.duplicates()
+            self.n_plus_one[endpoint] += 1 if repeated else 0
+            self.serialize_seconds[endpoint] += stats.serialize_seconds
+            self.render_seconds[endpoint] += stats.render_seconds
+
+    def render(self, extra=()):
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        with self._lock:
+            family('sutra_http_requests_total', 'counter', 'Requests handled, by endpoint and status.')
+            for (method, endpoint, status), n in sorted(self.requests.items()):
+                lines.append(f'sutra_http_requests_total{{method="{method}",endpoint="{endpoint}",'
+                             f'status="{status}"}} {n}')
+
+            family('sutra_http_request_duration_seconds', 'histogram', 'Request wall time.')
+            for endpoint, counts in sorted(self.durations.items()):
+                total = 0
+                for bound, n in zip(BUCKETS + ('+Inf',), counts):
+                    total += n
+                    lines.append(f'sutra_http_request_duration_seconds_bucket{{endpoint="{endpoint}",'
+                                 f'le="{bound}"}} {total}')
+                lines.append(f'sutra_http_request_duration_seconds_sum{{endpoint="{endpoint}"}} '
+                             f'{self.duration_sum[endpoint]:.6f}')
+                lines.append(f'sutra_http_request_duration_seconds_count{{endpoint="{endpoint}"}} {total}')
+
+            for name, values, help_text in (
+                ('sutra_sql_seconds_total', self.sql_seconds, 'Time spent executing SQL.'),
+                ('sutra_sql_statements_total', self.sql_statements, 'SQL statements executed.'),
+                ('sutra_sql_duplicate_statements_total', self.sql_duplicates,
+                 'Statements repeated with identical parameters within one request.'),
+                ('sutra_sql_n_plus_one_requests_total', self.n_plus_one,
+                 'Requests that ran the same SQL N_PLUS_ONE_THRESHOLD times or more.'),
+                ('sutra_serialization_seconds_total', self.serialize_seconds, 'Time spent encoding JSON.'),
+                ('sutra_template_render_seconds_total', self.render_seconds, 'Time spent rendering templates.'),
+            ):
+                family(name, 'counter', help_text)
+                for endpoint, value in sorted(values.items()):
+                    lines.append(f'{name}{{endpoint="{endpoint}"}} {_number(value)}')
+
+        for name, value, help_text in extra:
+            family(name, 'gauge', help_text)
+            lines.append(f'{name} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _number(value):
+    return f'{value:.6f}' if isinstance(value, float) else str(value)
+
+
+class SlowRequestProfiler:
+    """Runs sampled requests under cProfile and keeps the dumps of the slowest ones"""
+
+    def __init__(self, directory, sample_rate, min_ms, keep):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.min_ms = min_ms
+        self.keep = keep
+        self._kept = []  # sorted (ms, path)
+        self._lock = threading.Lock()
+        # cProfile cannot profile two threads at once, so one sampled request at a time
+        self._active = threading.Lock()
+
+    def start(self):
+        if random.random() >= self.sample_rate or not self._active.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def stop(self, profiler):
+        profiler.disable()
+        self._active.release()
+
+    def maybe_dump(self, profiler, ms, endpoint):
+        if ms < self.min_ms:
+            return None
+        with self._lock:
+            if len(self._kept) >= self.keep and ms <= self._kept[0][0]:
+                return None
+            os.makedirs(self.directory, exist_ok=True)
+            stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+            path = os.path.join(self.directory, f'{ms:09.1f}ms-{endpoint}-{stamp}.prof')
+            profiler.dump_stats(path)
+            bisect.insort(self._kept, (ms, path))
+            while len(self._kept) > self.keep:
+                _, fastest = self._kept.pop(0)
+                try:
+                    os.unlink(fastest)
+                except OSError:
+                    pass
+        return path
+
+
+def init_app(app):
+    counting = app.config.get('SQL_STATEMENT_COUNTING')
+    profiling = app.config.get('REQUEST_PROFILING')
+    if not (counting or profiling):
+        return
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            if profiling:
+                event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    if counting:
+        @app.after_request
+        def add_statement_count(response):
+            response.headers['X-SQL-Statements'] = str(g.get('sql_statements', 0))
+            return response
+
+    if profiling:
+        _init_profiling(app)
+
+
+def _init_profiling(app):
+    metrics = app.extensions['request_metrics'] = Metrics()
+    threshold = app.config.get('N_PLUS_ONE_THRESHOLD', 5)
+    profiler = None
+    if app.config.get('PROFILE_SAMPLE_RATE'):
+        profiler = SlowRequestProfiler(
+            app.config.get('PROFILE_DIR') or os.path.join(app.instance_path, 'profiles'),
+            app.config['PROFILE_SAMPLE_RATE'],
+            app.config.get('PROFILE_MIN_MS', 200),
+            app.config.get('PROFILE_KEEP', 20),
+        )
+
+    dumps = app.json.dumps
+
+    def timed_dumps(obj, **kwargs):
+        stats = g.get('request_stats') if has_request_context() else None
+        if stats is None:
+            return dumps(obj, **kwargs)
+        t0 = time.perf_counter()
+        try:
+            return dumps(obj, **kwargs)
+        finally:
+            stats.serialize_seconds += time.perf_counter() - t0
+
+    app.json.dumps = timed_dumps
+    before_render_template.connect(_render_started, app)
+    template_rendered.connect(_render_finished, app)
+
+    @app.before_request
+    def start_request_stats():
+        g.request_stats = RequestStats()
+        if profiler is not None:
+            g.profiler = profiler.start()
+
+    @app.after_request
+    def finish_request_stats(response):
+        stats = g.pop('request_stats', None)
+        if stats is None:
+            return response
+        seconds = time.perf_counter() - stats.started
+        endpoint = request.endpoint or 'unmatched'
+        run = g.pop('profiler', None)
+        if run is not None:
+            profiler.stop(run)
+            path = profiler.maybe_dump(run, seconds * 1000, endpoint)
+            if path:
+                log.info('profiled slow request %s %s (%.1f ms): %s', request.method, request.path,
+                         seconds * 1000, path)
+
+        repeated = stats.repeated_sql(threshold)
+        if repeated:
+            statement, n = max(repeated.items(), key=lambda item: item[1])
+            log.warning('possible N+1 in %s %s: statement ran %d times: %s', request.method, request.path, n,
+                        ' '.join(statement.split())[:200])
+        metrics.observe(request.method, endpoint, response.status_code, seconds, stats, repeated)
+
+        count = sum(stats.statements.values())
+        timings = [
+            f'app;dur={seconds * 1000:.2f}',
+            f'sql;dur={stats.sql_seconds * 1000:.2f};desc="{count} queries, {stats.duplicates()} duplicate"',
+        ]
+        if stats.serialize_seconds:
+            timings.append(f'serialize;dur={stats.serialize_seconds * 1000:.2f}')
+        if stats.render_seconds:
+            timings.append(f'render;dur={stats.render_seconds * 1000:.2f}')
+        response.headers.add('Server-Timing', ', '.join(timings))
+        return response
+
+    @app.teardown_request
+    def release_profiler(exc):
+        # after_request is skipped when the view raised
+        run = g.pop('profiler', None)
+        if run is not None:
+            profiler.stop(run)
+
+    def metrics_view():
+        denied = metrics_denied()
+        if denied is not None:
+            return denied
+        body = metrics.render(_cache_gauges(app))
+        return app.response_class(body, mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view, methods=['GET'])
+
+
+def metrics_denied():
+    """A 403/404 response unless the request may read process-wide metrics, else None
+
+    Access needs ``Authorization: Bearer <METRICS_TOKEN>``; without a token
+    configured, metrics are hidden (404) unless ``METRICS_PUBLIC`` opts in.
+    """
+    config = current_app.config
+    token = config.get('METRICS_TOKEN')
+    if token:
+        if hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return None
+        return current_app.response_class('forbidden\n', status=403, mimetype='text/plain')
+    if config.get('METRICS_PUBLIC'):
+        return None
+    return current_app.response_class('not found\n', status=404, mimetype='text/plain')
+
+
+def _cache_gauges(app):
+    gauges = []
+    cache = app.extensions.get('response_cache')
+    if cache is not None:
+        stats = cache.metrics()
+        for name in ('hits', 'misses', 'stores', 'invalidated'):
+            gauges.append((f'sutra_response_cache_{name}', stats[name], f'Response cache {name}.'))
+    return gauges
+
+
+def _render_started(sender, template, context, **extra):
+    stats = g.get('request_stats')
+    if stats is not None:
+        stats.render_started = time.perf_counter()
+
+
+def _render_finished(sender, template, context, **extra):
+    stats = g.get('request_stats')
+    if stats is not None and stats.render_started is not None:
+        stats.render_seconds += time.perf_counter() - stats.render_started
+        stats.render_started = None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context():
+        return
+    g.sql_statements = g.get('sql_statements', 0) + 1
+    stats = g.get('request_stats')
+    if stats is not None:
+        conn.info['query_started'] = time.perf_counter()
+        stats.statements[(statement, _hashable(parameters))] += 1
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('query_started', None)
+    if started is not None and has_request_context():
+        stats = g.get('request_stats')
+        if stats is not None:
+            stats.sql_seconds += time.perf_counter() - started
+
+
+def _hashable(parameters):
+    if isinstance(parameters, dict):
+        return tuple(sorted((k, repr(v)) for k, v in parameters.items()))
+    if isinstance(parameters, (list, tuple)):
+        return tuple(repr(p) for p in parameters)
+    return repr(parameters)
@@ -1,8 +1,9 @@
 import os
+import re
 from datetime import datetime
 from enum import Enum
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
+from sqlalchemy.exc import IntegrityError
 
 from . import db
 
@@ -33,10 +34,14 @@ class User(UserMixin, db.Model):
     collections = db.relationship('Collection', backref='owner', lazy=True, cascade='all, delete-orphan')
 
     def set_password(self, password: str):
-        self.password_hash = generate_password_hash(password)
+        from app.auth.hashing import hash_password
+
+        self.password_hash = hash_password(password)
 
     def check_password(self, password: str) -> bool:
-        return check_password_hash(self.password_hash, password)
+        from app.auth.hashing import verify_password
+
+        return verify_password(self.password_hash, password)
 
     @property
     def is_admin(self) -> bool:
@@ -59,11 +64,16 @@ class User(UserMixin, db.Model):
 
 class Collection(db.Model):
     __tablename__ = 'collection'
+    # list_collections filters by owner and sorts by date or name
+    __table_args__ = (
+        db.Index('ix_collection_user_created', 'user_id', 'created_at'),
+        db.Index('ix_collection_user_name', 'user_id', 'name'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     is_public = db.Column(db.Boolean, nullable=False, default=False)
     created_at = db.Column(db.DateTime, default=utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=utcnow, onupdate=utcnow, nullable=False)
@@ -87,6 +97,13 @@ class Collection(db.Model):
 
 class Resource(db.Model):
     __tablename__ = 'resource'
+    # one index per list_resources sort, each ending in id for the keyset cursor; updated_at serves delta sync
+    __table_args__ = (
+        db.Index('ix_resource_collection_created', 'collection_id', 'created_at', 'id'),
+        db.Index('ix_resource_collection_title', 'collection_id', 'title', 'id'),
+        db.Index('ix_resource_collection_status', 'collection_id', 'status', 'id'),
+        db.Index('ix_resource_collection_updated', 'collection_id', 'updated_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(300), nullable=False, index=True)
@@ -94,14 +111,44 @@ class Resource(db.Model):
     url = db.Column(db.String(1000), nullable=True)
     status = db.Column(db.Enum(StatusEnum), nullable=False, default=StatusEnum.NOT_STARTED)
     last_read_date = db.Column(db.DateTime, nullable=True)
-    collection_id = db.Column(db.Integer, db.ForeignKey('collection.id'), nullable=False, index=True)
+    collection_id = db.Column(db.Integer, db.ForeignKey('collection.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=utcnow, onupdate=utcnow, nullable=False)
 
+    author_links = db.relationship('ResourceAuthor', order_by='ResourceAuthor.position', lazy='selectin',
+                                   cascade='all, delete-orphan')
+    enrichment = db.relationship('ResourceMetadata', uselist=False, lazy='selectin', cascade='all, delete-orphan')
+    enrichment_jobs = db.relationship('EnrichmentJob', lazy='dynamic', cascade='all, delete-orphan',
+                                      passive_deletes=True)
+
     def authors_list(self):
-        if not self.authors:
-            return []
-        return [a.strip() for a in self.authors.split(',') if a.strip()]
+        if self.author_links:
+            return [link.author.name for link in self.author_links]
+        # rows written before the author table existed and not yet backfilled
+        return split_authors(self.authors)
+
+    def set_authors(self, authors, resolved=None):
+        """Store the comma-separated authors string and sync the normalized author rows
+
+        ``resolved`` may carry a prefetched Author.resolve() map so bulk writers
+        look authors up once per batch rather than once per resource.
+        """
+        self.authors = authors
+        names = {}
+        for name in split_authors(authors):
+            names.setdefault(Author.normalize(name), name)
+        if resolved is None:
+            resolved = Author.resolve(names.values())
+        existing = {link.author_id: link for link in self.author_links if link.author_id is not None}
+        links = []
+        for position, key in enumerate(names):
+            author = resolved[key]
+            link = existing.get(author.id) if author.id is not None else None
+            if link is None:
+                link = ResourceAuthor(author=author)
+            link.position = position
+            links.append(link)
+        self.author_links = links
 
     # allow setting status via string helper
     def set_status(self, status_str):
@@ -124,12 +171,243 @@ class Resource(db.Model):
             'collection_id': self.collection_id,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'metadata': self.enrichment.to_dict() if self.enrichment else None,
         }
 
     def __repr__(self):
         return f'<Resource {self.title}>'
 
 
+def split_authors(authors):
+    if not authors:
+        return []
+    return [a.strip() for a in authors.split(',') if a.strip()]
+
+
+def insert_missing(table, rows, unique):
+    """INSERT rows into table, skipping any that collide on the unique columns (a concurrent writer got there first)"""
+    if not rows:
+        return
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        db.session.execute(insert(table).on_conflict_do_nothing(index_elements=unique), rows)
+        return
+    for row in rows:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert().values(**row))
+        except IntegrityError:
+            pass
+
+
+class Author(db.Model):
+    __tablename__ = 'author'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(500), nullable=False)
+    # case- and whitespace-insensitive form used for equality and prefix lookups
+    name_key = db.Column(db.String(500), nullable=False, unique=True, index=True)
+    created_at = db.Column(db.DateTime, default=utcnow, nullable=False)
+
+    @staticmethod
+    def normalize(name):
+        return ' '.join(name.split()).casefold()
+
+    @classmethod
+    def resolve(cls, names):
+        """Map the normalized key of each name to an Author, creating the missing ones in the session"""
+        wanted = {}
+        for name in names:
+            wanted.setdefault(cls.normalize(name), ' '.join(name.split()))
+        if not wanted:
+            return {}
+        found = {a.name_key: a for a in cls.query.filter(cls.name_key.in_(list(wanted)))}
+        missing = [key for key in wanted if key not in found]
+        if missing:
+            # another request may be adding the same author right now: let the unique key pick
+            # one row and read back whichever won, instead of failing the commit
+            now = utcnow()
+            insert_missing(cls.__table__, [{'name': wanted[key], 'name_key': key, 'created_at': now}
+                                           for key in missing], ['name_key'])
+            created = cls.query.filter(cls.name_key.in_(missing)).all()
+            insert_missing(AuthorToken.__table__, [{'author_id': a.id, 'token': token} for a in created
+                                                   for token in AuthorToken.words(a.name_key)], ['author_id', 'token'])
+            found.update((a.name_key, a) for a in created)
+        return found
+
+    @classmethod
+    def prefix_filter(cls, text, column=None):
+        """Condition on column (default Author.id): the author has a word starting with each word of text
+
+        ``smi`` matches "John Smith" and ``ada lov`` matches "Ada Lovelace"; every
+        word is an index range scan on ``author_token``, whose tokens compare in
+        code point order on every backend.
+        """
+        column = cls.id if column is None else column
+        words = AuthorToken.words(cls.normalize(text))
+        if not words:
+            return db.false()
+        return db.and_(*(column.in_(db.select(AuthorToken.author_id)
+                                    .where(AuthorToken.token >= word, AuthorToken.token < _prefix_end(word)))
+                         for word in words))
+
+    def __repr__(self):
+        return f'<Author {self.name}>'
+
+
+def _prefix_end(word):
+    """The least string above every string that starts with word, in code point (binary, "C") order"""
+    while word:
+        last = ord(word[-1]) + 1
+        if 0xD800 <= last <= 0xDFFF:
+            last = 0xE000  # surrogates never occur in stored text
+        if last <= 0x10FFFF:
+            return word[:-1] + chr(last)
+        word = word[:-1]
+    raise ValueError('no string follows every string with this prefix')
+
+
+class AuthorToken(db.Model):
+    """One word of an author's name key, so filters can match any word by prefix"""
+    __tablename__ = 'author_token'
+    __table_args__ = (
+        db.Index('ix_author_token_token', 'token', 'author_id'),
+    )
+
+    author_id = db.Column(db.Integer, db.ForeignKey('author.id', ondelete='CASCADE'), primary_key=True)
+    # prefix ranges need code point order; SQLite compares that way already (BINARY)
+    token = db.Column(db.String(500).with_variant(db.String(500, collation='C'), 'postgresql'), primary_key=True)
+
+    @staticmethod
+    def words(name_key):
+        # must match the backfill in migration 0009
+        return list(dict.fromkeys(re.findall(r'\w+', name_key)))
+
+
+class ResourceAuthor(db.Model):
+    __tablename__ = 'resource_author'
+    __table_args__ = (
+        db.Index('ix_resource_author_author_id', 'author_id', 'resource_id'),
+        # authors of a page of resources, in display order
+        db.Index('ix_resource_author_resource_position', 'resource_id', 'position', 'author_id'),
+    )
+
+    resource_id = db.Column(db.Integer, db.ForeignKey('resource.id', ondelete='CASCADE'), primary_key=True)
+    author_id = db.Column(db.Integer, db.ForeignKey('author.id'), primary_key=True)
+    position = db.Column(db.Integer, nullable=False, default=0)
+
+    author = db.relationship('Author', lazy='joined')
+
+
+class ResourceMetadata(db.Model):
+    """Canonical bibliographic data found for a resource by the enrichment worker"""
+    __tablename__ = 'resource_metadata'
+
+    resource_id = db.Column(db.Integer, db.ForeignKey('resource.id', ondelete='CASCADE'), primary_key=True)
+    canonical_title = db.Column(db.String(300), nullable=True)
+    normalized_title = db.Column(db.String(300), nullable=True, index=True)
+    isbn = db.Column(db.String(20), nullable=True, index=True)
+    publish_year = db.Column(db.Integer, nullable=True)
+    source = db.Column(db.String(50), nullable=False, default='openlibrary')
+    fetched_at = db.Column(db.DateTime, default=utcnow, nullable=False)
+
+    def to_dict(self):
+        return {
+            'canonical_title': self.canonical_title,
+            'normalized_title': self.normalized_title,
+            'isbn': self.isbn,
+            'publish_year': self.publish_year,
+            'source': self.source,
+            'fetched_at': self.fetched_at.isoformat() if self.fetched_at else None,
+        }
+
+
+class EnrichmentJob(db.Model):
+    """Queue entry asking the enrichment worker to look a resource up"""
+    __tablename__ = 'enrichment_job'
+    __table_args__ = (
+        db.Index('ix_enrichment_job_state_available', 'state', 'available_at'),
+    )
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    NO_MATCH = 'no_match'
+    FAILED = 'failed'
+    STATES = (PENDING, RUNNING, DONE, NO_MATCH, FAILED)
+
+    id = db.Column(db.Integer, primary_key=True)
+    resource_id = db.Column(db.Integer, db.ForeignKey('resource.id', ondelete='CASCADE'), nullable=False, index=True)
+    state = db.Column(db.String(16), nullable=False, default=PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.String(500), nullable=True)
+    claim_token = db.Column(db.String(32), nullable=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    available_at = db.Column(db.DateTime, default=utcnow, nullable=False)
+    created_at = db.Column(db.DateTime, default=utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=utcnow, onupdate=utcnow, nullable=False)
+
+
+class StatusEvent(db.Model):
+    """One status transition of a resource; the append-only source of the reading statistics"""
+    __tablename__ = 'status_event'
+    __table_args__ = (
+        db.Index('ix_status_event_user_occurred', 'user_id', 'occurred_at'),
+        db.Index('ix_status_event_resource_occurred', 'resource_id', 'occurred_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    # history outlives the resource it describes
+    resource_id = db.Column(db.Integer, db.ForeignKey('resource.id', ondelete='SET NULL'), nullable=True)
+    collection_id = db.Column(db.Integer, nullable=True)
+    from_status = db.Column(db.Enum(StatusEnum), nullable=True)
+    to_status = db.Column(db.Enum(StatusEnum), nullable=False)
+    # seconds the resource spent in from_status before this transition
+    seconds_in_previous = db.Column(db.Integer, nullable=False, default=0)
+    occurred_at = db.Column(db.DateTime, default=utcnow, nullable=False)
+
+
+class DailyStatusRollup(db.Model):
+    """Per-user, per-day, per-status totals maintained alongside every StatusEvent"""
+    __tablename__ = 'status_daily_rollup'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.Enum(StatusEnum), primary_key=True)
+    entered = db.Column(db.Integer, nullable=False, default=0)
+    exited = db.Column(db.Integer, nullable=False, default=0)
+    # total time spent in this status by the resources that left it on this day
+    seconds_in_status = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class DataVersion(db.Model):
+    """Change counter per scope (``collection:<id>``, ``user:<id>``), bumped on every flush that touches it"""
+    __tablename__ = 'data_version'
+
+    scope = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=utcnow, nullable=False)
+
+
+class ResourceTombstone(db.Model):
+    """A resource that left a collection (deleted or moved out), so delta sync can report the removal"""
+    __tablename__ = 'resource_tombstone'
+    __table_args__ = (
+        db.Index('ix_resource_tombstone_collection_deleted', 'collection_id', 'deleted_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    # no foreign keys: a tombstone outlives its resource
+    resource_id = db.Column(db.Integer, nullable=False)
+    collection_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=utcnow, nullable=False)
+
+
 def create_admin_if_missing(app):
     """Create a default admin user if environment variables ADMIN_EMAIL and ADMIN_PASSWORD are set and no admin exists.
 
@@ -151,6 +429,8 @@ def create_admin_if_missing(app):
                 if existing_admin.role != 'admin':
                     existing_admin.role = 'admin'
                     db.session.commit()
+                    from app.auth.identity import invalidate_user
+                    invalidate_user(existing_admin.id)
                 return
 
             # Only create admin if there are no users at all or admin does not exist
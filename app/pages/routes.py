@@ -1,11 +1,29 @@
-from flask import Blueprint, render_template, redirect, url_for, flash
+from flask import Blueprint, render_template, redirect, url_for, flash, current_app, request
 from flask_login import login_required, current_user
+from markupsafe import Markup
 from app.utils import validate_id, validate_ownership
 from app.models import Collection, Resource
+from app.collections.routes import changes_json, collection_json, collections_json
+from app.resources.routes import resource_json
 
 pages_bp = Blueprint('pages', __name__)
 
 
+def _embedded(build, *args):
+    """API JSON for a page to start from instead of fetching it, ready for a <script type="application/json">
+
+    The bodies come from the API's own builders (and response cache), so the
+    page sees exactly what the first fetch would have returned. Returns None,
+    and the page fetches as before, when EMBED_INITIAL_DATA is off or the page
+    URL carries a query string the page's filter controls would not reflect.
+    """
+    if not current_app.config.get('EMBED_INITIAL_DATA', True) or request.args:
+        return None
+    # "</script>" must not end the element early; JSON allows these escapes inside strings
+    body = build(*args).replace('<', '\\u003c').replace('>', '\\u003e').replace('&', '\\u0026')
+    return Markup(body)
+
+
 @pages_bp.route('/login')
 def login_page():
     return render_template('login.html')
@@ -52,7 +70,7 @@ def public_faq_page():
 @pages_bp.route('/collections')
 @login_required
 def collections_page():
-    return render_template('collections.html')
+    return render_template('collections.html', initial_collections=_embedded(collections_json))
 
 
 @pages_bp.route('/collections/new')
@@ -67,10 +85,12 @@ def collection_detail_page(cid):
     try:
         cid = validate_id(cid, "Collection ID")
         collection = validate_ownership(Collection, cid)
-        return render_template('collection_detail.html')
     except Exception as e:
         flash('Collection not found or access denied.', 'error')
         return redirect(url_for('pages.collections_page'))
+    return render_template('collection_detail.html',
+                           initial_collection=_embedded(collection_json, collection),
+                           initial_changes=_embedded(changes_json, collection))
 
 
 @pages_bp.route('/collections/<int:cid>/resources/new')
@@ -97,10 +117,10 @@ def edit_collection_page(cid):
     try:
         cid = validate_id(cid, "Collection ID")
         collection = validate_ownership(Collection, cid)
-        return render_template('edit_collection.html')
     except Exception as e:
         flash('Collection not found or access denied.', 'error')
         return redirect(url_for('pages.collections_page'))
+    return render_template('edit_collection.html', initial_collection=_embedded(collection_json, collection))
 
 
 @pages_bp.route('/resources/<int:rid>/edit')
@@ -109,7 +129,7 @@ def edit_resource_page(rid):
     try:
         rid = validate_id(rid, "Resource ID")
         resource = validate_ownership(Resource, rid)
-        return render_template('edit_resource.html')
     except Exception as e:
         flash('Resource not found or access denied.', 'error')
         return redirect(url_for('pages.collections_page'))
+    return render_template('edit_resource.html', initial_resource=_embedded(resource_json, resource))
@@ -0,0 +1,142 @@
+"""
+Query-plan regression check
+
+Drives the read endpoints through the test client against a small seeded
+database, records every SELECT they issue and asks the database how it would
+run each one (``EXPLAIN QUERY PLAN`` on SQLite, ``EXPLAIN`` on PostgreSQL).
+A statement fails the check when its plan reads a whole ``resource`` /
+``collection``-sized table or sorts rows in a temporary B-tree instead of
+walking an index in order. tests/test_query_plans.py runs every scenario
+under pytest; ``flask --app run check-query-plans`` is a shortcut for it.
+"""
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+# (name, url, allowed problems); the placeholders are filled in from the seed data
+SCENARIOS = [
+    ('collections by date', '/api/collections', ()),
+    ('collections by name', '/api/collections?sort=name', ()),
+    ('collection detail', '/api/collections/{cid}', ()),
+    ('resources by date', '/api/collections/{cid}/resources', ()),
+    ('resources by date, page 2', '/api/collections/{cid}/resources?limit=5&cursor={cursor_created_at}', ()),
+    ('resources by title', '/api/collections/{cid}/resources?sort=title', ()),
+    ('resources by title, page 2', '/api/collections/{cid}/resources?sort=title&limit=5&cursor={cursor_title}', ()),
+    ('resources by status', '/api/collections/{cid}/resources?sort=status', ()),
+    ('resources by status, page 2', '/api/collections/{cid}/resources?sort=status&limit=5&cursor={cursor_status}', ()),
+    ('resources filtered by status', '/api/collections/{cid}/resources?status=Completed', ()),
+    ('resources filtered by author', '/api/collections/{cid}/resources?author=ada', ()),
+    ('resources sparse fields', '/api/collections/{cid}/resources?fields=id,title,status', ()),
+    # bm25 / ts_rank is computed per match, so relevance order always needs a sort
+    ('resources by relevance', '/api/collections/{cid}/resources?q=notes', ('sort',)),
+    ('resource detail', '/api/resources/{rid}', ()),
+    ('resource changes, full', '/api/collections/{cid}/changes', ()),
+    ('resource changes since', '/api/collections/{cid}/changes?since={since}', ()),
+]
+
+# single-row selects, FTS virtual tables (searched through their own index) and the
+# schema catalog, read once per process to pick the search backend
+SCAN_ALLOWED = ('CONSTANT ROW', 'VIRTUAL TABLE', 'sqlite_master')
+
+
+def sqlite_problems(plan):
+    problems = []
+    for line in plan:
+        if line.startswith('SCAN ') and not any(ok in line for ok in SCAN_ALLOWED):
+            problems.append(('scan', line))
+        elif 'USE TEMP B-TREE' in line:
+            problems.append(('sort', line))
+    return problems
+
+
+def postgres_problems(plan):
+    problems = []
+    for line in plan:
+        node = line.strip().lstrip('->').strip()
+        if node.startswith('Seq Scan'):
+            problems.append(('scan', node))
+        elif node.startswith(('Sort ', 'Incremental Sort')):
+            problems.append(('sort', node))
+    return problems
+
+
+def explain(connection, statement, parameters):
+    if connection.dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+        plan = [row[-1] for row in rows]
+        return plan, sqlite_problems(plan)
+    if connection.dialect.name == 'postgresql':
+        # make the planner prefer any usable index so tiny seed tables do not hide a missing one
+        connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        rows = connection.exec_driver_sql('EXPLAIN ' + statement, parameters).all()
+        plan = [row[0] for row in rows]
+        return plan, postgres_problems(plan)
+    raise RuntimeError(f'No query-plan check for the {connection.dialect.name} dialect')
+
+
+@contextmanager
+def _recording(engine):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'WITH')) and 'FROM' in statement.upper().split():
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+def seed(client):
+    """Register and log in a user on client, create a few collections and return the URL placeholders"""
+    email, password = 'plans@example.com', 'QueryPlan1'
+    client.post('/api/auth/register', json={'email': email, 'password': password})
+    response = client.post('/api/auth/login', json={'email': email, 'password': password})
+    if response.status_code != 200:
+        raise RuntimeError(f'could not log in the query-plan user: {response.get_json()}')
+
+    cid = None
+    rid = None
+    statuses = ('Not Started', 'In Progress', 'Paused', 'Completed')
+    for n in range(3):
+        col = client.post('/api/collections', json={'name': f'Plans {n}', 'description': 'notes'}).get_json()
+        cid = col['collection']['id']
+        for i in range(12):
+            res = client.post(f'/api/collections/{cid}/resources', json={
+                'title': f'Lecture notes {n}-{i}',
+                'authors': 'Ada Lovelace, Charles Babbage' if i % 2 else 'Grace Hopper',
+                'status': statuses[i % len(statuses)],
+            }).get_json()
+            rid = res['resource']['id']
+    values = {'cid': cid, 'rid': rid}
+    for sort in ('created_at', 'title', 'status'):
+        page = client.get(f'/api/collections/{cid}/resources?sort={sort}&limit=5').get_json()
+        values[f'cursor_{sort}'] = page['next_cursor']
+    values['since'] = client.get(f'/api/collections/{cid}/changes?limit=5').get_json()['cursor']
+    return values
+
+
+def check_scenario(engine, client, values, scenario):
+    """Request one scenario's URL with client and return a report entry per SELECT it issued"""
+    name, template, allowed = scenario
+    url = template.format(**values)
+    with _recording(engine) as statements:
+        response = client.get(url)
+    if response.status_code != 200:
+        return [{'scenario': name, 'url': url, 'statement': None, 'plan': [],
+                 'problems': [('status', f'HTTP {response.status_code}')]}]
+    report = []
+    with engine.connect() as connection:
+        for statement, parameters in statements:
+            with connection.begin():
+                plan, problems = explain(connection, statement, parameters)
+            report.append({
+                'scenario': name,
+                'url': url,
+                'statement': ' '.join(statement.split()),
+                'plan': plan,
+                'problems': [p for p in problems if p[0] not in allowed],
+            })
+    return report
@@ -0,0 +1,256 @@
+"""
+Streaming readers and writers for bulk resource import and export
+
+Every reader takes a text stream and yields ``(line, record, error)`` tuples one
+entry at a time, so an import never holds the whole upload in memory. A record
+is a dict limited to the fields the resource API accepts; a malformed entry
+yields an error message instead and the reader carries on with the next one.
+
+Writers go the other way: they take an iterable of export rows and yield text
+chunks that can be handed straight to a streaming response. Their output is
+accepted by the matching reader, so an export can be re-imported.
+"""
+import csv
+import io
+import json
+import re
+
+from app.models import split_authors
+
+RESOURCE_FIELDS = ('title', 'authors', 'url', 'status')
+
+# aliases found in reference-manager exports
+FIELD_ALIASES = {'author': 'authors', 'link': 'url'}
+
+
+def _pick_fields(raw):
+    record = {}
+    for key, value in raw.items():
+        if key is None:
+            continue
+        name = key.strip().lower()
+        name = FIELD_ALIASES.get(name, name)
+        if name in RESOURCE_FIELDS and name not in record:
+            record[name] = value
+    return record
+
+
+def read_csv(stream):
+    reader = csv.DictReader(stream)
+    for raw in reader:
+        if not any((v or '').strip() for v in raw.values() if isinstance(v, str)):
+            continue  # blank line
+        yield reader.line_num, _pick_fields(raw), None
+
+
+def read_jsonl(stream):
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            raw = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(raw, dict):
+            yield line_no, None, 'Each line must be a JSON object'
+            continue
+        yield line_no, _pick_fields(raw), None
+
+
+_ENTRY_START = re.compile(r'@\s*(\w+)\s*[{(]')
+_SKIPPED_ENTRIES = {'comment', 'preamble', 'string'}
+
+
+def read_bibtex(stream):
+    """Yield one record per @entry; @comment/@preamble/@string blocks are skipped"""
+    buffer = []
+    depth = 0
+    start_line = 0
+    opener = closer = None
+    for line_no, line in enumerate(stream, start=1):
+        if depth == 0:
+            match = _ENTRY_START.search(line)
+            if not match:
+                continue
+            line = line[match.start():]
+            start_line = line_no
+            opener = match.group(0)[-1]
+            closer = '}' if opener == '{' else ')'
+            buffer = []
+        end = None
+        for i, ch in enumerate(line):
+            if ch == opener:
+                depth += 1
+            elif ch == closer:
+                depth -= 1
+                if depth == 0:
+                    end = i
+                    break
+        if end is None:
+            buffer.append(line)
+            continue
+        buffer.append(line[:end])
+        yield _parse_bibtex_entry(start_line, ''.join(buffer))
+        buffer = []
+    if depth:
+        yield start_line, None, 'Unterminated BibTeX entry'
+
+
+def _parse_bibtex_entry(line_no, text):
+    match = _ENTRY_START.match(text)
+    if match.group(1).lower() in _SKIPPED_ENTRIES:
+        return line_no, None, None
+    # drop the citation key
+    _, sep, body = text[match.end():].partition(',')
+    if not sep:
+        return line_no, None, 'BibTeX entry has no fields'
+    try:
+        fields = _parse_bibtex_fields(body)
+    except ValueError as e:
+        return line_no, None, f'Invalid BibTeX entry: {e}'
+
+    record = {}
+    if 'title' in fields:
+        record['title'] = fields['title']
+    if 'author' in fields:
+        record['authors'] = ', '.join(_bibtex_name(n) for n in re.split(r'\s+and\s+', fields['author']) if n.strip())
+    if 'url' in fields:
+        record['url'] = fields['url']
+    elif 'doi' in fields:
+        record['url'] = 'https://doi.org/' + fields['doi']
+    if 'status' in fields:
+        record['status'] = fields['status']
+    return line_no, record, None
+
+
+def _parse_bibtex_fields(body):
+    fields = {}
+    pos = 0
+    length = len(body)
+    while pos < length:
+        eq = body.find('=', pos)
+        if eq == -1:
+            if body[pos:].strip(' \t\r\n,'):
+                raise ValueError('expected "field = value"')
+            break
+        name = body[pos:eq].strip(' \t\r\n,').lower()
+        pos = eq + 1
+        parts = []
+        while True:
+            while pos < length and body[pos].isspace():
+                pos += 1
+            if pos >= length:
+                raise ValueError(f'missing value for {name}')
+            if body[pos] == '{':
+                end = _matching_brace(body, pos)
+                parts.append(body[pos + 1:end])
+                pos = end + 1
+            elif body[pos] == '"':
+                end = body.find('"', pos + 1)
+                if end == -1:
+                    raise ValueError(f'unterminated value for {name}')
+                parts.append(body[pos + 1:end])
+                pos = end + 1
+            else:
+                end = pos
+                while end < length and body[end] not in ',#' and not body[end].isspace():
+                    end += 1
+                parts.append(body[pos:end])
+                pos = end
+            while pos < length and body[pos].isspace():
+                pos += 1
+            if pos < length and body[pos] == '#':
+                pos += 1
+                continue
+            break
+        if pos < length and body[pos] == ',':
+            pos += 1
+        value = ' '.join(''.join(parts).replace('{', '').replace('}', '').split())
+        if name:
+            fields[name] = value
+    return fields
+
+
+def _matching_brace(text, start):
+    depth = 0
+    for i in range(start, len(text)):
+        if text[i] == '{':
+            depth += 1
+        elif text[i] == '}':
+            depth -= 1
+            if depth == 0:
+                return i
+    raise ValueError('unbalanced braces')
+
+
+def _bibtex_name(name):
+    # "Knuth, Donald E." -> "Donald E. Knuth"; authors are stored comma-separated
+    name = name.strip()
+    if ',' in name:
+        last, _, first = name.partition(',')
+        name = f'{first.strip()} {last.strip()}'.strip()
+    return name
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+    'bibtex': read_bibtex,
+}
+
+CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'jsonl',
+    'application/jsonl': 'jsonl',
+    'application/x-jsonlines': 'jsonl',
+    'application/x-bibtex': 'bibtex',
+    'text/x-bibtex': 'bibtex',
+}
+
+
+EXPORT_FIELDS = ('id', 'collection_id', 'collection', 'title', 'authors', 'url', 'status',
+                 'last_read_date', 'created_at', 'updated_at')
+
+
+def write_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def write_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _bibtex_value(value):
+    # braces would unbalance the entry; everything else is kept verbatim
+    return str(value).replace('{', '(').replace('}', ')')
+
+
+def write_bibtex(rows):
+    for row in rows:
+        fields = [('title', row['title'])]
+        if row.get('authors'):
+            fields.append(('author', ' and '.join(split_authors(row['authors']))))
+        if row.get('url'):
+            fields.append(('url', row['url']))
+        fields.append(('status', row['status']))
+        if row.get('collection'):
+            fields.append(('keywords', row['collection']))
+        body = ',\n'.join(f'  {name} = {{{_bibtex_value(value)}}}' for name, value in fields)
+        yield f"@misc{{resource{row['id']},\n{body}\n}}\n\n"
+
+
+WRITERS = {
+    'jsonl': (write_jsonl, 'application/x-ndjson', 'jsonl'),
+    'csv': (write_csv, 'text/csv', 'csv'),
+    'bibtex': (write_bibtex, 'application/x-bibtex', 'bib'),
+}
@@ -1,8 +1,11 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_login import login_required, current_user
 from app import db
-from app.models import Resource, Collection, StatusEnum
-from app.utils import validate_id, validate_ownership, validate_json_input, get_validated_json, validate_enum_value
+from app.models import Author, Resource, Collection, StatusEnum, split_authors
+from app.utils import validate_id, validate_ownership, validate_json_input, get_validated_json
+from app.resources.service import clean_resource_fields, ResourceValidationError
+from app.stats.service import record_status_changes
+from app.versioning import conditional_get, check_if_match, set_validators, resource_validators
 
 resources_bp = Blueprint('resources', __name__, url_prefix='/api/resources')
 
@@ -15,52 +18,42 @@ resources_bp = Blueprint('resources', __name__, url_prefix='/api/resources')
 def get_resource(rid):
     rid = validate_id(rid, "Resource ID")
     res = validate_ownership(Resource, rid)
+    not_modified = conditional_get(*resource_validators(res))
+    if not_modified:
+        return not_modified
     return jsonify({'resource': res.to_dict()}), 200
 
 
+def resource_json(res):
+    """The body GET /api/resources/<rid> returns, for pages to embed"""
+    return current_app.json.dumps({'resource': res.to_dict()})
+
+
 @resources_bp.route('/<int:rid>', methods=['PUT'])
 @login_required
 @validate_json_input(optional_fields=['title', 'authors', 'url', 'status'])
 def update_resource(rid):
     rid = validate_id(rid, "Resource ID")
     res = validate_ownership(Resource, rid)
+    precondition_failed = check_if_match(resource_validators(res)[0])
+    if precondition_failed:
+        return precondition_failed
     data = get_validated_json()
-    
-    if 'title' in data:
-        title = data['title'].strip()
-        if not title:
-            return jsonify({'error': 'Title cannot be empty'}), 400
-        if len(title) > 300:
-            return jsonify({'error': 'Title too long (max 300 characters)'}), 400
-        res.title = title
-    
-    if 'authors' in data:
-        authors = data['authors'].strip()
-        if len(authors) > 500:
-            return jsonify({'error': 'Authors field too long (max 500 characters)'}), 400
-        res.authors = authors
-    
-    if 'url' in data:
-        url = data['url'].strip()
-        if len(url) > 1000:
-            return jsonify({'error': 'URL too long (max 1000 characters)'}), 400
-        
-        # Validate URL format if provided
-        if url:
-            import re
-            url_pattern = r'^https?://.+'
-            if not re.match(url_pattern, url, re.IGNORECASE):
-                # Try to fix common URL issues
-                if not url.startswith(('http://', 'https://')):
-                    url = 'https://' + url
-        res.url = url
-    
-    if 'status' in data:
-        status_val = validate_enum_value(data['status'], StatusEnum, 'status')
-        if status_val:
-            res.status = status_val
+
+    try:
+        fields = clean_resource_fields(data, partial=True)
+    except ResourceValidationError as e:
+        return jsonify({'error': str(e)}), 400
+
+    old_status = res.status
+    if 'authors' in fields:
+        res.set_authors(fields.pop('authors'))
+    for name, value in fields.items():
+        setattr(res, name, value)
+    record_status_changes([(res, old_status)], current_user.id)
     
     db.session.commit()
+    set_validators(*resource_validators(res))
     return jsonify({'resource': res.to_dict()}), 200
 
 
@@ -69,7 +62,115 @@ def update_resource(rid):
 def delete_resource(rid):
     rid = validate_id(rid, "Resource ID")
     res = validate_ownership(Resource, rid)
+    precondition_failed = check_if_match(resource_validators(res)[0])
+    if precondition_failed:
+        return precondition_failed
     
     db.session.delete(res)
     db.session.commit()
     return jsonify({'message': 'deleted'}), 200
+
+
+BATCH_PATCH_FIELDS = ('status', 'authors', 'collection_id')
+
+
+def _batch_ids(data):
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not ids:
+        return None, 'ids must be a non-empty list of resource IDs'
+    max_ids = current_app.config.get('BATCH_MAX_IDS', 500)
+    if len(ids) > max_ids:
+        return None, f'Too many ids (max {max_ids} per request)'
+    clean = []
+    for rid in ids:
+        if isinstance(rid, bool) or not isinstance(rid, int) or rid <= 0:
+            return None, 'ids must be a non-empty list of resource IDs'
+        if rid not in clean:
+            clean.append(rid)
+    return clean, None
+
+
+def _owned_resources(ids):
+    """Load every listed resource the current user owns with a single joined query"""
+    rows = (Resource.query
+            .join(Collection, Collection.id == Resource.collection_id)
+            .filter(Resource.id.in_(ids), Collection.user_id == current_user.id)
+            .all())
+    return {r.id: r for r in rows}
+
+
+@resources_bp.route('/batch/update', methods=['POST'])
+@login_required
+@validate_json_input(required_fields=['ids', 'patch'])
+def batch_update_resources():
+    data = get_validated_json()
+    ids, error = _batch_ids(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    patch = data['patch']
+    if not isinstance(patch, dict) or not patch:
+        return jsonify({'error': f"patch must be an object with any of: {', '.join(BATCH_PATCH_FIELDS)}"}), 400
+    unknown = [k for k in patch if k not in BATCH_PATCH_FIELDS]
+    if unknown:
+        return jsonify({'error': f"Unsupported patch fields: {', '.join(unknown)}"}), 400
+
+    try:
+        fields = clean_resource_fields({k: v for k, v in patch.items() if k != 'collection_id'}, partial=True)
+    except ResourceValidationError as e:
+        return jsonify({'error': str(e)}), 400
+
+    target = None
+    if 'collection_id' in patch:
+        target_id = validate_id(patch['collection_id'], "Collection ID")
+        target = Collection.query.filter_by(id=target_id, user_id=current_user.id).first()
+        if not target:
+            return jsonify({'error': 'Target collection not found or access denied'}), 404
+
+    found = _owned_resources(ids)
+    resolved = None
+    if 'authors' in fields:
+        resolved = Author.resolve(split_authors(fields['authors']))
+
+    results = []
+    status_changes = []
+    for rid in ids:
+        res = found.get(rid)
+        if res is None:
+            results.append({'id': rid, 'outcome': 'not_found'})
+            continue
+        if 'status' in fields:
+            status_changes.append((res, res.status))
+            res.status = fields['status']
+        if 'authors' in fields:
+            res.set_authors(fields['authors'], resolved)
+        if target is not None:
+            res.collection_id = target.id
+        results.append({'id': rid, 'outcome': 'updated'})
+    record_status_changes(status_changes, current_user.id)
+
+    db.session.commit()
+    return jsonify({'results': results, 'updated': len(found), 'not_found': len(ids) - len(found)}), 200
+
+
+@resources_bp.route('/batch/delete', methods=['POST'])
+@login_required
+@validate_json_input(required_fields=['ids'])
+def batch_delete_resources():
+    data = get_validated_json()
+    ids, error = _batch_ids(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    found = _owned_resources(ids)
+    results = []
+    for rid in ids:
+        res = found.get(rid)
+        if res is None:
+            results.append({'id': rid, 'outcome': 'not_found'})
+            continue
+        db.session.delete(res)
+        results.append({'id': rid, 'outcome': 'deleted'})
+
+    db.session.commit()
+    return jsonify({'results': results, 'deleted': len(found), 'not_found': len(ids) - len(found)}), 200
@@ -0,0 +1,129 @@
+import re
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import db
+from app.models import Author, Resource, StatusEnum, split_authors
+from app.enrichment.worker import enqueue as enqueue_enrichment
+from app.versioning import touch_collections
+
+URL_PATTERN = re.compile(r'^https?://.+', re.IGNORECASE)
+
+
+class ResourceValidationError(ValueError):
+    """A resource field failed validation; the message is safe to return to the client"""
+
+
+def normalize_url(url):
+    # Try to fix common URL issues
+    if url and not URL_PATTERN.match(url) and not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    return url
+
+
+def _text(data, field, label):
+    value = data.get(field)
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise ResourceValidationError(f'{label} must be a string')
+    return value.strip()
+
+
+def clean_resource_fields(data, partial=False):
+    """Validate and normalize title/authors/url/status with the rules of the resource API
+
+    With partial=True only the fields present in data are checked (PUT semantics)
+    and an empty status leaves the current one untouched. Raises
+    ResourceValidationError with the same messages the routes have always used.
+    """
+    cleaned = {}
+
+    if not partial or 'title' in data:
+        title = _text(data, 'title', 'Title')
+        if not title:
+            raise ResourceValidationError('Title cannot be empty')
+        if len(title) > 300:
+            raise ResourceValidationError('Title too long (max 300 characters)')
+        cleaned['title'] = title
+
+    if not partial or 'authors' in data:
+        authors = _text(data, 'authors', 'Authors')
+        if len(authors) > 500:
+            raise ResourceValidationError('Authors field too long (max 500 characters)')
+        cleaned['authors'] = authors
+
+    if not partial or 'url' in data:
+        url = _text(data, 'url', 'URL')
+        if len(url) > 1000:
+            raise ResourceValidationError('URL too long (max 1000 characters)')
+        cleaned['url'] = normalize_url(url)
+
+    if not partial or 'status' in data:
+        status = data.get('status')
+        if status:
+            try:
+                cleaned['status'] = StatusEnum(status)
+            except (ValueError, TypeError):
+                valid_values = [e.value for e in StatusEnum]
+                raise ResourceValidationError(f"Invalid status. Valid values: {', '.join(valid_values)}")
+        elif not partial:
+            cleaned['status'] = StatusEnum.NOT_STARTED
+
+    return cleaned
+
+
+def import_resources(rows, collection_id, chunk_size, max_errors=1000):
+    """Validate and insert reader rows into a collection, committing every chunk_size resources
+
+    A bad row is reported and skipped; it never aborts the rest of the import.
+    Each chunk is written in a short transaction of its own once all of its rows
+    have been read, so no transaction (and no SQLite write lock) is open while
+    rows are still being read from the client; call with none open.
+    Returns a report with per-row errors (capped at max_errors entries).
+    """
+    report = {'imported': 0, 'failed': 0, 'errors': []}
+
+    def fail(line, message):
+        report['failed'] += 1
+        if len(report['errors']) < max_errors:
+            report['errors'].append({'line': line, 'error': message})
+
+    chunk = []
+    for line, record, error in rows:
+        if error:
+            fail(line, error)
+        elif record is not None:
+            try:
+                chunk.append((line, clean_resource_fields(record)))
+            except ResourceValidationError as e:
+                fail(line, str(e))
+        if len(chunk) >= chunk_size:
+            _save_chunk(chunk, collection_id, report, fail)
+            chunk = []
+    if chunk:
+        _save_chunk(chunk, collection_id, report, fail)
+
+    report['errors_truncated'] = report['failed'] > len(report['errors'])
+    return report
+
+
+def _save_chunk(chunk, collection_id, report, fail):
+    try:
+        resolved = Author.resolve(name for _, fields in chunk for name in split_authors(fields['authors']))
+        created = []
+        for _, fields in chunk:
+            res = Resource(title=fields['title'], url=fields['url'], status=fields['status'],
+                           collection_id=collection_id)
+            res.set_authors(fields['authors'], resolved)
+            db.session.add(res)
+            created.append(res)
+        enqueue_enrichment(created)
+        # the flush would bump it too; explicit, so moving the rows to bulk Core inserts cannot skip it
+        touch_collections([collection_id])
+        db.session.commit()
+        report['imported'] += len(chunk)
+    except SQLAlchemyError:
+        db.session.rollback()
+        for line, _ in chunk:
+            fail(line, 'Database error while saving this batch')
@@ -0,0 +1,133 @@
+"""
+Server-side cache for JSON list responses
+
+Entries are keyed by (user, endpoint, validator), where the validator is the
+ETag from app/versioning.py: it already folds in the collection or user
+version counter and a digest of the normalized query parameters. A write
+bumps the version, so the next request computes a different key and can
+never be served a stale body, whichever backend holds the entries and
+whichever worker made the write.
+
+On top of that, every entry is tagged with the scopes it was built from,
+and committed writes delete the entries of the scopes they touched, so
+superseded bodies leave memory right away instead of waiting for LRU
+eviction. The backend comes from ``RESPONSE_CACHE_BACKEND`` (see
+app/cache.py); ``RESPONSE_CACHE_SIZE = 0`` turns the cache off.
+"""
+import threading
+from collections import defaultdict
+
+from flask import current_app, request
+from flask_login import current_user
+
+from app import versioning
+from app.cache import make_backend
+
+
+class ResponseCache:
+
+    def __init__(self, backend, max_entry_bytes=262144, max_tags=None):
+        self.backend = backend
+        self.max_entry_bytes = max_entry_bytes
+        self.max_tags = max_tags or 2 * getattr(backend, 'maxsize', 4096)
+        self._tags = defaultdict(set)
+        self._tagged = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'too_large': 0, 'invalidated': 0}
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.stats[name] += n
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else None
+        if hasattr(self.backend, '__len__'):
+            stats['entries'] = len(self.backend)
+        return stats
+
+    def get(self, key):
+        body = self.backend.get(key)
+        self._count('hits' if body is not None else 'misses')
+        return body
+
+    def set(self, key, body, scopes):
+        if len(body) > self.max_entry_bytes:
+            self._count('too_large')
+            return
+        self.backend.set(key, body)
+        self._count('stores')
+        with self._lock:
+            if self._tagged >= self.max_tags:
+                # keys carry their version, so forgetting tags only delays reclaiming memory
+                self._tags.clear()
+                self._tagged = 0
+            for scope in scopes:
+                self._tags[scope].add(key)
+                self._tagged += 1
+
+    def invalidate(self, scopes):
+        keys = set()
+        with self._lock:
+            for scope in scopes:
+                tagged = self._tags.pop(scope, ())
+                self._tagged -= len(tagged)
+                keys.update(tagged)
+        for key in keys:
+            self.backend.delete(key)
+        if keys:
+            self._count('invalidated', len(keys))
+
+
+def cached_body(etag, scopes, build, endpoint=None):
+    """JSON text cached for this user/endpoint/validator, or build() serialized and cached; returns (body, status)
+
+    ``endpoint`` defaults to the current one; pages pass the API endpoint
+    whose body they embed, so both share one entry.
+    """
+    cache = current_app.extensions.get('response_cache')
+    if cache is None:
+        return current_app.json.dumps(build()) + '\n', None
+
+    key = f'{current_user.id}:{endpoint or request.endpoint}:{etag}'
+    body = cache.get(key)
+    status = 'HIT'
+    if body is None:
+        status = 'MISS'
+        body = current_app.json.dumps(build()) + '\n'
+        cache.set(key, body, scopes)
+    return body, status
+
+
+def cached_json(etag, scopes, build):
+    """Serve the JSON body cached for this user/endpoint/validator, or build(), cache and serve it"""
+    if current_app.extensions.get('response_cache') is None:
+        return current_app.json.response(build()), 200
+    body, status = cached_body(etag, scopes, build)
+    response = current_app.response_class(body, mimetype=current_app.json.mimetype)
+    response.headers['X-Cache'] = status
+    return response, 200
+
+
+def init_app(app):
+    size = app.config.get('RESPONSE_CACHE_SIZE', 1024)
+    if not size:
+        return
+    backend = make_backend(
+        app.config.get('RESPONSE_CACHE_BACKEND', 'memory'),
+        maxsize=size,
+        ttl=app.config.get('RESPONSE_CACHE_TTL', 300),
+        prefix='sutra:response:',
+    )
+    app.extensions['response_cache'] = ResponseCache(
+        backend, max_entry_bytes=app.config.get('RESPONSE_CACHE_MAX_ENTRY_BYTES', 262144))
+    versioning.on_commit(_invalidate)
+
+
+def _invalidate(scopes):
+    # sessions only commit inside an app context
+    cache = current_app.extensions.get('response_cache')
+    if cache is not None:
+        cache.invalidate(scopes)
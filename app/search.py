@@ -0,0 +1,189 @@
+"""
+Full-text search for resources and collections
+
+Each database dialect gets its own backend: SQLite uses external-content FTS5
+tables kept in sync by triggers, Postgres uses a generated ``tsvector`` column
+with a GIN index. Any other database (or a SQLite build without FTS5) falls
+back to the original ``ilike`` substring match so the ``q=`` contract holds
+everywhere.
+"""
+import re
+
+from flask import current_app
+from sqlalchemy import Float, Integer, bindparam, func, literal_column, or_, text
+
+# model table -> (indexed columns, bm25 weight per column)
+SEARCH_TABLES = {
+    'resource': (('title', 'authors'), (10.0, 5.0)),
+    'collection': (('name', 'description'), (10.0, 2.0)),
+}
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(q):
+    """Split a user query into index tokens; punctuation never reaches the match syntax"""
+    return _TOKEN_RE.findall(q.lower())[:16]
+
+
+class LikeBackend:
+    """Substring matching with ilike; no index and no relevance ranking"""
+
+    name = 'like'
+
+    def install(self, connection):
+        pass
+
+    def is_installed(self, connection):
+        return True
+
+    def search(self, query, model, q):
+        columns, _ = SEARCH_TABLES[model.__tablename__]
+        query = query.filter(or_(*[getattr(model, c).ilike(f'%{q}%') for c in columns]))
+        return query, None
+
+
+class SqliteFts5Backend(LikeBackend):
+    """External-content FTS5 tables ranked with bm25 (lower is better)"""
+
+    name = 'fts5'
+
+    def install(self, connection):
+        for table, (columns, _) in SEARCH_TABLES.items():
+            fts = f'{table}_fts'
+            exists = connection.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': fts}
+            ).first()
+            cols = ', '.join(columns)
+            new_cols = ', '.join(f'new.{c}' for c in columns)
+            old_cols = ', '.join(f'old.{c}' for c in columns)
+            connection.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                f"{cols}, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+            ))
+            connection.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+            ))
+            connection.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END"
+            ))
+            connection.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+                f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+            ))
+            if not exists:
+                # index rows that were written before the FTS table existed
+                connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+    def is_installed(self, connection):
+        names = [f'{table}_fts' for table in SEARCH_TABLES]
+        found = connection.execute(
+            text("SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name IN :names")
+            .bindparams(bindparam('names', expanding=True)), {'names': names}
+        ).scalar()
+        return found == len(names)
+
+    def search(self, query, model, q):
+        tokens = tokenize(q)
+        if not tokens:
+            return super().search(query, model, q)
+        table = model.__tablename__
+        _, weights = SEARCH_TABLES[table]
+        fts = f'{table}_fts'
+        # every token must match, each as a prefix so typeahead keeps working
+        match = ' '.join(f'"{t}"*' for t in tokens)
+        bm25_args = ', '.join(str(w) for w in weights)
+        hits = text(
+            f"SELECT rowid AS id, bm25({fts}, {bm25_args}) AS rank FROM {fts} WHERE {fts} MATCH :match"
+        ).bindparams(match=match).columns(id=Integer, rank=Float).subquery(f'{fts}_hits')
+        query = query.join(hits, hits.c.id == model.id)
+        return query, hits.c.rank
+
+
+class PostgresBackend(LikeBackend):
+    """Generated tsvector columns with GIN indexes, ranked with ts_rank_cd"""
+
+    name = 'tsvector'
+
+    def install(self, connection):
+        for table, (columns, _) in SEARCH_TABLES.items():
+            first, second = columns
+            connection.execute(text(
+                f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+                f"setweight(to_tsvector('simple', coalesce({first}, '')), 'A') || "
+                f"setweight(to_tsvector('simple', coalesce({second}, '')), 'B')) STORED"
+            ))
+            connection.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)"
+            ))
+
+    def is_installed(self, connection):
+        found = connection.execute(text(
+            "SELECT count(*) FROM information_schema.columns "
+            "WHERE table_name IN ('resource', 'collection') AND column_name = 'search_vector'"
+        )).scalar()
+        return found == len(SEARCH_TABLES)
+
+    def search(self, query, model, q):
+        tokens = tokenize(q)
+        if not tokens:
+            return super().search(query, model, q)
+        tsquery = func.to_tsquery('simple', ' & '.join(f'{t}:*' for t in tokens))
+        vector = literal_column(f'{model.__tablename__}.search_vector')
+        query = query.filter(vector.op('@@')(tsquery))
+        # negated so that, as with bm25, ascending order puts the best match first
+        return query, -func.ts_rank_cd(vector, tsquery)
+
+
+_BACKENDS = {
+    'sqlite': SqliteFts5Backend,
+    'postgresql': PostgresBackend,
+}
+
+
+def install(connection):
+    """Create or upgrade the search index for the connection's dialect (run from a migration)
+
+    Returns the backend that will serve searches. A SQLite build without FTS5
+    keeps the ilike fallback rather than failing the migration.
+    """
+    backend = _BACKENDS.get(connection.dialect.name, LikeBackend)()
+    try:
+        with connection.begin_nested():
+            backend.install(connection)
+    except Exception:
+        backend = LikeBackend()
+    return backend
+
+
+def detect(engine):
+    """The dialect's backend if its index has been installed by the migrations, otherwise ilike"""
+    backend = _BACKENDS.get(engine.dialect.name, LikeBackend)()
+    try:
+        with engine.connect() as connection:
+            if backend.is_installed(connection):
+                return backend
+    except Exception:
+        pass
+    return LikeBackend()
+
+
+def get_backend():
+    # resolved on first use so that starting a worker runs no schema queries
+    backend = current_app.extensions.get('search')
+    if backend is None:
+        from app import db
+        backend = current_app.extensions['search'] = detect(db.engine)
+    return backend
+
+
+def search(query, model, q):
+    """Restrict a query to full-text matches for q
+
+    Returns the filtered query and a rank expression (ascending = most relevant
+    first), or None when the active backend cannot rank.
+    """
+    return get_backend().search(query, model, q)
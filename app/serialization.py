@@ -0,0 +1,182 @@
+"""
+Fast JSON for list endpoints
+
+``JSONProvider`` replaces Flask's encoder app-wide. It uses orjson when it is
+installed (``pip install orjson``) and the standard library otherwise; both
+write datetimes as ISO 8601, exactly like the models' ``to_dict`` methods,
+and enums as their value.
+
+The list endpoints also skip ORM hydration: they select only the columns the
+response needs as plain rows and turn them into dicts here, with one extra
+query per page for author names and one for enrichment metadata, and only
+when those fields are wanted. ``fields=id,title,status`` limits a response
+to the listed fields (a sparse fieldset); the output for the full field set
+is the same as ``to_dict()``.
+"""
+import json
+from datetime import date
+from enum import Enum
+
+from flask import abort, request
+from flask.json.provider import DefaultJSONProvider
+
+from app import db
+from app.collections.service import collection_summaries
+from app.models import Author, Collection, Resource, ResourceAuthor, ResourceMetadata, split_authors
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional accelerator
+    orjson = None
+
+
+def _default(obj):
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    return DefaultJSONProvider.default(obj)
+
+
+class JSONProvider(DefaultJSONProvider):
+    default = staticmethod(_default)
+
+    def dumps(self, obj, **kwargs):
+        # Flask's response() asks for compact separators, which is all orjson writes
+        if kwargs.get('separators') == (',', ':'):
+            del kwargs['separators']
+        if orjson is not None and not kwargs:
+            option = orjson.OPT_NON_STR_KEYS
+            if self.sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            try:
+                return orjson.dumps(obj, default=_default, option=option).decode()
+            except TypeError:
+                pass  # e.g. integers wider than 64 bits; the stdlib copes
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+
+def init_app(app):
+    app.json = JSONProvider(app)
+
+
+RESOURCE_COLUMNS = {
+    'id': Resource.id,
+    'title': Resource.title,
+    'authors': Resource.authors,
+    'url': Resource.url,
+    'status': Resource.status,
+    'last_read_date': Resource.last_read_date,
+    'collection_id': Resource.collection_id,
+    'created_at': Resource.created_at,
+    'updated_at': Resource.updated_at,
+}
+RESOURCE_FIELDS = tuple(RESOURCE_COLUMNS) + ('authors_list', 'metadata')
+
+COLLECTION_COLUMNS = {
+    'id': Collection.id,
+    'name': Collection.name,
+    'description': Collection.description,
+    'user_id': Collection.user_id,
+    'is_public': Collection.is_public,
+    'created_at': Collection.created_at,
+    'updated_at': Collection.updated_at,
+}
+
+SUMMARY_FIELDS = {'resource_count', 'status_counts', 'last_activity'}
+COLLECTION_FIELDS = tuple(COLLECTION_COLUMNS) + ('resource_count', 'status_counts', 'last_activity')
+
+METADATA_COLUMNS = ('canonical_title', 'normalized_title', 'isbn', 'publish_year', 'source', 'fetched_at')
+
+
+def requested_fields(allowed, param='fields'):
+    """Fields named in the sparse-fieldset parameter, in allowed order; every field when it is absent"""
+    raw = request.args.get(param, '')
+    if not raw.strip():
+        return allowed
+    wanted = {name.strip() for name in raw.split(',') if name.strip()}
+    unknown = sorted(wanted.difference(allowed))
+    if unknown:
+        abort(400, description=f"Unknown fields: {', '.join(unknown)}. Valid fields: {', '.join(allowed)}")
+    return tuple(name for name in allowed if name in wanted)
+
+
+def resource_columns(fields, *required):
+    """Columns to select for these output fields, plus any the caller needs (e.g. the sort key)"""
+    names = [name for name in RESOURCE_COLUMNS if name in fields or name in required or name == 'id']
+    if 'authors_list' in fields and 'authors' not in names:
+        names.append('authors')  # fallback for rows without author links
+    return [RESOURCE_COLUMNS[name] for name in names]
+
+
+def _author_names(resource_ids):
+    names = {}
+    rows = (db.session.query(ResourceAuthor.resource_id, Author.name)
+            .join(Author, Author.id == ResourceAuthor.author_id)
+            .filter(ResourceAuthor.resource_id.in_(resource_ids))
+            .order_by(ResourceAuthor.resource_id, ResourceAuthor.position))
+    for rid, name in rows:
+        names.setdefault(rid, []).append(name)
+    return names
+
+
+def _metadata(resource_ids):
+    columns = [getattr(ResourceMetadata, name) for name in METADATA_COLUMNS]
+    rows = (db.session.query(ResourceMetadata.resource_id, *columns)
+            .filter(ResourceMetadata.resource_id.in_(resource_ids)))
+    return {row[0]: dict(zip(METADATA_COLUMNS, row[1:])) for row in rows}
+
+
+def resource_rows(rows, fields):
+    """Dicts for resource rows selected with resource_columns()"""
+    ids = [row.id for row in rows]
+    authors = _author_names(ids) if ids and 'authors_list' in fields else None
+    metadata = _metadata(ids) if ids and 'metadata' in fields else None
+    columns = [name for name in fields if name in RESOURCE_COLUMNS]
+    values = _getter(rows, columns)
+
+    out = []
+    for row in rows:
+        item = dict(zip(columns, values(row)))
+        if authors is not None:
+            item['authors_list'] = authors.get(row.id) or split_authors(row.authors)
+        if metadata is not None:
+            item['metadata'] = metadata.get(row.id)
+        out.append(item)
+    return out
+
+
+def _getter(rows, columns):
+    """Positional getter returning the named columns of a row as a tuple"""
+    if not rows or not columns:
+        return lambda row: ()
+    positions = [rows[0]._fields.index(name) for name in columns]
+    return lambda row: tuple(row[i] for i in positions)
+
+
+def collection_columns(fields):
+    names = [name for name in COLLECTION_COLUMNS if name in fields or name == 'id']
+    if SUMMARY_FIELDS.intersection(fields):
+        names.extend(name for name in ('user_id', 'updated_at') if name not in names)
+    return [COLLECTION_COLUMNS[name] for name in names]
+
+
+def collection_rows(rows, fields):
+    """Dicts for collection rows selected with collection_columns(), with summaries when requested"""
+    columns = [name for name in fields if name in COLLECTION_COLUMNS]
+    values = _getter(rows, columns)
+    summary_fields = [name for name in fields if name in SUMMARY_FIELDS]
+    summaries = collection_summaries(rows) if summary_fields else {}
+
+    out = []
+    for row in rows:
+        item = dict(zip(columns, values(row)))
+        if summary_fields:
+            summary = summaries[row.id]
+            for name in summary_fields:
+                item[name] = summary[name]
+        out.append(item)
+    return out
@@ -0,0 +1,45 @@
+from datetime import date, timedelta
+from flask import Blueprint, jsonify, abort, current_app
+from flask_login import login_required, current_user
+from app.models import utcnow
+from app.utils import safe_query_param
+from app.stats.service import BUCKETS, time_series
+
+stats_bp = Blueprint('stats', __name__, url_prefix='/api/stats')
+
+
+def _date_param(name, default):
+    value = safe_query_param(name, '', 10)
+    if not value:
+        return default
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        abort(400, description=f"Invalid {name}: expected YYYY-MM-DD")
+
+
+@stats_bp.route('', methods=['GET'])
+@login_required
+def reading_stats():
+    """Status transitions per day, week or month, answered from the daily rollups"""
+    bucket = safe_query_param('bucket', 'week', 10)
+    if bucket not in BUCKETS:
+        abort(400, description=f"Invalid bucket. Valid values: {', '.join(BUCKETS)}")
+
+    end = _date_param('to', utcnow().date())
+    start = _date_param('from', end - timedelta(weeks=12))
+    if start > end:
+        abort(400, description="from must not be after to")
+    max_days = current_app.config.get('STATS_MAX_RANGE_DAYS', 3660)
+    if (end - start).days > max_days:
+        abort(400, description=f"Date range too long (max {max_days} days)")
+
+    series = time_series(current_user.id, start, end, bucket)
+    return jsonify({
+        'bucket': bucket,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'series': series,
+        'completed': sum(p['completed'] for p in series),
+        'started': sum(p['started'] for p in series),
+    }), 200
@@ -0,0 +1,183 @@
+"""
+Reading statistics
+
+Every status change is appended to ``status_event`` and, in the same
+transaction, folded into ``status_daily_rollup`` (user, day, status ->
+entered, exited, seconds spent). Time-series queries read only the rollups,
+so their cost depends on the length of the requested range, not on how many
+resources or events a user has accumulated.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from sqlalchemy import func
+
+from app import db
+from app.models import DailyStatusRollup, StatusEnum, StatusEvent, utcnow
+
+
+def record_status_changes(changes, user_id, when=None):
+    """Log (resource, old_status) pairs whose status has just been changed and update the rollups
+
+    Call before committing; the events and rollup increments join the same
+    transaction as the resource update. Pairs whose status did not change
+    are ignored.
+    """
+    changes = [(res, old) for res, old in changes if res.status != old]
+    if not changes:
+        return []
+    when = when or utcnow()
+
+    # the previous transition of each resource marks when it entered its old status
+    previous = dict(
+        db.session.query(StatusEvent.resource_id, func.max(StatusEvent.occurred_at))
+        .filter(StatusEvent.resource_id.in_([res.id for res, _ in changes]))
+        .group_by(StatusEvent.resource_id)
+        .all()
+    )
+
+    events = []
+    deltas = defaultdict(lambda: [0, 0, 0])
+    day = when.date()
+    for res, old in changes:
+        since = previous.get(res.id) or res.created_at or when
+        seconds = max(0, int((when - since).total_seconds())) if old is not None else 0
+        events.append(StatusEvent(user_id=user_id, resource_id=res.id, collection_id=res.collection_id,
+                                  from_status=old, to_status=res.status, seconds_in_previous=seconds,
+                                  occurred_at=when))
+        deltas[res.status][0] += 1
+        if old is not None:
+            deltas[old][1] += 1
+            deltas[old][2] += seconds
+
+    db.session.add_all(events)
+    for status, (entered, exited, seconds) in deltas.items():
+        _increment_rollup(user_id, day, status, entered, exited, seconds)
+    return events
+
+
+def _increment_rollup(user_id, day, status, entered, exited, seconds):
+    table = DailyStatusRollup.__table__
+    values = {'user_id': user_id, 'day': day, 'status': status,
+              'entered': entered, 'exited': exited, 'seconds_in_status': seconds}
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(**values)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.day, table.c.status],
+            set_={
+                'entered': table.c.entered + stmt.excluded.entered,
+                'exited': table.c.exited + stmt.excluded.exited,
+                'seconds_in_status': table.c.seconds_in_status + stmt.excluded.seconds_in_status,
+            },
+        ))
+        return
+
+    row = db.session.get(DailyStatusRollup, (user_id, day, status), with_for_update=True)
+    if row is None:
+        db.session.add(DailyStatusRollup(**values))
+    else:
+        row.entered += entered
+        row.exited += exited
+        row.seconds_in_status += seconds
+
+
+def rebuild_rollups(user_id=None):
+    """Recompute the rollups from the event log (for repairs); returns the number of rows written"""
+    events = db.session.query(StatusEvent)
+    rollups = DailyStatusRollup.query
+    if user_id is not None:
+        events = events.filter(StatusEvent.user_id == user_id)
+        rollups = rollups.filter(DailyStatusRollup.user_id == user_id)
+    rollups.delete(synchronize_session=False)
+
+    totals = defaultdict(lambda: [0, 0, 0])
+    for event in events.yield_per(1000):
+        day = event.occurred_at.date()
+        totals[(event.user_id, day, event.to_status)][0] += 1
+        if event.from_status is not None:
+            key = (event.user_id, day, event.from_status)
+            totals[key][1] += 1
+            totals[key][2] += event.seconds_in_previous
+    if totals:
+        db.session.execute(DailyStatusRollup.__table__.insert(), [
+            {'user_id': uid, 'day': day, 'status': status,
+             'entered': entered, 'exited': exited, 'seconds_in_status': seconds}
+            for (uid, day, status), (entered, exited, seconds) in totals.items()
+        ])
+    db.session.commit()
+    return len(totals)
+
+
+BUCKETS = ('day', 'week', 'month')
+
+
+def bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def time_series(user_id, start, end, bucket='week'):
+    """Entered/exited counts and time in status per bucket between start and end (inclusive dates)
+
+    Buckets are calendar weeks (Monday first) or months, so when start or end
+    falls inside one, the edge bucket is cut to the range: ``period`` and
+    ``period_end`` give the days it covers and ``partial`` is true.
+    """
+    rows = (DailyStatusRollup.query
+            .filter(DailyStatusRollup.user_id == user_id,
+                    DailyStatusRollup.day >= start,
+                    DailyStatusRollup.day <= end)
+            .order_by(DailyStatusRollup.day)
+            .all())
+
+    periods = {}
+    for row in rows:
+        period = periods.setdefault(bucket_start(row.day, bucket), _empty_period())
+        name = row.status.value
+        period['entered'][name] += row.entered
+        period['exited'][name] += row.exited
+        period['seconds_in_status'][name] += row.seconds_in_status
+
+    series = []
+    day = bucket_start(start, bucket)
+    while day <= end:
+        following = _next_bucket(day, bucket)
+        period = periods.get(day) or _empty_period()
+        first, last = max(day, start), min(following - timedelta(days=1), end)
+        period['period'] = first.isoformat()
+        period['period_end'] = last.isoformat()
+        period['partial'] = first != day or last != following - timedelta(days=1)
+        period['completed'] = period['entered'][StatusEnum.COMPLETED.value]
+        period['started'] = period['entered'][StatusEnum.IN_PROGRESS.value]
+        finished = period['exited'][StatusEnum.IN_PROGRESS.value]
+        period['avg_days_in_progress'] = (
+            round(period['seconds_in_status'][StatusEnum.IN_PROGRESS.value] / finished / 86400, 2)
+            if finished else None
+        )
+        series.append(period)
+        day = following
+    return series
+
+
+def _empty_period():
+    return {
+        'entered': {s.value: 0 for s in StatusEnum},
+        'exited': {s.value: 0 for s in StatusEnum},
+        'seconds_in_status': {s.value: 0 for s in StatusEnum},
+    }
+
+
+def _next_bucket(day, bucket):
+    if bucket == 'week':
+        return day + timedelta(days=7)
+    if bucket == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
@@ -0,0 +1,190 @@
+"""
+Two-tier cache in front of the metadata API
+
+Lookups go memory (LRU) -> disk (SQLite file) -> upstream. Entries are fresh
+for ``ttl`` seconds; for a further ``stale_ttl`` seconds they are still served
+while a background refresh runs (stale-while-revalidate), and they are also
+used as a fallback if the upstream call fails. Concurrent misses for the same
+key share one upstream call (single flight), so N users typing the same
+prefix cost one request.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from app.cache import TTLCache
+
+
+def normalize_query(q):
+    return ' '.join((q or '').split()).casefold()
+
+
+class DiskStore:
+    """Persistent key -> (fetched_at, value) table in its own SQLite file"""
+
+    def __init__(self, path, max_age):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS suggestion_cache ('
+            'key TEXT PRIMARY KEY, fetched_at REAL NOT NULL, payload TEXT NOT NULL)'
+        )
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT fetched_at, payload FROM suggestion_cache WHERE key = ?', (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def set(self, key, fetched_at, value):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO suggestion_cache (key, fetched_at, payload) VALUES (?, ?, ?)',
+                (key, fetched_at, json.dumps(value)),
+            )
+            self._writes += 1
+            if self._writes % 500 == 0:
+                self._conn.execute('DELETE FROM suggestion_cache WHERE fetched_at < ?', (time.time() - self.max_age,))
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SuggestionCache:
+
+    def __init__(self, ttl=3600, stale_ttl=86400, memory_size=2048, path=None, wait_timeout=10, clock=time.time):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.wait_timeout = wait_timeout
+        # wall clock: fetch times are also stored on disk and read back by other processes
+        self._clock = clock
+        self.memory = TTLCache(maxsize=memory_size, ttl=ttl + stale_ttl, clock=clock)
+        self.disk = DiskStore(path, ttl + stale_ttl) if path else None
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'memory_hits': 0, 'disk_hits': 0, 'stale_hits': 0, 'misses': 0,
+            'coalesced': 0, 'refreshes': 0, 'upstream_errors': 0, 'stale_on_error': 0,
+        }
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 4) if lookups else None
+        stats['memory_entries'] = len(self.memory)
+        return stats
+
+    def _lookup(self, key):
+        entry = self.memory.get(key)
+        if entry is not None:
+            self._count('memory_hits')
+            return entry
+        if self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None and self._clock() - entry[0] < self.ttl + self.stale_ttl:
+                self._count('disk_hits')
+                self.memory.set(key, entry, ttl=self.ttl + self.stale_ttl - (self._clock() - entry[0]))
+                return entry
+        self._count('misses')
+        return None
+
+    def get(self, key, loader):
+        """Return the cached value for key, calling loader() (at most once at a time per key) when needed"""
+        entry = self._lookup(key)
+        if entry is not None:
+            fetched_at, value = entry
+            if self._clock() - fetched_at < self.ttl:
+                return value
+            self._count('stale_hits')
+            self._refresh_in_background(key, loader)
+            return value
+        return self._fetch(key, loader)
+
+    def _store(self, key, value):
+        fetched_at = self._clock()
+        self.memory.set(key, (fetched_at, value))
+        if self.disk is not None:
+            self.disk.set(key, fetched_at, value)
+
+    def _fetch(self, key, loader):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            if not flight.done.wait(self.wait_timeout):
+                raise TimeoutError('timed out waiting for an identical upstream request')
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+            self._store(key, flight.value)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            self._count('upstream_errors')
+            # stale-if-error: anything we still have on disk beats a 502
+            fallback = self.disk.get(key) if self.disk is not None else None
+            if fallback is not None:
+                self._count('stale_on_error')
+                flight.error = None
+                flight.value = fallback[1]
+                return flight.value
+            raise
+        finally:
+            flight.done.set()
+            with self._lock:
+                self._flights.pop(key, None)
+
+    def _refresh_in_background(self, key, loader):
+        with self._lock:
+            if key in self._flights:
+                return
+        self._count('refreshes')
+
+        def refresh():
+            try:
+                self._fetch(key, loader)
+            except Exception:
+                pass  # keep serving the stale entry; the error is counted
+
+        threading.Thread(target=refresh, name='suggestion-refresh', daemon=True).start()
+
+
+def init_app(app):
+    path = app.config.get('SUGGESTIONS_CACHE_PATH')
+    if path is None:
+        path = os.path.join(app.instance_path, 'suggestions-cache.sqlite3')
+    app.extensions['suggestions_cache'] = SuggestionCache(
+        ttl=app.config.get('SUGGESTIONS_CACHE_TTL', 3600),
+        stale_ttl=app.config.get('SUGGESTIONS_CACHE_STALE_TTL', 86400),
+        memory_size=app.config.get('SUGGESTIONS_CACHE_SIZE', 2048),
+        path=path or None,
+    )
@@ -0,0 +1,211 @@
+"""
+HTTP client for the metadata API (``Config.METADATA_API``)
+
+One ``MetadataClient`` per app keeps a pooled keep-alive ``requests.Session``
+and guards every upstream host with:
+
+- a concurrency limit, so a slow upstream can only tie up a bounded number of
+  workers; callers over the limit fail fast with ``UpstreamBusyError``
+- a circuit breaker that opens after consecutive failures and rejects calls
+  with ``CircuitOpenError`` until a trial request succeeds
+- retries with exponential backoff and full jitter, for idempotent GETs only,
+  inside a ``total_timeout`` budget for all attempts together, so a hung
+  upstream holds a worker about as long as a single attempt would
+"""
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class MetadataUnavailable(Exception):
+    """The upstream was not called; the caller should fail fast (503)"""
+
+
+class CircuitOpenError(MetadataUnavailable):
+    pass
+
+
+class UpstreamBusyError(MetadataUnavailable):
+    pass
+
+
+class CircuitBreaker:
+    """closed -> open after ``failure_threshold`` consecutive failures -> half-open after ``reset_timeout``"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial_in_flight:
+                # let exactly one request probe the upstream
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+
+
+class _RetryableStatus(requests.HTTPError):
+    pass
+
+
+RETRYABLE_ERRORS = (requests.ConnectionError, requests.Timeout, _RetryableStatus)
+
+
+class MetadataClient:
+
+    def __init__(self, base_url, connect_timeout=2, read_timeout=5, total_timeout=5, pool_size=10, max_per_host=8,
+                 acquire_timeout=0.25, retries=2, backoff=0.2, breaker_threshold=5, breaker_reset=30,
+                 clock=time.monotonic):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.total_timeout = total_timeout
+        self._clock = clock
+        self.max_per_host = max_per_host
+        self.acquire_timeout = acquire_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self._hosts = {}
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0, 'rejected_open': 0, 'rejected_busy': 0}
+
+    def _host(self, host):
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = (
+                    threading.BoundedSemaphore(self.max_per_host),
+                    CircuitBreaker(self.breaker_threshold, self.breaker_reset, clock=self._clock),
+                )
+            return self._hosts[host]
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self.stats)
+            hosts = dict(self._hosts)
+        stats['breakers'] = {host: breaker.state for host, (_, breaker) in hosts.items()}
+        return stats
+
+    def _attempt_timeout(self, deadline):
+        # requests times each connect and read separately; keep them inside what is left of the budget
+        remaining = max(deadline - self._clock(), 0.05)
+        return min(self.timeout[0], remaining), min(self.timeout[1], remaining)
+
+    def get_json(self, path, params=None):
+        url = f'{self.base_url}{path}'
+        semaphore, breaker = self._host(urlsplit(url).netloc)
+
+        # cheap pre-check so an open circuit never waits on the semaphore
+        if breaker.state == 'open':
+            self._count('rejected_open')
+            raise CircuitOpenError('metadata service temporarily unavailable')
+        if not semaphore.acquire(timeout=self.acquire_timeout):
+            self._count('rejected_busy')
+            raise UpstreamBusyError('too many concurrent metadata requests')
+        if not breaker.allow():
+            semaphore.release()
+            self._count('rejected_open')
+            raise CircuitOpenError('metadata service temporarily unavailable')
+
+        deadline = self._clock() + self.total_timeout
+        answered = False
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    self._count('requests')
+                    resp = self.session.get(url, params=params, timeout=self._attempt_timeout(deadline))
+                    if resp.status_code == 429 or resp.status_code >= 500:
+                        raise _RetryableStatus(f'{resp.status_code} from metadata service', response=resp)
+                    answered = True
+                    resp.raise_for_status()
+                    data = resp.json()
+                    breaker.record_success()
+                    return data
+                except RETRYABLE_ERRORS:
+                    delay = random.uniform(0, self.backoff * 2 ** attempt)
+                    if attempt == self.retries or self._clock() + delay >= deadline:
+                        raise
+                    self._count('retries')
+                    time.sleep(delay)
+        except RETRYABLE_ERRORS:
+            self._count('failures')
+            breaker.record_failure()
+            raise
+        except Exception:
+            if answered:
+                # a 4xx or a body that is not JSON says nothing about upstream health
+                breaker.record_success()
+            else:
+                # SSL, chunked-encoding, decoding and URL errors never got a usable reply
+                self._count('failures')
+                breaker.record_failure()
+            raise
+        finally:
+            semaphore.release()
+
+
+def client_from_config(config):
+    return MetadataClient(
+        config.get('METADATA_API', 'https://openlibrary.org'),
+        connect_timeout=config.get('METADATA_CONNECT_TIMEOUT', 2),
+        read_timeout=config.get('METADATA_READ_TIMEOUT', 5),
+        total_timeout=config.get('METADATA_TOTAL_TIMEOUT', 5),
+        pool_size=config.get('METADATA_POOL_SIZE', 10),
+        max_per_host=config.get('METADATA_MAX_CONCURRENCY', 8),
+        retries=config.get('METADATA_RETRIES', 2),
+        backoff=config.get('METADATA_RETRY_BACKOFF', 0.2),
+        breaker_threshold=config.get('METADATA_BREAKER_THRESHOLD', 5),
+        breaker_reset=config.get('METADATA_BREAKER_RESET', 30),
+    )
+
+
+def init_app(app):
+    app.extensions['metadata_client'] = client_from_config(app.config)
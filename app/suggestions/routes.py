@@ -1,4 +1,8 @@
+from functools import partial
 from flask import Blueprint, request, jsonify, current_app
+from app.instrumentation import metrics_denied
+from .cache import normalize_query
+from .client import MetadataUnavailable
 from .service import query_openlibrary
 
 sugg_bp = Blueprint('suggestions', __name__, url_prefix='/api/suggestions')
@@ -11,9 +15,31 @@ def suggest():
         limit = int(request.args.get('limit', 8))
     except Exception:
         limit = 8
-    base = current_app.config.get('METADATA_API', 'https://openlibrary.org')
+    limit = max(1, min(limit, 50))
+    client = current_app.extensions['metadata_client']
+    base = client.base_url
+    # "Dune ", "dune" and "DUNE" are the same lookup
+    normalized = normalize_query(q)
     try:
-        suggestions = query_openlibrary(q, limit=limit, base_url=base)
+        suggestions = []
+        if normalized:
+            cache = current_app.extensions['suggestions_cache']
+            loader = partial(query_openlibrary, normalized, limit=limit, client=client)
+            suggestions = cache.get(f'{base}|{limit}|{normalized}', loader)
         return jsonify({'query': q, 'suggestions': suggestions}), 200
+    except MetadataUnavailable as e:
+        # circuit open or upstream saturated: answer now instead of waiting out a timeout
+        return jsonify({'error': 'suggestions temporarily unavailable', 'details': str(e)}), 503, {'Retry-After': '5'}
     except Exception as e:
         return jsonify({'error': 'failed to fetch suggestions', 'details': str(e)}), 502
+
+
+@sugg_bp.route('/metrics', methods=['GET'])
+def suggestion_metrics():
+    # process-wide numbers (cache, upstream breakers): same access rule as /metrics
+    denied = metrics_denied()
+    if denied is not None:
+        return denied
+    metrics = current_app.extensions['suggestions_cache'].metrics()
+    metrics['upstream'] = current_app.extensions['metadata_client'].metrics()
+    return jsonify(metrics), 200
@@ -1,14 +1,29 @@
-import requests
+import threading
 
+from .client import MetadataClient
 
-def query_openlibrary(query, limit=8, base_url='https://openlibrary.org'):
+SEARCH_FIELDS = 'title,title_suggest,author_name,first_publish_year,isbn'
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _default_client(base_url):
+    # callers outside the app (scripts, shells) still get a pooled client per base URL
+    with _clients_lock:
+        if base_url not in _clients:
+            _clients[base_url] = MetadataClient(base_url)
+        return _clients[base_url]
+
+
+def query_openlibrary(query, limit=8, base_url='https://openlibrary.org', client=None):
     if not query:
         return []
-    params = {'q': query, 'limit': limit}
-    url = f"{base_url}/search.json"
-    resp = requests.get(url, params=params, timeout=5)
-    resp.raise_for_status()
-    data = resp.json()
+    if client is None:
+        client = _default_client(base_url)
+    # only ask for the fields we read; full search docs are several KB each
+    params = {'q': query, 'limit': limit, 'fields': SEARCH_FIELDS}
+    data = client.get_json('/search.json', params=params)
     docs = data.get('docs', [])
     suggestions = []
     for d in docs[:limit]:
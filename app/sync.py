@@ -0,0 +1,141 @@
+"""
+Delta sync for the collection page
+
+``GET /api/collections/<cid>/changes?since=<cursor>`` returns the resources
+of a collection changed since the cursor (by ``updated_at``) and the ids of
+those that left it since then, deleted or moved to another collection. A
+flush hook records every such departure as a ``ResourceTombstone``. Without
+``since`` the whole collection comes back with ``reset: true``. The page
+keeps the rows in memory, filters, sorts and renders them locally, and
+calls the endpoint again only to stay fresh; with the collection's ETag an
+idle poll is a 304.
+
+Rows are walked in (updated_at, id) order, at most DELTA_SYNC_PAGE_SIZE per
+response; ``has_more`` asks for another call with the returned cursor. The
+cursor of the last page is set DELTA_SYNC_OVERLAP_SECONDS before the query
+ran: ``updated_at`` is stamped at flush, before the writing transaction
+commits, so a slow commit could otherwise land behind the cursor and never
+be sent. Rows sent twice are harmless since the client upserts by id. A
+response with nothing in it returns the cursor it was given, so an idle
+client keeps asking for the same URL, whose ETag only changes when the
+collection does.
+Tombstones older than DELTA_SYNC_RETENTION_DAYS are deleted by ``flask --app
+run prune-tombstones``, and a cursor older than that gets a full reload.
+
+Enrichment metadata comes with each row, but fetching it does not touch
+``updated_at``, so it is only as fresh as the last change to the row.
+"""
+from datetime import datetime, timedelta
+
+from flask import abort, current_app
+from sqlalchemy import and_, event, or_, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.database import write_transactions
+from app.models import Collection, Resource, ResourceTombstone, utcnow
+from app.serialization import RESOURCE_FIELDS, requested_fields, resource_columns, resource_rows
+from app.utils import decode_cursor, encode_cursor, safe_limit_param, safe_query_param
+from app.versioning import touch_collections
+
+
+def _record_tombstones(session, flush_context, instances):
+    departures = []
+    for obj in session.deleted:
+        if isinstance(obj, Resource) and obj.id is not None:
+            departures.append((obj.id, obj.collection_id))
+    for obj in session.dirty:
+        if isinstance(obj, Resource) and obj.id is not None:
+            # a move is a departure from the source collection
+            history = db.inspect(obj).attrs.collection_id.history
+            departures.extend((obj.id, cid) for cid in history.deleted or () if cid is not None)
+    # nobody syncs a collection that is being deleted
+    gone = {obj.id for obj in session.deleted if isinstance(obj, Collection)}
+    for rid, cid in departures:
+        if cid not in gone:
+            session.add(ResourceTombstone(resource_id=rid, collection_id=cid))
+
+
+def _since():
+    """(updated_at, id) position from the since cursor, or None for a full load"""
+    token = safe_query_param('since', '', 200)
+    if not token:
+        return None
+    position = decode_cursor(token)
+    after_id = position.get('id')
+    if isinstance(after_id, bool) or not isinstance(after_id, int) or after_id < 0:
+        abort(400, description="Invalid since cursor")
+    try:
+        return datetime.fromisoformat(position.get('t')), after_id
+    except (TypeError, ValueError):
+        abort(400, description="Invalid since cursor")
+
+
+def changes(col):
+    """Resources of col changed since the request's cursor, ids that left it, and the next cursor"""
+    fields = requested_fields(RESOURCE_FIELDS)
+    limit = safe_limit_param(default_key='DELTA_SYNC_PAGE_SIZE', max_key='DELTA_SYNC_PAGE_SIZE')
+    now = utcnow()
+    since = _since()
+    retention = timedelta(days=current_app.config.get('DELTA_SYNC_RETENTION_DAYS', 30))
+    # tombstones before the horizon may be pruned already; only a full reload is safe
+    reset = since is None or since[0] < now - retention
+    if reset:
+        since = None
+
+    query = (db.session.query(*resource_columns(fields, 'updated_at'))
+             .filter(Resource.collection_id == col.id))
+    if since is not None:
+        updated_at, after_id = since
+        query = query.filter(or_(Resource.updated_at > updated_at,
+                                 and_(Resource.updated_at == updated_at, Resource.id > after_id)))
+    rows = query.order_by(Resource.updated_at, Resource.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    deleted = set()
+    if since is not None:
+        # a resource can come back (moved back, or its id reused); the live row wins
+        live = select(Resource.id).where(Resource.collection_id == col.id)
+        deleted = {rid for (rid,) in db.session.query(ResourceTombstone.resource_id)
+                   .filter(ResourceTombstone.collection_id == col.id, ResourceTombstone.deleted_at >= since[0],
+                           ResourceTombstone.resource_id.notin_(live))}
+
+    if has_more:
+        position = (rows[-1].updated_at, rows[-1].id)
+    elif since is not None and not rows and not deleted:
+        # nothing changed: hand the cursor back as it came, so the next poll repeats this URL and gets a 304
+        position = since
+    else:
+        overlap = timedelta(seconds=current_app.config.get('DELTA_SYNC_OVERLAP_SECONDS', 5))
+        position = (now - overlap, 0)
+        if since is not None and since > position:
+            position = since
+    return {
+        'resources': resource_rows(rows, fields),
+        'deleted': sorted(deleted),
+        'reset': reset,
+        'has_more': has_more,
+        'cursor': encode_cursor({'t': position[0].isoformat(), 'id': position[1]}),
+    }
+
+
+def prune_tombstones(days=None):
+    """Delete tombstones older than the retention window; returns how many went"""
+    days = current_app.config.get('DELTA_SYNC_RETENTION_DAYS', 30) if days is None else days
+    expired = ResourceTombstone.deleted_at < utcnow() - timedelta(days=days)
+    with write_transactions():
+        collection_ids = db.session.execute(
+            select(ResourceTombstone.collection_id).where(expired).distinct()
+        ).scalars().all()
+        deleted = db.session.query(ResourceTombstone).filter(expired).delete(synchronize_session=False)
+        # removals count towards a collection's last_activity, so its responses change too
+        touch_collections(collection_ids)
+        db.session.commit()
+    return deleted
+
+
+def init_app(app):
+    if not getattr(init_app, '_installed', False):
+        event.listen(Session, 'before_flush', _record_tombstones)
+        init_app._installed = True
@@ -1,9 +1,12 @@
 """
 Utility functions for validation and error handling
 """
+import base64
+import json
 from functools import wraps
-from flask import jsonify, abort, request
+from flask import jsonify, abort, request, current_app, g
 from flask_login import current_user
+from sqlalchemy.orm import contains_eager
 from app.models import Collection, Resource
 
 
@@ -18,23 +21,39 @@ def validate_id(id_value, name="ID"):
         abort(400, description=f"Invalid {name}: must be a positive integer")
 
 
-def validate_ownership(model_class, model_id, user_id=None):
-    """Validate that current user owns the resource"""
+def load_owned(model_class, model_id, user_id=None):
+    """Load an object only if the user owns it, using a single query
+
+    Resources are joined to their collection so ownership is decided by the
+    database rather than by a second lookup. The result (including a miss) is
+    memoized on ``flask.g`` so later checks in the same request are free.
+    """
     if user_id is None:
         user_id = current_user.id
-    
+
+    cache = g.setdefault('_owned_objects', {})
+    key = (model_class.__name__, model_id, user_id)
+    if key in cache:
+        return cache[key]
+
     if model_class == Collection:
         item = Collection.query.filter_by(id=model_id, user_id=user_id).first()
     elif model_class == Resource:
-        # For resources, check ownership through collection
-        resource = Resource.query.get(model_id)
-        if not resource:
-            return None
-        collection = Collection.query.filter_by(id=resource.collection_id, user_id=user_id).first()
-        item = resource if collection else None
+        item = (Resource.query
+                .join(Collection, Collection.id == Resource.collection_id)
+                .filter(Resource.id == model_id, Collection.user_id == user_id)
+                .options(contains_eager(Resource.collection))
+                .first())
     else:
         item = None
-    
+
+    cache[key] = item
+    return item
+
+
+def validate_ownership(model_class, model_id, user_id=None):
+    """Validate that current user owns the resource"""
+    item = load_owned(model_class, model_id, user_id)
     if not item:
         abort(404, description="Resource not found or access denied")
     
@@ -93,4 +112,35 @@ def validate_enum_value(value, enum_class, field_name):
         return enum_class(value)
     except ValueError:
         valid_values = [e.value for e in enum_class]
-        abort(400, description=f"Invalid {field_name}. Valid values: {', '.join(valid_values)}")
\ No newline at end of file
+        abort(400, description=f"Invalid {field_name}. Valid values: {', '.join(valid_values)}")
+
+
+def safe_limit_param(param_name='limit', default_key='RESOURCES_PAGE_SIZE', max_key='RESOURCES_PAGE_MAX'):
+    """Get a page size from the query string, capped by the server-side maximum"""
+    default = current_app.config.get(default_key, 50)
+    maximum = current_app.config.get(max_key, 200)
+    try:
+        limit = int(request.args.get(param_name, default))
+    except (ValueError, TypeError):
+        abort(400, description=f"Invalid {param_name}: must be a positive integer")
+    if limit <= 0:
+        abort(400, description=f"Invalid {param_name}: must be a positive integer")
+    return min(limit, maximum)
+
+
+def encode_cursor(payload):
+    """Encode a keyset pagination position as an opaque URL-safe token"""
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a token produced by encode_cursor"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(payload, dict):
+            raise ValueError("cursor must be an object")
+        return payload
+    except (ValueError, TypeError, UnicodeError):
+        abort(400, description="Invalid cursor")
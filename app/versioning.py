@@ -0,0 +1,270 @@
+"""
+Data versions and HTTP conditional requests
+
+Every flush that touches a collection, its resources or their metadata bumps
+a version counter for that collection (``collection:<id>``) and for its owner
+(``user:<id>``) in the ``data_version`` table, inside the same transaction.
+The JSON API derives ETag and Last-Modified validators from those counters
+(or from ``updated_at`` for single rows), so a GET can be answered with 304
+Not Modified after one primary-key lookup, before any listing query or
+serialization runs. PUT and DELETE compare ``If-Match`` against the same
+validators and answer 412 when the client edited a stale copy.
+
+Committed scopes are also handed to any callbacks registered with
+``on_commit`` so other layers can invalidate what they derived from them.
+Writes made with Core statements bypass the flush and must call
+``touch_collections`` themselves.
+"""
+import hashlib
+
+from flask import current_app, g, jsonify, request
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+from app import db
+from app.models import Collection, DataVersion, Resource, ResourceMetadata, utcnow
+
+_commit_callbacks = []
+
+
+def collection_scope(cid):
+    return f'collection:{cid}'
+
+
+def user_scope(uid):
+    return f'user:{uid}'
+
+
+def on_commit(callback):
+    """Call callback(scopes) after each commit that changed versioned data; registering twice is a no-op"""
+    if callback not in _commit_callbacks:
+        _commit_callbacks.append(callback)
+    return callback
+
+
+def _collection_owners(session, collection_ids):
+    owners = {}
+    missing = []
+    for cid in collection_ids:
+        col = session.identity_map.get(identity_key(Collection, cid))
+        if col is not None and col.user_id is not None:
+            owners[cid] = col.user_id
+        else:
+            missing.append(cid)
+    if missing:
+        with session.no_autoflush:
+            owners.update(session.execute(
+                select(Collection.id, Collection.user_id).where(Collection.id.in_(missing))
+            ).all())
+    return owners
+
+
+def _changed_scopes(session):
+    user_ids = set()
+    collection_ids = set()
+    metadata_resource_ids = set()
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Collection):
+            if obj.id is not None:
+                collection_ids.add(obj.id)
+            user_ids.add(obj.user_id)
+        elif isinstance(obj, Resource):
+            collection_ids.add(obj.collection_id)
+            # a move changes both the source and the target collection
+            history = db.inspect(obj).attrs.collection_id.history
+            collection_ids.update(history.deleted or ())
+        elif isinstance(obj, ResourceMetadata):
+            metadata_resource_ids.add(obj.resource_id)
+
+    for rid in metadata_resource_ids:
+        res = session.identity_map.get(identity_key(Resource, rid))
+        if res is not None:
+            collection_ids.add(res.collection_id)
+        else:
+            with session.no_autoflush:
+                collection_ids.update(session.execute(
+                    select(Resource.collection_id).where(Resource.id == rid)
+                ).scalars())
+
+    return _scopes(session, collection_ids, user_ids)
+
+
+def _scopes(session, collection_ids, user_ids=()):
+    """The scopes of collection_ids, their owners and user_ids"""
+    collection_ids = set(collection_ids) - {None}
+    user_ids = set(user_ids) | set(_collection_owners(session, collection_ids).values())
+    user_ids.discard(None)
+    return {collection_scope(cid) for cid in collection_ids} | {user_scope(uid) for uid in user_ids}
+
+
+def _bump(connection, scopes):
+    table = DataVersion.__table__
+    now = utcnow()
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        for scope in sorted(scopes):
+            stmt = insert(table).values(scope=scope, version=1, updated_at=now)
+            connection.execute(stmt.on_conflict_do_update(
+                index_elements=[table.c.scope],
+                set_={'version': table.c.version + 1, 'updated_at': now},
+            ))
+        return
+    for scope in sorted(scopes):
+        updated = connection.execute(
+            table.update().where(table.c.scope == scope).values(version=table.c.version + 1, updated_at=now)
+        )
+        if not updated.rowcount:
+            connection.execute(table.insert().values(scope=scope, version=1, updated_at=now))
+
+
+def touch_collections(collection_ids):
+    """Bump the versions of collections (and their owners) written with Core statements
+
+    Bulk ``insert()``/``update()``/``delete()`` statements never pass through
+    the flush hooks, so code that changes what a collection's responses show
+    that way calls this in the same transaction. Without pending ORM changes
+    the versions are bumped at once; with them, by the next flush together
+    with its own.
+    """
+    session = db.session
+    scopes = _scopes(session, collection_ids)
+    if not scopes:
+        return
+    if session.new or session.dirty or session.deleted:
+        session.info.setdefault('pending_scopes', set()).update(scopes)
+        return
+    _bump(session.connection(), scopes)
+    session.info.setdefault('committed_scopes', set()).update(scopes)
+
+
+def _before_flush(session, flush_context, instances):
+    scopes = _changed_scopes(session)
+    if scopes:
+        session.info.setdefault('pending_scopes', set()).update(scopes)
+
+
+def _after_flush(session, flush_context):
+    scopes = session.info.pop('pending_scopes', None)
+    if not scopes:
+        return
+    _bump(session.connection(), scopes)
+    session.info.setdefault('committed_scopes', set()).update(scopes)
+
+
+def _after_commit(session):
+    scopes = session.info.pop('committed_scopes', None)
+    if scopes:
+        for callback in _commit_callbacks:
+            callback(scopes)
+
+
+def _after_rollback(session):
+    session.info.pop('pending_scopes', None)
+    session.info.pop('committed_scopes', None)
+
+
+def versions(scopes):
+    """Map each scope to its (version, updated_at); unknown scopes are (0, None)"""
+    rows = db.session.execute(
+        select(DataVersion.scope, DataVersion.version, DataVersion.updated_at).where(DataVersion.scope.in_(scopes))
+    ).all()
+    found = {scope: (version, updated_at) for scope, version, updated_at in rows}
+    return [found.get(scope, (0, None)) for scope in scopes]
+
+
+def make_etag(*parts):
+    return hashlib.sha1('|'.join(str(p) for p in parts).encode()).hexdigest()[:24]
+
+
+def query_fingerprint():
+    """Stable digest of the normalized query string, so every filter/sort/page combination gets its own ETag
+
+    Parameter order, surrounding whitespace and empty parameters do not
+    change the digest.
+    """
+    params = sorted((name, value.strip()) for name, value in request.args.items(multi=True) if value.strip())
+    return make_etag(*params)
+
+
+def collection_validators(cid, *extra, updated_at=None):
+    """Validators for anything derived from one collection and its resources"""
+    (version, changed_at), = versions([collection_scope(cid)])
+    return make_etag('collection', cid, version, *extra), changed_at or updated_at
+
+
+def user_collections_validators(uid, *extra):
+    """Validators for anything derived from all of a user's collections"""
+    (version, changed_at), = versions([user_scope(uid)])
+    return make_etag('collections', uid, version, *extra), changed_at
+
+
+def row_validators(obj, *extra):
+    return make_etag(type(obj).__name__, obj.id, obj.updated_at.isoformat() if obj.updated_at else None,
+                     *extra), obj.updated_at
+
+
+def resource_validators(res):
+    # enrichment changes the representation without touching the resource row
+    return row_validators(res, res.enrichment.fetched_at.isoformat() if res.enrichment else None)
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def conditional_get(etag, last_modified=None):
+    """Remember the validators for the response; return a 304 response when the client's copy is current"""
+    g.validators = (etag, last_modified)
+    if not _not_modified(etag, last_modified):
+        return None
+    response = current_app.response_class(status=304)
+    _apply_validators(response, etag, last_modified)
+    return response
+
+
+def check_if_match(etag):
+    """Return a 412 response when If-Match is present and does not match the current representation"""
+    if request.if_match and not request.if_match.contains(etag):
+        response = jsonify({'error': 'Resource was modified by another request; reload and try again'})
+        response.status_code = 412
+        response.set_etag(etag)
+        return response
+    return None
+
+
+def set_validators(etag, last_modified=None):
+    g.validators = (etag, last_modified)
+
+
+def _apply_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # always revalidate; a 304 costs one lookup and is never stale
+    response.headers['Cache-Control'] = 'private, no-cache'
+
+
+def init_app(app):
+    if not getattr(init_app, '_installed', False):
+        event.listen(Session, 'before_flush', _before_flush)
+        event.listen(Session, 'after_flush', _after_flush)
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_soft_rollback', lambda session, previous: _after_rollback(session))
+        init_app._installed = True
+
+    @app.after_request
+    def add_validators(response):
+        validators = g.pop('validators', None)
+        if validators and response.status_code == 200:
+            _apply_validators(response, *validators)
+        return response
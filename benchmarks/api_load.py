@@ -0,0 +1,297 @@
+"""
+API load benchmark: scripted scenarios against a seeded database
+
+Seeds a throwaway SQLite database with N users x M collections x K resources
+(see seed_data.py), starts a local stub of the metadata API and drives the
+app in-process with the test client through these scenarios:
+
+- dashboard: the collections page (/api/auth/me, /api/collections)
+- browse: resource listing with random sort, status/author filters, search
+  and up to three pages of cursor pagination, plus one resource detail
+- bulk_edit: batch status updates of 20 resources and single-resource PUTs
+- typeahead: /api/suggestions for every prefix of a title as it is typed
+
+Every request records its latency and the X-SQL-Statements count. The
+report gives p50/p95/p99 latency, throughput and SQL counts per endpoint and
+is printed as a table and, with --json, written as JSON so runs can be
+compared over time (--compare prints the p95 change against an earlier file).
+
+    python benchmarks/api_load.py --users 20 --collections 10 --resources 200 --json before.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_migrate import upgrade  # noqa: E402
+
+from app import MIGRATIONS_DIR, create_app, db  # noqa: E402
+from config import Config  # noqa: E402
+from seed_data import PASSWORD, WORDS, seed  # noqa: E402
+
+STATUSES = ('Not Started', 'In Progress', 'Paused', 'Completed')
+SORTS = ('created_at', 'title', 'status')
+AUTHOR_PREFIXES = ('ada', 'gr', 'tur', 'knuth', 'le g')
+
+
+class MetadataStub:
+    """OpenLibrary /search.json lookalike answering after a fixed delay"""
+
+    def __init__(self, delay_ms):
+        self.calls = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub.calls += 1
+                time.sleep(delay_ms / 1000)
+                q = parse_qs(urlparse(self.path).query).get('q', [''])[0]
+                docs = [{'title': f'{q.title()} volume {i}', 'author_name': ['Ada Lovelace'],
+                         'first_publish_year': 1990 + i, 'isbn': [f'97800000000{i:02d}']} for i in range(8)]
+                body = json.dumps({'docs': docs}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class Recorder:
+
+    def __init__(self):
+        self.samples = {}
+
+    def request(self, client, label, method, url, **kwargs):
+        t0 = time.perf_counter()
+        response = client.open(url, method=method, **kwargs)
+        ms = (time.perf_counter() - t0) * 1000
+        sql = int(response.headers.get('X-SQL-Statements', 0))
+        self.samples.setdefault(label, []).append((ms, sql, response.status_code < 400))
+        return response
+
+
+class User:
+
+    def __init__(self, app, email, collections):
+        self.client = app.test_client()
+        self.collections = collections
+        response = self.client.post('/api/auth/login', json={'email': email, 'password': PASSWORD})
+        if response.status_code != 200:
+            raise RuntimeError(f'could not log in {email}: {response.get_json()}')
+
+
+def dashboard(user, rng, rec):
+    rec.request(user.client, 'GET /api/auth/me', 'GET', '/api/auth/me')
+    rec.request(user.client, 'GET /api/collections', 'GET', '/api/collections')
+
+
+def browse(user, rng, rec):
+    cid = rng.choice(list(user.collections))
+    params = {'sort': rng.choice(SORTS), 'limit': 20}
+    roll = rng.random()
+    if roll < 0.25:
+        params['status'] = rng.choice(STATUSES)
+    elif roll < 0.45:
+        params['author'] = rng.choice(AUTHOR_PREFIXES)
+    elif roll < 0.7:
+        params = {'q': rng.choice(WORDS), 'limit': 20}
+    url = f'/api/collections/{cid}/resources'
+    rec.request(user.client, 'GET /api/collections/<cid>', 'GET', f'/api/collections/{cid}')
+    for _ in range(3):
+        page = rec.request(user.client, 'GET /api/collections/<cid>/resources', 'GET', url, query_string=params)
+        body = page.get_json() or {}
+        if not body.get('next_cursor'):
+            break
+        params = dict(params, cursor=body['next_cursor'])
+    rid = rng.choice(user.collections[cid])
+    rec.request(user.client, 'GET /api/resources/<rid>', 'GET', f'/api/resources/{rid}')
+
+
+def bulk_edit(user, rng, rec):
+    cid = rng.choice(list(user.collections))
+    rids = user.collections[cid]
+    ids = rng.sample(rids, min(20, len(rids)))
+    rec.request(user.client, 'POST /api/resources/batch/update', 'POST', '/api/resources/batch/update',
+                json={'ids': ids, 'patch': {'status': rng.choice(STATUSES)}})
+    rec.request(user.client, 'PUT /api/resources/<rid>', 'PUT', f'/api/resources/{rng.choice(rids)}',
+                json={'status': rng.choice(STATUSES)})
+
+
+def typeahead(user, rng, rec):
+    title = ' '.join(rng.sample(WORDS, 2))
+    for end in range(2, len(title) + 1):
+        rec.request(user.client, 'GET /api/suggestions', 'GET', '/api/suggestions', query_string={'q': title[:end]})
+
+
+SCENARIOS = {'dashboard': dashboard, 'browse': browse, 'bulk_edit': bulk_edit, 'typeahead': typeahead}
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return None
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return round(ordered[index], 2)
+
+
+def summarize(samples):
+    endpoints = {}
+    for label, rows in sorted(samples.items()):
+        latencies = sorted(ms for ms, _, _ in rows)
+        sql = sorted(count for _, count, _ in rows)
+        busy = sum(latencies) / 1000
+        endpoints[label] = {
+            'requests': len(rows),
+            'errors': sum(1 for _, _, ok in rows if not ok),
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+            'mean_ms': round(sum(latencies) / len(latencies), 2),
+            # one client in series: requests per second of time spent in this endpoint
+            'throughput_rps': round(len(rows) / busy, 1) if busy else None,
+            'sql_p50': percentile(sql, 50),
+            'sql_max': sql[-1],
+        }
+    return endpoints
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    stub = MetadataStub(args.metadata_delay_ms)
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path,
+            'SQL_STATEMENT_COUNTING': True,
+            'METADATA_API': stub.url,
+            'SUGGESTIONS_CACHE_PATH': '',
+            'ENRICHMENT_WORKER': False,
+            'RESPONSE_CACHE_SIZE': 0 if args.no_response_cache else Config.RESPONSE_CACHE_SIZE,
+        })
+        with app.app_context():
+            upgrade(directory=MIGRATIONS_DIR)
+            t0 = time.perf_counter()
+            layout = seed(args.users, args.collections, args.resources, rng)
+            seed_seconds = time.perf_counter() - t0
+
+        chosen = rng.sample(sorted(layout), min(args.clients, len(layout)))
+        users = [User(app, layout[uid]['email'], layout[uid]['collections']) for uid in chosen]
+
+        scenarios = {}
+        for name in args.scenarios:
+            rec = Recorder()
+            started = time.perf_counter()
+            for i in range(args.iterations):
+                SCENARIOS[name](users[i % len(users)], rng, rec)
+            elapsed = time.perf_counter() - started
+            total = sum(len(rows) for rows in rec.samples.values())
+            scenarios[name] = {
+                'iterations': args.iterations,
+                'requests': total,
+                'seconds': round(elapsed, 3),
+                'throughput_rps': round(total / elapsed, 1),
+                'endpoints': summarize(rec.samples),
+            }
+        if 'typeahead' in scenarios:
+            scenarios['typeahead']['upstream_calls'] = stub.calls
+
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        return {
+            'meta': {
+                'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'revision': _git_revision(),
+                'python': platform.python_version(),
+                'database': 'sqlite',
+                'users': args.users,
+                'collections_per_user': args.collections,
+                'resources_per_collection': args.resources,
+                'clients': len(users),
+                'iterations': args.iterations,
+                'metadata_delay_ms': args.metadata_delay_ms,
+                'response_cache': not args.no_response_cache,
+                'seed': args.seed,
+                'seed_seconds': round(seed_seconds, 2),
+            },
+            'scenarios': scenarios,
+        }
+    finally:
+        stub.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.unlink(path + suffix)
+
+
+def print_report(report, baseline=None):
+    for name, scenario in report['scenarios'].items():
+        print(f"{name}: {scenario['requests']} requests in {scenario['seconds']:.2f} s "
+              f"({scenario['throughput_rps']} req/s)"
+              + (f", {scenario['upstream_calls']} upstream calls" if scenario.get('upstream_calls') is not None else ''))
+        for label, s in scenario['endpoints'].items():
+            line = (f"    {label:<40} n={s['requests']:<5} p50 {s['p50_ms']:>7.2f}  p95 {s['p95_ms']:>7.2f}  "
+                    f"p99 {s['p99_ms']:>7.2f} ms  sql {s['sql_p50']}/{s['sql_max']}  errors {s['errors']}")
+            before = (baseline or {}).get('scenarios', {}).get(name, {}).get('endpoints', {}).get(label)
+            if before and before.get('p95_ms'):
+                line += f"  p95 {(s['p95_ms'] - before['p95_ms']) / before['p95_ms']:+.0%}"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--collections', type=int, default=10, help='per user')
+    parser.add_argument('--resources', type=int, default=100, help='per collection')
+    parser.add_argument('--clients', type=int, default=5, help='users that log in and send requests')
+    parser.add_argument('--iterations', type=int, default=100, help='runs of each scenario')
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--metadata-delay-ms', type=float, default=50, help='stub metadata API latency')
+    parser.add_argument('--no-response-cache', action='store_true', help='measure with RESPONSE_CACHE_SIZE=0')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='write the report to this file')
+    parser.add_argument('--compare', help='earlier --json report to compare p95 latencies against')
+    args = parser.parse_args()
+
+    report = run(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+    print_report(report, baseline)
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump(report, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+Collection summary benchmark: GROUP BY on read vs denormalized counters
+
+Seeds a throwaway SQLite database with one user owning C collections of K
+resources each and compares, for the dashboard (/api/collections) path:
+
+- read: the GROUP BY (collection_id, status) used by collection_summaries()
+  against reading a precomputed per-collection counter row
+- write: the cost counters add to every resource write, measured as status
+  updates committed one at a time with and without the counter UPDATE
+
+    python benchmarks/collection_summary.py --collections 500 2000 --per-collection 20
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_migrate import upgrade  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from app import MIGRATIONS_DIR, create_app, db  # noqa: E402
+from app.collections.service import collection_summaries  # noqa: E402
+from app.models import Collection, Resource, StatusEnum, User  # noqa: E402
+
+STATUSES = [s.name for s in StatusEnum]
+COUNTER_COLUMNS = ', '.join(f'{name.lower()} INTEGER NOT NULL DEFAULT 0' for name in STATUSES)
+
+
+def seed(collections, per_collection, rng):
+    user = User(email='bench@example.com', username='bench')
+    user.set_password('Benchmark1')
+    db.session.add(user)
+    db.session.commit()
+
+    start = datetime(2020, 1, 1)
+    db.session.execute(Collection.__table__.insert(), [
+        {'name': f'collection {i}', 'user_id': user.id, 'is_public': False,
+         'created_at': start, 'updated_at': start}
+        for i in range(collections)
+    ])
+    ids = [cid for (cid,) in db.session.query(Collection.id).filter_by(user_id=user.id)]
+    rows = [
+        {'title': f'resource {cid}-{j}', 'status': rng.choice(STATUSES), 'collection_id': cid,
+         'created_at': start + timedelta(minutes=j), 'updated_at': start + timedelta(minutes=j)}
+        for cid in ids for j in range(per_collection)
+    ]
+    for i in range(0, len(rows), 10000):
+        db.session.execute(Resource.__table__.insert(), rows[i:i + 10000])
+    db.session.commit()
+    return user.id
+
+
+def build_counters():
+    """Denormalized alternative: one row per collection, kept in step with every resource write"""
+    db.session.execute(text(f'CREATE TABLE collection_counter (collection_id INTEGER PRIMARY KEY, '
+                            f'resource_count INTEGER NOT NULL DEFAULT 0, {COUNTER_COLUMNS}, last_activity DATETIME)'))
+    sums = ', '.join(f"SUM(status = '{name}')" for name in STATUSES)
+    db.session.execute(text(
+        f'INSERT INTO collection_counter SELECT collection_id, COUNT(*), {sums}, MAX(updated_at) '
+        f'FROM resource GROUP BY collection_id'
+    ))
+    db.session.commit()
+
+
+def read_group_by(user_id):
+    cols = Collection.query.filter_by(user_id=user_id).all()
+    return collection_summaries(cols)
+
+
+def read_counters(user_id):
+    cols = Collection.query.filter_by(user_id=user_id).all()
+    rows = db.session.execute(text(
+        'SELECT c.* FROM collection_counter c JOIN collection ON collection.id = c.collection_id '
+        'WHERE collection.user_id = :uid'
+    ), {'uid': user_id}).all()
+    return cols, rows
+
+
+def write_status(resource_ids, rng, with_counters):
+    samples = []
+    for rid in resource_ids:
+        new = rng.choice(STATUSES)
+        t0 = time.perf_counter()
+        res = db.session.get(Resource, rid)
+        old = res.status.name
+        res.status = StatusEnum[new]
+        if with_counters and old != new:
+            db.session.execute(text(
+                f'UPDATE collection_counter SET {old.lower()} = {old.lower()} - 1, '
+                f'{new.lower()} = {new.lower()} + 1, last_activity = :now WHERE collection_id = :cid'
+            ), {'now': datetime.utcnow(), 'cid': res.collection_id})
+        db.session.commit()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+        db.session.expunge_all()
+    return statistics.median(samples)
+
+
+def run(collections, per_collection, repeat, writes, seed_value):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    rng = random.Random(seed_value)
+    try:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path, 'SUGGESTIONS_CACHE_PATH': ''})
+        with app.app_context():
+            upgrade(directory=MIGRATIONS_DIR)
+            user_id = seed(collections, per_collection, rng)
+            build_counters()
+            resource_ids = rng.sample([rid for (rid,) in db.session.query(Resource.id)], writes)
+            result = {
+                'collections': collections,
+                'resources': collections * per_collection,
+                'read_group_by_ms': round(timed(lambda: read_group_by(user_id), repeat), 2),
+                'read_counters_ms': round(timed(lambda: read_counters(user_id), repeat), 2),
+                'write_plain_ms': round(write_status(resource_ids, rng, False), 3),
+                'write_counters_ms': round(write_status(resource_ids, rng, True), 3),
+            }
+            db.session.remove()
+            db.engine.dispose()
+        return result
+    finally:
+        os.unlink(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--collections', type=int, nargs='+', default=[500, 2000])
+    parser.add_argument('--per-collection', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--writes', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args()
+
+    results = []
+    for collections in args.collections:
+        r = run(collections, args.per_collection, args.repeat, args.writes, args.seed)
+        results.append(r)
+        print(f"{collections:>6} collections / {r['resources']} resources")
+        print(f"    dashboard read   GROUP BY {r['read_group_by_ms']:>8.2f} ms   counters {r['read_counters_ms']:>8.2f} ms")
+        print(f"    status update    plain    {r['write_plain_ms']:>8.3f} ms   counters {r['write_counters_ms']:>8.3f} ms")
+
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
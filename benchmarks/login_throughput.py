@@ -0,0 +1,139 @@
+"""
+Login throughput benchmark: password hashing pool size vs logins per second
+
+For every PASSWORD_HASH_WORKERS value given, seeds a throwaway SQLite
+database with a few users and runs C client threads (like the threads of a
+threaded gunicorn worker) that log in as fast as they can for a fixed time,
+while one more thread keeps reading /api/auth/me. Reports successful logins
+per second, how many were shed with 503, login latency and the latency of
+the cheap read next to the hashing load. Pool size 0 hashes inline.
+
+    python benchmarks/login_throughput.py --pool-sizes 0 1 2 4 --clients 8 --seconds 5
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_migrate import upgrade  # noqa: E402
+
+from app import MIGRATIONS_DIR, create_app, db  # noqa: E402
+from seed_data import PASSWORD, email_for, seed  # noqa: E402
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return None
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return round(ordered[index], 2)
+
+
+def run(pool_size, args):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path,
+            'SUGGESTIONS_CACHE_PATH': '',
+            'ENRICHMENT_WORKER': False,
+            'PASSWORD_HASH_WORKERS': pool_size,
+            'PASSWORD_HASH_METHOD': args.method,
+        })
+        with app.app_context():
+            upgrade(directory=MIGRATIONS_DIR)
+            seed(args.clients, 1, 1, random.Random(42))
+
+        reader = app.test_client()
+        reader.post('/api/auth/login', json={'email': email_for(0), 'password': PASSWORD})
+
+        logins, reads = [], []
+        shed = errors = 0
+        lock = threading.Lock()
+        stop = threading.Event()
+        start = threading.Barrier(args.clients + 2)
+
+        def login_loop(n):
+            nonlocal shed, errors
+            client = app.test_client()
+            start.wait()
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                response = client.post('/api/auth/login', json={'email': email_for(n), 'password': PASSWORD})
+                ms = (time.perf_counter() - t0) * 1000
+                with lock:
+                    if response.status_code == 200:
+                        logins.append(ms)
+                    elif response.status_code == 503:
+                        shed += 1
+                    else:
+                        errors += 1
+
+        def read_loop():
+            start.wait()
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                reader.get('/api/auth/me')
+                reads.append((time.perf_counter() - t0) * 1000)
+                time.sleep(0.005)
+
+        threads = [threading.Thread(target=login_loop, args=(n,)) for n in range(args.clients)]
+        threads.append(threading.Thread(target=read_loop))
+        for thread in threads:
+            thread.start()
+        start.wait()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        logins.sort()
+        reads.sort()
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        return {
+            'pool_size': pool_size,
+            'logins_per_s': round(len(logins) / args.seconds, 1),
+            'shed_503': shed,
+            'errors': errors,
+            'login_p50_ms': percentile(logins, 50),
+            'login_p95_ms': percentile(logins, 95),
+            'read_p50_ms': percentile(reads, 50),
+            'read_p95_ms': percentile(reads, 95),
+        }
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.unlink(path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--pool-sizes', type=int, nargs='+', default=[0, 1, 2, 4])
+    parser.add_argument('--clients', type=int, default=8, help='concurrent login threads')
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--method', default='scrypt:32768:8:1', help='PASSWORD_HASH_METHOD to measure')
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args()
+
+    results = []
+    for pool_size in args.pool_sizes:
+        r = run(pool_size, args)
+        results.append(r)
+        print(f"pool {pool_size:>2}   {r['logins_per_s']:>7.1f} logins/s   503s {r['shed_503']:>5}   "
+              f"login p50 {r['login_p50_ms'] or 0:>8.2f} p95 {r['login_p95_ms'] or 0:>8.2f} ms   "
+              f"/me p50 {r['read_p50_ms'] or 0:>7.2f} p95 {r['read_p95_ms'] or 0:>7.2f} ms")
+
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Search latency benchmark: ilike substring scan vs the full-text index
+
+Seeds a throwaway SQLite database with N resources in one collection (the
+worst case for a shared library) and times the first page of results for a
+few representative queries on both backends.
+
+    python benchmarks/search_latency.py --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_migrate import upgrade  # noqa: E402
+
+from app import MIGRATIONS_DIR, create_app, db  # noqa: E402
+from app.models import Collection, Resource, User  # noqa: E402
+from app.search import LikeBackend, get_backend  # noqa: E402
+
+QUERIES = ['quan', 'mechanics', 'zyx', 'theory of']
+PAGE = 50
+
+
+def vocabulary(rng, size=5000):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    words = {''.join(rng.choice(letters) for _ in range(rng.randint(4, 10))) for _ in range(size)}
+    return sorted(words) + ['quantum', 'mechanics', 'theory', 'of', 'introduction', 'analysis']
+
+
+def seed(n, rng):
+    words = vocabulary(rng)
+    user = User(email='bench@example.com', username='bench')
+    user.set_password('Benchmark1')
+    db.session.add(user)
+    db.session.flush()
+    col = Collection(name='bench', user_id=user.id)
+    db.session.add(col)
+    db.session.commit()
+
+    start = datetime(2020, 1, 1)
+    rows = (
+        {
+            'title': ' '.join(rng.choice(words) for _ in range(rng.randint(2, 6))),
+            'authors': ', '.join(rng.choice(words).title() for _ in range(rng.randint(1, 3))),
+            'status': 'NOT_STARTED',
+            'collection_id': col.id,
+            'created_at': start + timedelta(seconds=i),
+            'updated_at': start + timedelta(seconds=i),
+        }
+        for i in range(n)
+    )
+    t0 = time.perf_counter()
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == 10000:
+            db.session.execute(Resource.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(Resource.__table__.insert(), batch)
+    db.session.commit()
+    return col.id, time.perf_counter() - t0
+
+
+def time_query(backend, cid, q, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        query, rank = backend.search(Resource.query.filter_by(collection_id=cid), Resource, q)
+        order = (rank, Resource.id) if rank is not None else (Resource.created_at.desc(), Resource.id.desc())
+        query.order_by(*order).limit(PAGE + 1).all()
+        samples.append((time.perf_counter() - t0) * 1000)
+        db.session.expunge_all()
+    return statistics.median(samples)
+
+
+def run(size, repeat, seed_value):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path})
+        with app.app_context():
+            upgrade(directory=MIGRATIONS_DIR)
+            cid, seed_seconds = seed(size, random.Random(seed_value))
+            fts = get_backend()
+            result = {'resources': size, 'backend': fts.name, 'insert_rows_per_s': round(size / seed_seconds)}
+            for q in QUERIES:
+                result[q] = {
+                    'like_ms': round(time_query(LikeBackend(), cid, q, repeat), 2),
+                    'fulltext_ms': round(time_query(fts, cid, q, repeat), 2),
+                }
+            db.session.remove()
+            db.engine.dispose()
+        return result
+    finally:
+        os.unlink(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        result = run(size, args.repeat, args.seed)
+        results.append(result)
+        print(f"{size:>9} resources ({result['backend']}, {result['insert_rows_per_s']} inserts/s with index sync)")
+        for q in QUERIES:
+            r = result[q]
+            print(f"    q={q!r:<14} ilike {r['like_ms']:>9.2f} ms   full-text {r['fulltext_ms']:>9.2f} ms")
+
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
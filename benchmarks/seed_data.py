@@ -0,0 +1,128 @@
+"""
+Benchmark data generator: N users x M collections x K resources
+
+Rows are written with bulk Core inserts (the FTS triggers still index them),
+authors are linked through the author tables like the API does, and every
+user gets the same password so load scripts can log in as any of them.
+Importable by the other benchmarks, or run on its own to fill a database
+for manual load testing:
+
+    python benchmarks/seed_data.py --database-url sqlite:///load.db --users 50 --collections 20 --resources 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_migrate import upgrade  # noqa: E402
+
+from app import MIGRATIONS_DIR, create_app, db  # noqa: E402
+from app.models import Author, AuthorToken, Collection, Resource, ResourceAuthor, StatusEnum, User  # noqa: E402
+
+PASSWORD = 'Benchmark1'
+BATCH = 5000
+WORDS = ['quantum', 'mechanics', 'theory', 'introduction', 'analysis', 'history', 'systems', 'design',
+         'language', 'networks', 'biology', 'economics', 'philosophy', 'algebra', 'geometry', 'music',
+         'poetry', 'empire', 'ocean', 'machine', 'learning', 'data', 'cities', 'climate', 'memory']
+FIRST = ['Ada', 'Alan', 'Grace', 'Donald', 'Barbara', 'Edsger', 'Frances', 'John', 'Margaret', 'Claude',
+         'Radia', 'Ken', 'Leslie', 'Niklaus', 'Shafi', 'Tim', 'Ursula', 'Virginia', 'Italo', 'Jorge']
+LAST = ['Lovelace', 'Turing', 'Hopper', 'Knuth', 'Liskov', 'Dijkstra', 'Allen', 'McCarthy', 'Hamilton',
+        'Shannon', 'Perlman', 'Thompson', 'Lamport', 'Wirth', 'Goldwasser', 'Berners-Lee', 'Le Guin',
+        'Woolf', 'Calvino', 'Borges']
+
+
+def email_for(n):
+    return f'user{n}@example.com'
+
+
+def _insert(table, rows):
+    for i in range(0, len(rows), BATCH):
+        db.session.execute(table.insert(), rows[i:i + BATCH])
+
+
+def seed(users, collections, resources, rng=None):
+    """Seed the current app's database; returns {user_id: {'email', 'collections': {cid: [rid, ...]}}}"""
+    rng = rng or random.Random(42)
+    statuses = list(StatusEnum)
+    start = datetime(2022, 1, 1)
+    probe = User(email='')
+    probe.set_password(PASSWORD)
+    password_hash = probe.password_hash  # hashing is slow; every user shares one hash
+
+    _insert(User.__table__, [
+        {'email': email_for(n), 'username': f'user{n}', 'password_hash': password_hash, 'role': 'user',
+         'is_deleted': False, 'created_at': start, 'updated_at': start}
+        for n in range(users)
+    ])
+    user_ids = dict(db.session.query(User.email, User.id).filter(User.email.in_([email_for(n) for n in range(users)])))
+
+    _insert(Collection.__table__, [
+        {'name': f'{rng.choice(WORDS).title()} reading list {m}', 'description': ' '.join(rng.sample(WORDS, 4)),
+         'user_id': user_ids[email_for(n)], 'is_public': False,
+         'created_at': start + timedelta(days=m), 'updated_at': start + timedelta(days=m)}
+        for n in range(users) for m in range(collections)
+    ])
+
+    names = [f'{first} {last}' for first in FIRST for last in LAST]
+    _insert(Author.__table__, [
+        {'name': name, 'name_key': Author.normalize(name), 'created_at': start} for name in names
+    ])
+    author_ids = dict(db.session.query(Author.name, Author.id).filter(Author.name.in_(names)))
+    _insert(AuthorToken.__table__, [
+        {'author_id': aid, 'token': token} for name, aid in author_ids.items()
+        for token in AuthorToken.words(Author.normalize(name))
+    ])
+
+    collection_ids = [cid for (cid,) in db.session.query(Collection.id)
+                      .filter(Collection.user_id.in_(user_ids.values())).order_by(Collection.id)]
+    authors_for = {}
+    rows = []
+    for cid in collection_ids:
+        for k in range(resources):
+            when = start + timedelta(hours=k, minutes=cid % 60)
+            authors = rng.sample(names, rng.randint(1, 3))
+            rows.append({'title': ' '.join(rng.sample(WORDS, rng.randint(2, 5))).capitalize(),
+                         'authors': ', '.join(authors), 'url': None, 'status': rng.choice(statuses),
+                         'collection_id': cid, 'created_at': when, 'updated_at': when})
+            authors_for[(cid, k)] = authors
+    _insert(Resource.__table__, rows)
+
+    layout = {uid: {'email': email, 'collections': {}} for email, uid in user_ids.items()}
+    owner = dict(db.session.query(Collection.id, Collection.user_id).filter(Collection.id.in_(collection_ids)))
+    links = []
+    for cid in collection_ids:
+        rids = [rid for (rid,) in db.session.query(Resource.id).filter_by(collection_id=cid).order_by(Resource.id)]
+        layout[owner[cid]]['collections'][cid] = rids
+        for k, rid in enumerate(rids):
+            links.extend({'resource_id': rid, 'author_id': author_ids[name], 'position': position}
+                         for position, name in enumerate(authors_for[(cid, k)]))
+    _insert(ResourceAuthor.__table__, links)
+    db.session.commit()
+    return layout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--database-url', required=True, help='database to migrate and fill')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--collections', type=int, default=10, help='per user')
+    parser.add_argument('--resources', type=int, default=100, help='per collection')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': args.database_url, 'SUGGESTIONS_CACHE_PATH': ''})
+    with app.app_context():
+        upgrade(directory=MIGRATIONS_DIR)
+        t0 = time.perf_counter()
+        seed(args.users, args.collections, args.resources, random.Random(args.seed))
+    total = args.users * args.collections * args.resources
+    print(f'Seeded {args.users} users, {args.users * args.collections} collections and {total} resources '
+          f'in {time.perf_counter() - t0:.1f} s; password for userN@example.com is {PASSWORD}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Write throughput benchmark: SQLite with default settings vs the tuned profile
+
+Starts W worker processes (like W gunicorn workers) against one throwaway
+SQLite database. Each worker logs in as its own user and issues a mix of
+resource creates and status updates through the app for a fixed time. The
+"default" profile reproduces the old engine setup (rollback journal,
+synchronous=FULL, deferred transactions); "tuned" uses the SQLITE_* settings
+from config.py (WAL, synchronous=NORMAL, busy timeout, BEGIN IMMEDIATE for
+write requests). Failed requests are mostly ``database is locked`` errors.
+
+    python benchmarks/write_throughput.py --workers 1 4 8 --seconds 5
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_migrate import upgrade  # noqa: E402
+
+from app import MIGRATIONS_DIR, create_app, db  # noqa: E402
+
+PROFILES = {
+    'default': {
+        'SQLITE_JOURNAL_MODE': '',
+        'SQLITE_SYNCHRONOUS': '',
+        'SQLITE_BUSY_TIMEOUT_MS': 0,
+        'SQLITE_MMAP_SIZE': 0,
+        'SQLITE_CACHE_SIZE': 0,
+        'SQLITE_BEGIN_IMMEDIATE': False,
+    },
+    'tuned': {},
+}
+STATUSES = ('Not Started', 'In Progress', 'Paused', 'Completed')
+
+
+def make_app(path, profile):
+    config = {
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path,
+        'SUGGESTIONS_CACHE_PATH': '',
+        'RESPONSE_CACHE_SIZE': 0,
+        'ENRICHMENT_WORKER': False,
+        # keep the benchmark off the network
+        'METADATA_API': 'http://127.0.0.1:9',
+    }
+    config.update(PROFILES[profile])
+    return create_app(config)
+
+
+def worker(args):
+    path, profile, n, seconds, start_at = args
+    app = make_app(path, profile)
+    client = app.test_client()
+    email, password = f'writer{n}@example.com', 'Benchmark1'
+    client.post('/api/auth/register', json={'email': email, 'password': password})
+    client.post('/api/auth/login', json={'email': email, 'password': password})
+    cid = client.post('/api/collections', json={'name': f'Writer {n}'}).get_json()['collection']['id']
+
+    latencies = []
+    errors = 0
+    resource_ids = []
+    i = 0
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            if i % 2 == 0 or not resource_ids:
+                response = client.post(f'/api/collections/{cid}/resources',
+                                       json={'title': f'Paper {n}-{i}', 'authors': 'Ada Lovelace'})
+                ok = response.status_code == 201
+                if ok:
+                    resource_ids.append(response.get_json()['resource']['id'])
+            else:
+                rid = resource_ids[i % len(resource_ids)]
+                response = client.put(f'/api/resources/{rid}', json={'status': STATUSES[i % len(STATUSES)]})
+                ok = response.status_code == 200
+        except Exception:  # with TESTING set, "database is locked" propagates out of the request
+            ok = False
+            with app.app_context():
+                db.session.rollback()
+        if ok:
+            latencies.append((time.perf_counter() - t0) * 1000)
+        else:
+            errors += 1
+        i += 1
+    return latencies, errors
+
+
+def run(profile, workers, seconds):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        app = make_app(path, profile)
+        with app.app_context():
+            upgrade(directory=MIGRATIONS_DIR)
+            db.engine.dispose()
+        start_at = time.time() + 3  # after every worker has logged in
+        with multiprocessing.get_context('spawn').Pool(workers) as pool:
+            results = pool.map(worker, [(path, profile, n, seconds, start_at) for n in range(workers)])
+        latencies = sorted(ms for lat, _ in results for ms in lat)
+        errors = sum(err for _, err in results)
+        return {
+            'profile': profile,
+            'workers': workers,
+            'writes_per_s': round(len(latencies) / seconds, 1),
+            'errors': errors,
+            'p50_ms': round(statistics.median(latencies), 2) if latencies else None,
+            'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1], 2) if latencies else None,
+        }
+    finally:
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.unlink(path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--profiles', nargs='+', choices=sorted(PROFILES), default=['default', 'tuned'])
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args()
+
+    results = []
+    for workers in args.workers:
+        print(f'{workers:>3} workers')
+        for profile in args.profiles:
+            r = run(profile, workers, args.seconds)
+            results.append(r)
+            print(f"    {profile:<8} {r['writes_per_s']:>8.1f} writes/s   errors {r['errors']:>5}   "
+                  f"p50 {r['p50_ms'] or 0:>7.2f} ms   p95 {r['p95_ms'] or 0:>7.2f} ms")
+
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,4 +5,89 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///sutra_atlas.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # reads of GET/HEAD requests go here when set (see app/database.py)
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    # SQLite connection settings; an empty value keeps SQLite's default
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 268435456))
+    # negative values are KiB: 64 MiB of page cache per connection
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -65536))
+    SQLITE_BEGIN_IMMEDIATE = os.environ.get('SQLITE_BEGIN_IMMEDIATE', '1').lower() in ('1', 'true', 'yes')
+    # enforce foreign keys (ON DELETE CASCADE / SET NULL); SQLite leaves them off unless asked
+    SQLITE_FOREIGN_KEYS = os.environ.get('SQLITE_FOREIGN_KEYS', '1').lower() in ('1', 'true', 'yes')
+    # connection pool for PostgreSQL and other server databases
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1').lower() in ('1', 'true', 'yes')
     METADATA_API = os.environ.get('METADATA_API', 'https://openlibrary.org')
+    METADATA_CONNECT_TIMEOUT = float(os.environ.get('METADATA_CONNECT_TIMEOUT', 2))
+    METADATA_READ_TIMEOUT = float(os.environ.get('METADATA_READ_TIMEOUT', 5))
+    # budget for all attempts of one metadata call, retries and backoff included
+    METADATA_TOTAL_TIMEOUT = float(os.environ.get('METADATA_TOTAL_TIMEOUT', 5))
+    METADATA_POOL_SIZE = int(os.environ.get('METADATA_POOL_SIZE', 10))
+    METADATA_MAX_CONCURRENCY = int(os.environ.get('METADATA_MAX_CONCURRENCY', 8))
+    METADATA_RETRIES = int(os.environ.get('METADATA_RETRIES', 2))
+    METADATA_RETRY_BACKOFF = float(os.environ.get('METADATA_RETRY_BACKOFF', 0.2))
+    METADATA_BREAKER_THRESHOLD = int(os.environ.get('METADATA_BREAKER_THRESHOLD', 5))
+    METADATA_BREAKER_RESET = float(os.environ.get('METADATA_BREAKER_RESET', 30))
+    RESOURCES_PAGE_SIZE = int(os.environ.get('RESOURCES_PAGE_SIZE', 50))
+    RESOURCES_PAGE_MAX = int(os.environ.get('RESOURCES_PAGE_MAX', 200))
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 500))
+    IMPORT_CHUNK_MAX = int(os.environ.get('IMPORT_CHUNK_MAX', 5000))
+    IMPORT_MAX_REPORTED_ERRORS = int(os.environ.get('IMPORT_MAX_REPORTED_ERRORS', 1000))
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 500))
+    BATCH_MAX_IDS = int(os.environ.get('BATCH_MAX_IDS', 500))
+    SQL_STATEMENT_COUNTING = os.environ.get('SQL_STATEMENT_COUNTING', '').lower() in ('1', 'true', 'yes')
+    # Server-Timing headers, /metrics and N+1 warnings (see app/instrumentation.py)
+    REQUEST_PROFILING = os.environ.get('REQUEST_PROFILING', '').lower() in ('1', 'true', 'yes')
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    # without a token /metrics answers 404 unless explicitly made public
+    METRICS_PUBLIC = os.environ.get('METRICS_PUBLIC', '').lower() in ('1', 'true', 'yes')
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 5))
+    # share of requests run under cProfile; dumps of the slowest go to PROFILE_DIR (default instance/profiles)
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_MIN_MS = float(os.environ.get('PROFILE_MIN_MS', 200))
+    PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 20))
+    PROFILE_DIR = os.environ.get('PROFILE_DIR')
+    # werkzeug method string: algorithm and cost; stored hashes made differently are upgraded on login
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    # hashing processes; 0 hashes inline in the request thread
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+    # hashes allowed to wait for a worker before requests get 503 (default 8 per worker)
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 0))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+    # 'memory', a redis:// URL, or 'module:Class'
+    USER_CACHE_BACKEND = os.environ.get('USER_CACHE_BACKEND', 'memory')
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 30))
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 4096))
+    # on-disk tier lives in the instance folder unless set; '' keeps the cache in memory only
+    SUGGESTIONS_CACHE_PATH = os.environ.get('SUGGESTIONS_CACHE_PATH')
+    SUGGESTIONS_CACHE_TTL = int(os.environ.get('SUGGESTIONS_CACHE_TTL', 3600))
+    SUGGESTIONS_CACHE_STALE_TTL = int(os.environ.get('SUGGESTIONS_CACHE_STALE_TTL', 86400))
+    SUGGESTIONS_CACHE_SIZE = int(os.environ.get('SUGGESTIONS_CACHE_SIZE', 2048))
+    # run the enrichment worker as a thread in each app process; or use `flask enrichment-worker`
+    ENRICHMENT_WORKER = os.environ.get('ENRICHMENT_WORKER', '').lower() in ('1', 'true', 'yes')
+    ENRICHMENT_BATCH_SIZE = int(os.environ.get('ENRICHMENT_BATCH_SIZE', 50))
+    ENRICHMENT_CONCURRENCY = int(os.environ.get('ENRICHMENT_CONCURRENCY', 4))
+    ENRICHMENT_POLL_INTERVAL = float(os.environ.get('ENRICHMENT_POLL_INTERVAL', 5))
+    ENRICHMENT_MAX_ATTEMPTS = int(os.environ.get('ENRICHMENT_MAX_ATTEMPTS', 5))
+    STATS_MAX_RANGE_DAYS = int(os.environ.get('STATS_MAX_RANGE_DAYS', 3660))
+    # delta sync (app/sync.py): rows per response, cursor overlap and tombstone retention
+    DELTA_SYNC_PAGE_SIZE = int(os.environ.get('DELTA_SYNC_PAGE_SIZE', 2000))
+    DELTA_SYNC_OVERLAP_SECONDS = float(os.environ.get('DELTA_SYNC_OVERLAP_SECONDS', 5))
+    DELTA_SYNC_RETENTION_DAYS = int(os.environ.get('DELTA_SYNC_RETENTION_DAYS', 30))
+    # response compression (app/compression.py); bodies below COMPRESS_MIN_BYTES go out as they are, 0 turns it off
+    COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 5))
+    # page routes embed the first API response so pages render without waiting on a fetch
+    EMBED_INITIAL_DATA = os.environ.get('EMBED_INITIAL_DATA', '1').lower() in ('1', 'true', 'yes')
+    # server-side cache of list responses; 'memory', a redis:// URL or 'module:Class'; size 0 disables it
+    RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'memory')
+    RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 1024))
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 300))
+    RESPONSE_CACHE_MAX_ENTRY_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRY_BYTES', 262144))
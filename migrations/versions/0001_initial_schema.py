@@ -0,0 +1,82 @@
+"""Initial schema: users, collections and resources
+
+Databases created by the old ``db.create_all()`` startup already have these
+tables, so each one is only created when it is missing and such a database
+can be brought under migrations with a plain ``flask db upgrade``.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 09:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+STATUS = sa.Enum('NOT_STARTED', 'IN_PROGRESS', 'PAUSED', 'COMPLETED', name='statusenum')
+
+
+def _tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    tables = _tables()
+    if 'user' not in tables:
+        op.create_table(
+            'user',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('email', sa.String(length=255), nullable=False),
+            sa.Column('username', sa.String(length=150), nullable=True),
+            sa.Column('password_hash', sa.String(length=256), nullable=False),
+            sa.Column('role', sa.String(length=32), nullable=False),
+            sa.Column('is_deleted', sa.Boolean(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_user_email', 'user', ['email'], unique=True)
+    if 'collection' not in tables:
+        op.create_table(
+            'collection',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=200), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('is_public', sa.Boolean(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_collection_user_id', 'collection', ['user_id'])
+    if 'resource' not in tables:
+        op.create_table(
+            'resource',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('title', sa.String(length=300), nullable=False),
+            sa.Column('authors', sa.String(length=500), nullable=True),
+            sa.Column('url', sa.String(length=1000), nullable=True),
+            sa.Column('status', STATUS, nullable=False),
+            sa.Column('last_read_date', sa.DateTime(), nullable=True),
+            sa.Column('collection_id', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['collection_id'], ['collection.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_resource_collection_id', 'resource', ['collection_id'])
+        op.create_index('ix_resource_title', 'resource', ['title'])
+
+
+def downgrade():
+    op.drop_table('resource')
+    op.drop_table('collection')
+    op.drop_table('user')
+    STATUS.drop(op.get_bind(), checkfirst=True)
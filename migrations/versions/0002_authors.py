@@ -0,0 +1,93 @@
+"""Normalized author tables, backfilled from Resource.authors
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 09:10:00
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def _normalize(name):
+    # must match Author.normalize
+    return ' '.join(name.split()).casefold()
+
+
+def upgrade():
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'author' not in tables:
+        op.create_table(
+            'author',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=500), nullable=False),
+            sa.Column('name_key', sa.String(length=500), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_author_name_key', 'author', ['name_key'], unique=True)
+    if 'resource_author' not in tables:
+        op.create_table(
+            'resource_author',
+            sa.Column('resource_id', sa.Integer(), nullable=False),
+            sa.Column('author_id', sa.Integer(), nullable=False),
+            sa.Column('position', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['author_id'], ['author.id']),
+            sa.ForeignKeyConstraint(['resource_id'], ['resource.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('resource_id', 'author_id'),
+        )
+        op.create_index('ix_resource_author_author_id', 'resource_author', ['author_id', 'resource_id'])
+    indexes = {ix['name'] for ix in sa.inspect(op.get_bind()).get_indexes('resource_author')}
+    if 'ix_resource_author_resource_position' not in indexes:
+        op.create_index('ix_resource_author_resource_position', 'resource_author',
+                        ['resource_id', 'position', 'author_id'])
+    _backfill()
+
+
+def _backfill():
+    """Link every resource that has an authors string but no author rows yet"""
+    bind = op.get_bind()
+    meta = sa.MetaData()
+    resource = sa.Table('resource', meta, autoload_with=bind)
+    author = sa.Table('author', meta, autoload_with=bind)
+    link = sa.Table('resource_author', meta, autoload_with=bind)
+
+    rows = bind.execute(
+        sa.select(resource.c.id, resource.c.authors)
+        .where(resource.c.authors.isnot(None), resource.c.authors != '')
+        .where(~sa.exists().where(link.c.resource_id == resource.c.id))
+        .order_by(resource.c.id)
+    ).all()
+    if not rows:
+        return
+    ids = dict(bind.execute(sa.select(author.c.name_key, author.c.id)).all())
+    now = datetime.utcnow()
+    links = []
+    for rid, authors in rows:
+        seen = set()
+        for name in (a.strip() for a in authors.split(',')):
+            key = _normalize(name) if name else ''
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            if key not in ids:
+                ids[key] = bind.execute(
+                    author.insert().values(name=' '.join(name.split()), name_key=key, created_at=now)
+                ).inserted_primary_key[0]
+            links.append({'resource_id': rid, 'author_id': ids[key], 'position': len(seen) - 1})
+    if links:
+        bind.execute(link.insert(), links)
+
+
+def downgrade():
+    op.drop_table('resource_author')
+    op.drop_table('author')
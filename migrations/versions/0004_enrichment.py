@@ -0,0 +1,58 @@
+"""Metadata enrichment: resource_metadata and the enrichment_job queue
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 09:30:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'resource_metadata' not in tables:
+        op.create_table(
+            'resource_metadata',
+            sa.Column('resource_id', sa.Integer(), nullable=False),
+            sa.Column('canonical_title', sa.String(length=300), nullable=True),
+            sa.Column('normalized_title', sa.String(length=300), nullable=True),
+            sa.Column('isbn', sa.String(length=20), nullable=True),
+            sa.Column('publish_year', sa.Integer(), nullable=True),
+            sa.Column('source', sa.String(length=50), nullable=False),
+            sa.Column('fetched_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['resource_id'], ['resource.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('resource_id'),
+        )
+        op.create_index('ix_resource_metadata_normalized_title', 'resource_metadata', ['normalized_title'])
+        op.create_index('ix_resource_metadata_isbn', 'resource_metadata', ['isbn'])
+    if 'enrichment_job' not in tables:
+        op.create_table(
+            'enrichment_job',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('resource_id', sa.Integer(), nullable=False),
+            sa.Column('state', sa.String(length=16), nullable=False),
+            sa.Column('attempts', sa.Integer(), nullable=False),
+            sa.Column('last_error', sa.String(length=500), nullable=True),
+            sa.Column('claim_token', sa.String(length=32), nullable=True),
+            sa.Column('claimed_at', sa.DateTime(), nullable=True),
+            sa.Column('available_at', sa.DateTime(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['resource_id'], ['resource.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_enrichment_job_resource_id', 'enrichment_job', ['resource_id'])
+        op.create_index('ix_enrichment_job_state_available', 'enrichment_job', ['state', 'available_at'])
+
+
+def downgrade():
+    op.drop_table('enrichment_job')
+    op.drop_table('resource_metadata')
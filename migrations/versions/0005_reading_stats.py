@@ -0,0 +1,60 @@
+"""Reading statistics: the status_event log and its daily rollups
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 09:40:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+STATUS_NAMES = ('NOT_STARTED', 'IN_PROGRESS', 'PAUSED', 'COMPLETED')
+# the PostgreSQL type was created with the resource table
+STATUS = sa.Enum(*STATUS_NAMES, name='statusenum').with_variant(
+    postgresql.ENUM(*STATUS_NAMES, name='statusenum', create_type=False), 'postgresql')
+
+
+def upgrade():
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'status_event' not in tables:
+        op.create_table(
+            'status_event',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('resource_id', sa.Integer(), nullable=True),
+            sa.Column('collection_id', sa.Integer(), nullable=True),
+            sa.Column('from_status', STATUS, nullable=True),
+            sa.Column('to_status', STATUS, nullable=False),
+            sa.Column('seconds_in_previous', sa.Integer(), nullable=False),
+            sa.Column('occurred_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['resource_id'], ['resource.id'], ondelete='SET NULL'),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_status_event_user_occurred', 'status_event', ['user_id', 'occurred_at'])
+        op.create_index('ix_status_event_resource_occurred', 'status_event', ['resource_id', 'occurred_at'])
+    if 'status_daily_rollup' not in tables:
+        op.create_table(
+            'status_daily_rollup',
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('status', STATUS, nullable=False),
+            sa.Column('entered', sa.Integer(), nullable=False),
+            sa.Column('exited', sa.Integer(), nullable=False),
+            sa.Column('seconds_in_status', sa.BigInteger(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('user_id', 'day', 'status'),
+        )
+
+
+def downgrade():
+    op.drop_table('status_daily_rollup')
+    op.drop_table('status_event')
@@ -0,0 +1,31 @@
+"""Per-scope change counters behind the ETag validators
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 09:50:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'data_version' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            'data_version',
+            sa.Column('scope', sa.String(length=64), nullable=False),
+            sa.Column('version', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('scope'),
+        )
+
+
+def downgrade():
+    op.drop_table('data_version')
@@ -0,0 +1,63 @@
+"""Composite indexes for the list queries, built without blocking writes
+
+On PostgreSQL the indexes are created with ``CREATE INDEX CONCURRENTLY``
+outside the migration transaction, so a live table keeps accepting writes
+while they build. The single-column indexes on ``resource.collection_id``
+and ``collection.user_id`` are dropped afterwards: the composite indexes
+lead with the same column and serve every lookup they did.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 10:00:00
+
+"""
+from contextlib import nullcontext
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_collection_user_created', 'collection', ['user_id', 'created_at']),
+    ('ix_collection_user_name', 'collection', ['user_id', 'name']),
+    ('ix_resource_collection_created', 'resource', ['collection_id', 'created_at', 'id']),
+    ('ix_resource_collection_title', 'resource', ['collection_id', 'title', 'id']),
+    ('ix_resource_collection_status', 'resource', ['collection_id', 'status', 'id']),
+]
+SUPERSEDED = [
+    ('ix_collection_user_id', 'collection', ['user_id']),
+    ('ix_resource_collection_id', 'resource', ['collection_id']),
+]
+
+
+def _existing(table):
+    return {ix['name'] for ix in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    concurrent = op.get_bind().dialect.name == 'postgresql'
+    with op.get_context().autocommit_block() if concurrent else nullcontext():
+        for name, table, columns in INDEXES:
+            if name not in _existing(table):
+                op.create_index(name, table, columns, postgresql_concurrently=concurrent)
+        for name, table, _ in SUPERSEDED:
+            if name in _existing(table):
+                op.drop_index(name, table_name=table, postgresql_concurrently=concurrent)
+
+
+def downgrade():
+    concurrent = op.get_bind().dialect.name == 'postgresql'
+    with op.get_context().autocommit_block() if concurrent else nullcontext():
+        for name, table, columns in SUPERSEDED:
+            if name not in _existing(table):
+                op.create_index(name, table, columns, postgresql_concurrently=concurrent)
+        for name, table, _ in INDEXES:
+            if name in _existing(table):
+                op.drop_index(name, table_name=table, postgresql_concurrently=concurrent)
+
@@ -0,0 +1,51 @@
+"""Delta sync: resource tombstones and the (collection_id, updated_at) index
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 11:00:00
+
+"""
+from contextlib import nullcontext
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def _existing(table):
+    return {ix['name'] for ix in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    if 'resource_tombstone' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            'resource_tombstone',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('resource_id', sa.Integer(), nullable=False),
+            sa.Column('collection_id', sa.Integer(), nullable=False),
+            sa.Column('deleted_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_resource_tombstone_collection_deleted', 'resource_tombstone',
+                        ['collection_id', 'deleted_at'])
+
+    # like 0007: build without blocking writes on PostgreSQL
+    concurrent = op.get_bind().dialect.name == 'postgresql'
+    with op.get_context().autocommit_block() if concurrent else nullcontext():
+        if 'ix_resource_collection_updated' not in _existing('resource'):
+            op.create_index('ix_resource_collection_updated', 'resource', ['collection_id', 'updated_at', 'id'],
+                            postgresql_concurrently=concurrent)
+
+
+def downgrade():
+    concurrent = op.get_bind().dialect.name == 'postgresql'
+    with op.get_context().autocommit_block() if concurrent else nullcontext():
+        if 'ix_resource_collection_updated' in _existing('resource'):
+            op.drop_index('ix_resource_collection_updated', table_name='resource', postgresql_concurrently=concurrent)
+    op.drop_table('resource_tombstone')
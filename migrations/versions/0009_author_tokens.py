@@ -0,0 +1,57 @@
+"""Author name words for the word-prefix author filter, backfilled from author.name_key
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 12:00:00
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def _words(name_key):
+    # must match AuthorToken.words
+    return list(dict.fromkeys(re.findall(r'\w+', name_key)))
+
+
+def upgrade():
+    if 'author_token' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            'author_token',
+            sa.Column('author_id', sa.Integer(), nullable=False),
+            sa.Column('token', sa.String(length=500), nullable=False),
+            sa.ForeignKeyConstraint(['author_id'], ['author.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('author_id', 'token'),
+        )
+        op.create_index('ix_author_token_token', 'author_token', ['token', 'author_id'])
+    _backfill()
+
+
+def _backfill():
+    """Add the words of every author that has none yet"""
+    bind = op.get_bind()
+    meta = sa.MetaData()
+    author = sa.Table('author', meta, autoload_with=bind)
+    token = sa.Table('author_token', meta, autoload_with=bind)
+
+    rows = bind.execute(
+        sa.select(author.c.id, author.c.name_key)
+        .where(~sa.exists().where(token.c.author_id == author.c.id))
+        .order_by(author.c.id)
+    ).all()
+    tokens = [{'author_id': aid, 'token': word} for aid, key in rows for word in _words(key)]
+    if tokens:
+        bind.execute(token.insert(), tokens)
+
+
+def downgrade():
+    op.drop_table('author_token')
@@ -0,0 +1,26 @@
+"""Compare author tokens in code point order on PostgreSQL, so prefix ranges hold under any database collation
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17 13:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite already compares with BINARY; the indexes on the column are rebuilt with the new collation
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('ALTER TABLE author_token ALTER COLUMN token TYPE VARCHAR(500) COLLATE "C"')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('ALTER TABLE author_token ALTER COLUMN token TYPE VARCHAR(500) COLLATE "default"')
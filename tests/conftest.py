@@ -0,0 +1,91 @@
+import sqlite3
+import time
+
+import pytest
+from flask_migrate import upgrade
+
+from app import MIGRATIONS_DIR, create_app, db
+
+TEST_CONFIG = {
+    'TESTING': True,
+    'SUGGESTIONS_CACHE_PATH': '',
+    'ENRICHMENT_WORKER': False,
+    # hash inline and cheaply; the pool and the real cost are not what these tests are about
+    'PASSWORD_HASH_WORKERS': 0,
+    'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+}
+
+
+def make_app(database_url, **config):
+    """An app on database_url, migrated to the latest revision"""
+    app = create_app(dict(TEST_CONFIG, SQLALCHEMY_DATABASE_URI=database_url, **config))
+    with app.app_context():
+        upgrade(directory=MIGRATIONS_DIR)
+    return app
+
+
+def dispose_app(app):
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def _push_request_context():
+    """Replaces pytest-flask's fixture of the same name
+
+    With its test request context pushed, every test-client request shares one
+    app context, so the database session and any transaction it left open
+    outlive the request, unlike in a real worker.
+    """
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app('sqlite:///' + str(tmp_path / 'test.db'))
+    yield app
+    dispose_app(app)
+
+
+def login(client, email='reader@example.com', password='Password1'):
+    client.post('/api/auth/register', json={'email': email, 'password': password})
+    response = client.post('/api/auth/login', json={'email': email, 'password': password})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['user']
+
+
+def raw_connection(app):
+    """A second connection to the app's SQLite file that never waits for a lock"""
+    conn = sqlite3.connect(app.config['SQLALCHEMY_DATABASE_URI'][len('sqlite:///'):], timeout=0,
+                           isolation_level=None)
+    conn.execute('PRAGMA foreign_keys=ON')
+    return conn
+
+
+def write_lock_is_free(app):
+    conn = raw_connection(app)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('ROLLBACK')
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+
+class Clock:
+    """Settable stand-in for time.time / time.monotonic"""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
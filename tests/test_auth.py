@@ -0,0 +1,44 @@
+"""
+Registration only hashes passwords for accounts it is going to create
+"""
+from app import db
+from app.auth import routes
+from app.models import User
+from tests.conftest import login
+
+
+def test_duplicate_registration_is_rejected_before_hashing(app, client):
+    login(client, email='ada@example.com')
+    client.post('/api/auth/logout')
+    client.post('/api/auth/register', json={'email': 'grace@example.com', 'password': 'Password1',
+                                            'username': 'grace'})
+    stats = app.extensions['password_hasher'].stats
+    hashed = stats['hashed']
+
+    response = client.post('/api/auth/register', json={'email': 'ADA@example.com', 'password': 'Password1'})
+    assert response.status_code == 409
+    response = client.post('/api/auth/register', json={'email': 'new@example.com', 'password': 'Password1',
+                                                        'username': 'grace'})
+    assert response.status_code == 409
+    assert stats['hashed'] == hashed
+
+    response = client.post('/api/auth/register', json={'email': 'new@example.com', 'password': 'Password1'})
+    assert response.status_code == 201
+    assert stats['hashed'] == hashed + 1
+    assert client.post('/api/auth/login', json={'email': 'new@example.com', 'password': 'Password1'}).status_code == 200
+
+
+def test_registration_racing_the_same_email_gets_409(app, client, monkeypatch):
+    hash_password = routes.hash_password
+
+    def racing(password):
+        # another request registers the same email while this one is hashing
+        db.session.add(User(email='ada@example.com', password_hash=hash_password(password)))
+        db.session.commit()
+        return hash_password(password)
+
+    monkeypatch.setattr(routes, 'hash_password', racing)
+    response = client.post('/api/auth/register', json={'email': 'ada@example.com', 'password': 'Password1'})
+    assert response.status_code == 409
+    with app.app_context():
+        assert User.query.filter_by(email='ada@example.com').count() == 1
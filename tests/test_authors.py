@@ -0,0 +1,66 @@
+"""
+Normalized authors: the word-prefix filter and conflict-safe creation
+"""
+import pytest
+
+from app import db, models
+from app.models import Author, AuthorToken, utcnow
+from tests.conftest import login
+
+
+@pytest.fixture
+def collection(client):
+    login(client)
+    cid = client.post('/api/collections', json={'name': 'Shelf'}).get_json()['collection']['id']
+    for title, authors in (('Notes', 'Ada Lovelace, Charles Babbage'), ('Essays', 'John Smith'),
+                           ('Compilers', 'Grace Hopper'), ('Letters', "Flannery O'Connor"),
+                           ('Solitude', 'Gabriel García Márquez'), ('Nausea', 'Jean-Paul Sartre'),
+                           ('Scriptures', '𐐔𐐯𐑅𐐨𐑉𐐯𐐻 Society')):
+        client.post(f'/api/collections/{cid}/resources', json={'title': title, 'authors': authors})
+    return cid
+
+
+@pytest.mark.parametrize('query, titles', [
+    ('ada', ['Notes']),
+    ('smith', ['Essays']),
+    ('SMI', ['Essays']),
+    ('bab', ['Notes']),
+    ('ada lov', ['Notes']),
+    ('lovelace ada', ['Notes']),
+    ('connor', ['Letters']),
+    ('o conn', ['Letters']),
+    ('garcía', ['Solitude']),
+    ('MÁR', ['Solitude']),
+    ('marquez', []),
+    ('paul', ['Nausea']),
+    ('jean-paul sar', ['Nausea']),
+    ('𐐔', ['Scriptures']),
+    ('𐐼𐐯𐑅', ['Scriptures']),
+    ('ada hopper', []),
+    ('mith', []),
+    ('--', []),
+])
+def test_author_filter_matches_any_word_by_prefix(client, collection, query, titles):
+    response = client.get(f'/api/collections/{collection}/resources', query_string={'author': query})
+    assert response.status_code == 200
+    assert sorted(r['title'] for r in response.get_json()['resources']) == titles
+
+
+def test_resolve_keeps_the_author_a_concurrent_writer_created(app, monkeypatch):
+    insert_missing = models.insert_missing
+
+    def racing(table, rows, unique):
+        if table is Author.__table__:
+            # another request adds the same author between our lookup and our insert
+            db.session.execute(table.insert().values(name='Ada Lovelace', name_key='ada lovelace', created_at=utcnow()))
+        insert_missing(table, rows, unique)
+
+    monkeypatch.setattr(models, 'insert_missing', racing)
+    with app.app_context():
+        found = Author.resolve(['Ada  Lovelace', 'Grace Hopper'])
+        db.session.commit()
+
+        assert sorted(found) == ['ada lovelace', 'grace hopper']
+        assert all(a.id is not None for a in found.values())
+        assert Author.query.count() == 2
+        assert {t.token for t in AuthorToken.query} == {'ada', 'lovelace', 'grace', 'hopper'}
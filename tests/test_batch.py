@@ -0,0 +1,72 @@
+"""
+Batch resource mutations (POST /api/resources/batch/update and /batch/delete)
+"""
+import pytest
+
+from tests.conftest import login
+
+
+@pytest.fixture
+def shelves(client):
+    login(client, email='other@example.com')
+    theirs = client.post('/api/collections', json={'name': 'Theirs'}).get_json()['collection']['id']
+    foreign = client.post(f'/api/collections/{theirs}/resources', json={'title': 'Not yours'}).get_json()['resource']['id']
+    client.post('/api/auth/logout')
+
+    login(client)
+    cids = [client.post('/api/collections', json={'name': name}).get_json()['collection']['id']
+            for name in ('Shelf', 'Archive')]
+    rids = [client.post(f'/api/collections/{cids[0]}/resources', json={'title': title}).get_json()['resource']['id']
+            for title in ('Dune', 'Emma', 'Kindred')]
+    return {'collections': cids, 'resources': rids, 'foreign': foreign, 'foreign_collection': theirs}
+
+
+def resources(client, cid):
+    return {r['id']: r for r in client.get(f'/api/collections/{cid}/resources').get_json()['resources']}
+
+
+def test_batch_update_patches_moves_and_reports_each_id(client, shelves):
+    shelf, archive = shelves['collections']
+    dune, emma, kindred = shelves['resources']
+    response = client.post('/api/resources/batch/update', json={
+        'ids': [dune, shelves['foreign'], emma, 999999],
+        'patch': {'status': 'Completed', 'authors': 'Frank Herbert', 'collection_id': archive},
+    })
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['results'] == [{'id': dune, 'outcome': 'updated'}, {'id': shelves['foreign'], 'outcome': 'not_found'},
+                               {'id': emma, 'outcome': 'updated'}, {'id': 999999, 'outcome': 'not_found'}]
+    assert (body['updated'], body['not_found']) == (2, 2)
+
+    moved = resources(client, archive)
+    assert set(moved) == {dune, emma}
+    assert {(r['status'], r['authors']) for r in moved.values()} == {('Completed', 'Frank Herbert')}
+    assert set(resources(client, shelf)) == {kindred}
+
+
+def test_batch_update_is_all_or_nothing_on_bad_input(client, shelves):
+    shelf, _ = shelves['collections']
+    ids = shelves['resources']
+    before = resources(client, shelf)
+    for payload, status in (({'ids': ids, 'patch': {'status': 'Done'}}, 400),
+                            ({'ids': ids, 'patch': {'title': 'Same'}}, 400),
+                            ({'ids': [], 'patch': {'status': 'Paused'}}, 400),
+                            ({'ids': ids, 'patch': {'collection_id': shelves['foreign_collection']}}, 404)):
+        assert client.post('/api/resources/batch/update', json=payload).status_code == status
+    assert resources(client, shelf) == before
+
+
+def test_batch_delete_removes_only_owned_resources(client, shelves):
+    shelf, _ = shelves['collections']
+    dune, emma, kindred = shelves['resources']
+    body = client.post('/api/resources/batch/delete', json={'ids': [dune, kindred, shelves['foreign']]}).get_json()
+    assert body['results'] == [{'id': dune, 'outcome': 'deleted'}, {'id': kindred, 'outcome': 'deleted'},
+                               {'id': shelves['foreign'], 'outcome': 'not_found'}]
+    assert set(resources(client, shelf)) == {emma}
+
+
+def test_batch_size_is_capped(app, client, shelves):
+    app.config['BATCH_MAX_IDS'] = 2
+    response = client.post('/api/resources/batch/delete', json={'ids': shelves['resources']})
+    assert response.status_code == 400
+    assert 'max 2' in response.get_json()['error']
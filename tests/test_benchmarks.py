@@ -0,0 +1,41 @@
+"""
+The API load benchmark runs end to end on a tiny seeded database
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+import api_load  # noqa: E402
+
+
+def test_api_load_reports_percentiles_for_every_scenario(capsys):
+    args = argparse.Namespace(users=3, collections=2, resources=30, clients=2, iterations=3,
+                              scenarios=list(api_load.SCENARIOS), metadata_delay_ms=0,
+                              no_response_cache=False, seed=7)
+    report = api_load.run(args)
+
+    assert report['meta']['users'] == 3 and report['meta']['clients'] == 2
+    assert set(report['scenarios']) == set(api_load.SCENARIOS)
+    for name, scenario in report['scenarios'].items():
+        assert scenario['requests'] > 0 and scenario['endpoints'], name
+        for label, stats in scenario['endpoints'].items():
+            assert stats['errors'] == 0, (name, label)
+            assert 0 < stats['p50_ms'] <= stats['p95_ms'] <= stats['p99_ms'], (name, label)
+            # every request went through the app with statement counting on
+            assert stats['sql_max'] >= stats['sql_p50'] >= 0
+    assert report['scenarios']['dashboard']['endpoints']['GET /api/collections']['sql_max'] > 0
+    assert report['scenarios']['typeahead']['upstream_calls'] > 0
+
+    api_load.print_report(report, baseline=report)
+    out = capsys.readouterr().out
+    assert 'GET /api/collections/<cid>/resources' in out and 'p95 +0%' in out
+
+
+def test_percentile():
+    ordered = list(range(1, 101))
+    assert api_load.percentile(ordered, 50) == 50
+    assert api_load.percentile(ordered, 99) == 99
+    assert api_load.percentile([4.2], 95) == 4.2
+    assert api_load.percentile([], 50) is None
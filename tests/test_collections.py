@@ -0,0 +1,32 @@
+"""
+Collection summaries: last activity includes removals
+"""
+from tests.conftest import login
+
+
+def last_activity(client, cid):
+    collections = client.get('/api/collections').get_json()['collections']
+    return next(c['last_activity'] for c in collections if c['id'] == cid)
+
+
+def test_deleting_and_moving_resources_count_as_activity(client):
+    login(client)
+    cid = client.post('/api/collections', json={'name': 'Shelf'}).get_json()['collection']['id']
+    other = client.post('/api/collections', json={'name': 'Archive'}).get_json()['collection']['id']
+    rids = [client.post(f'/api/collections/{cid}/resources', json={'title': title}).get_json()['resource']['id']
+            for title in ('Dune', 'Emma')]
+    before = last_activity(client, cid)
+
+    assert client.delete(f'/api/resources/{rids[0]}').status_code in (200, 204)
+    after_delete = last_activity(client, cid)
+    assert after_delete > before
+
+    moved = client.post('/api/resources/batch/update', json={'ids': [rids[1]], 'patch': {'collection_id': other}})
+    assert moved.status_code == 200
+    assert last_activity(client, cid) > after_delete
+
+
+def test_response_cache_statistics_are_not_served_to_users(client):
+    login(client)
+    # process-wide numbers; they are exported on /metrics for operators
+    assert client.get('/api/collections/cache/metrics').status_code == 404
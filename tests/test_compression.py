@@ -0,0 +1,66 @@
+"""
+Compressed API responses and fingerprinted, precompressed static assets
+"""
+import gzip
+import shutil
+
+from app import assets
+from tests.conftest import login
+
+
+def test_large_responses_are_gzipped_with_a_coding_specific_etag(client):
+    login(client)
+    for n in range(5):
+        client.post('/api/collections', json={'name': f'Shelf {n}', 'description': 'x' * 400})
+
+    plain = client.get('/api/collections')
+    assert 'Content-Encoding' not in plain.headers and len(plain.data) >= 1024
+    response = client.get('/api/collections', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data) == plain.data
+    etag = response.headers['ETag']
+    assert etag == plain.headers['ETag'][:-1] + '-gzip"'
+
+    again = client.get('/api/collections', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == etag
+    # the same tag without the suffix still validates the uncompressed copy
+    assert client.get('/api/collections', headers={'If-None-Match': plain.headers['ETag']}).status_code == 304
+
+
+def test_small_responses_are_sent_as_they_are(client):
+    login(client)
+    response = client.get('/api/auth/me', headers={'Accept-Encoding': 'gzip'})
+    assert len(response.data) < 1024
+    assert 'Content-Encoding' not in response.headers
+    assert not response.headers['ETag'].endswith('-gzip"')
+
+
+def test_built_assets_are_fingerprinted_immutable_and_precompressed(app, client, tmp_path):
+    static = tmp_path / 'static'
+    shutil.copytree(app.static_folder, static, ignore=shutil.ignore_patterns(assets.BUILD_DIR))
+    app.static_folder = str(static)
+    manifest = assets.build(str(static))
+    app.extensions['assets'] = manifest
+    assert manifest['style.css'].startswith('dist/style.') and (static / manifest['style.css']).is_file()
+
+    with app.test_request_context():
+        url = assets.asset_url('style.css')
+        assert url == '/static/' + manifest['style.css']
+        assert assets.asset_url('missing.png') == '/static/missing.png'
+    assert url in client.get('/login').get_data(as_text=True)
+
+    source = (static / 'style.css').read_bytes()
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.mimetype == 'text/css'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert response.cache_control.max_age == assets.IMMUTABLE_MAX_AGE
+    assert gzip.decompress(response.data) == source
+    response.close()
+
+    response = client.get(url)
+    assert 'Content-Encoding' not in response.headers and response.data == source
+    response.close()
@@ -0,0 +1,78 @@
+"""
+Enrichment jobs: cascade with their resource, and worker transactions on SQLite
+"""
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.enrichment.worker import EnrichmentWorker
+from app.models import EnrichmentJob, ResourceMetadata
+from tests.conftest import login, raw_connection
+
+
+@pytest.fixture
+def resources(client):
+    login(client)
+    cid = client.post('/api/collections', json={'name': 'Queue'}).get_json()['collection']['id']
+    return [client.post(f'/api/collections/{cid}/resources', json={'title': title}).get_json()['resource']['id']
+            for title in ('Dune', 'Emma')]
+
+
+@pytest.fixture
+def upstream(app):
+    return app.extensions['metadata_client'].base_url + '/search.json'
+
+
+def job_states(app):
+    with app.app_context():
+        return {job.resource_id: job.state for job in EnrichmentJob.query}
+
+
+def test_deleting_a_resource_deletes_its_jobs(app, client, resources):
+    assert set(job_states(app)) == set(resources)
+    assert client.delete(f'/api/resources/{resources[0]}').status_code in (200, 204)
+    assert set(job_states(app)) == {resources[1]}
+
+
+def test_worker_writes_with_begin_immediate_and_holds_no_lock_during_lookups(app, resources, upstream,
+                                                                             requests_mock):
+    def search(request, context):
+        # another writer can take the lock while the worker waits on the network
+        conn = raw_connection(app)
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('ROLLBACK')
+        conn.close()
+        return {'docs': [{'title': request.qs['q'][0].title()}]}
+
+    requests_mock.get(upstream, json=search)
+    begins = []
+    with app.app_context():
+        engine = db.engine
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('BEGIN'):
+            begins.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        assert EnrichmentWorker(app).run_once() == 2
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    assert begins[0] == 'BEGIN IMMEDIATE'  # the claim
+    assert begins[-1] == 'BEGIN IMMEDIATE'  # storing the results
+    assert set(job_states(app).values()) == {EnrichmentJob.DONE}
+    with app.app_context():
+        assert sorted(m.canonical_title for m in ResourceMetadata.query) == ['Dune', 'Emma']
+
+
+def test_resource_deleted_during_lookups_is_skipped(app, resources, upstream, requests_mock):
+    def search(request, context):
+        conn = raw_connection(app)
+        conn.execute('DELETE FROM resource WHERE id = ?', (resources[0],))
+        conn.close()
+        return {'docs': [{'title': 'Emma'}]}
+
+    requests_mock.get(upstream, json=search)
+    EnrichmentWorker(app, concurrency=1).run_once()
+    assert job_states(app) == {resources[1]: EnrichmentJob.DONE}
@@ -0,0 +1,65 @@
+"""
+Streaming export (GET /api/export) and re-import of its output
+"""
+import json
+
+import pytest
+
+from tests.conftest import login
+
+BOOKS = [('Dune', 'Frank Herbert', 'Completed'), ('Emma', 'Jane Austen', 'Paused'),
+         ('Good Omens', 'Terry Pratchett, Neil Gaiman', 'In Progress')]
+
+
+@pytest.fixture
+def library(client):
+    login(client)
+    cids = [client.post('/api/collections', json={'name': name}).get_json()['collection']['id']
+            for name in ('Novels', 'Comedy')]
+    for i, (title, authors, status) in enumerate(BOOKS):
+        client.post(f'/api/collections/{cids[i // 2]}/resources',
+                    json={'title': title, 'authors': authors, 'status': status})
+    return cids
+
+
+def export(client, **params):
+    response = client.get('/api/export', query_string=params)
+    assert response.status_code == 200
+    assert response.is_streamed
+    return response
+
+
+def jsonl(client, **params):
+    return [json.loads(line) for line in export(client, format='jsonl', **params).get_data(as_text=True).splitlines()]
+
+
+def test_export_streams_the_whole_library_in_id_order(client, library):
+    records = jsonl(client)
+    assert [(r['title'], r['authors'], r['status']) for r in records] == BOOKS
+    assert [r['collection'] for r in records] == ['Novels', 'Novels', 'Comedy']
+    assert [r['id'] for r in records] == sorted(r['id'] for r in records)
+
+
+def test_export_of_one_collection_and_resume_after_a_checkpoint(client, library):
+    assert [r['title'] for r in jsonl(client, collection_id=library[1])] == ['Good Omens']
+    first = jsonl(client)[0]
+    assert [r['title'] for r in jsonl(client, after=first['id'])] == ['Emma', 'Good Omens']
+
+
+@pytest.mark.parametrize('fmt', ['jsonl', 'csv', 'bibtex'])
+def test_every_format_imports_back_unchanged(client, library, fmt):
+    body = export(client, format=fmt).get_data()
+    target = client.post('/api/collections', json={'name': 'Copy'}).get_json()['collection']['id']
+    report = client.post(f'/api/collections/{target}/resources/import?format={fmt}', data=body).get_json()
+    assert report['imported'] == len(BOOKS), report
+
+    copied = client.get(f'/api/collections/{target}/resources?sort=title').get_json()['resources']
+    assert [(r['title'], r['authors'], r['status']) for r in copied] == sorted(BOOKS)
+
+
+def test_export_checks_the_collection_owner_and_format(client, library):
+    client.post('/api/auth/logout')
+    login(client, email='other@example.com')
+    assert jsonl(client) == []
+    assert client.get(f'/api/export?collection_id={library[0]}').status_code == 404
+    assert client.get('/api/export?format=xml').status_code == 400
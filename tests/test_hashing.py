@@ -0,0 +1,34 @@
+"""
+PasswordHasher (app/auth/hashing.py) with a real worker pool
+"""
+import time
+
+import pytest
+
+from app.auth.hashing import HashingBusy, PasswordHasher
+from tests.conftest import wait_for
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=1, max_pending=1, timeout=0.1)
+    hasher.start()
+    yield hasher
+    hasher._pool.shutdown(cancel_futures=True)
+
+
+def test_a_timed_out_hash_keeps_its_slot_until_the_worker_is_done(hasher):
+    with pytest.raises(HashingBusy, match='not done within'):
+        hasher._run('hashed', time.sleep, 0.5)
+    # the worker is still busy with it: shed the next request instead of queueing it behind
+    assert hasher.metrics()['pending'] == 1
+    with pytest.raises(HashingBusy, match='already queued'):
+        hasher.hash('Password1')
+    assert hasher.metrics()['rejected_busy'] == 1
+
+    wait_for(lambda: hasher.metrics()['pending'] == 0)
+    assert hasher.verify(hasher.hash('Password1'), 'Password1')
+
+
+def test_workers_are_started_up_front(hasher):
+    assert len(hasher._pool._processes) == 1
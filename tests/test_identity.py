@@ -0,0 +1,100 @@
+"""
+current_user comes from the identity cache instead of a SELECT per request
+"""
+import re
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.auth.identity import invalidate_user
+from app.cache import TTLCache
+from app.models import User
+from tests.conftest import dispose_app, login, make_app
+
+
+class RecordingCache(TTLCache):
+    """A backend object handed in through USER_CACHE_BACKEND"""
+
+    def __init__(self):
+        super().__init__(maxsize=16, ttl=60)
+        self.deleted = []
+
+    def delete(self, key):
+        self.deleted.append(key)
+        super().delete(key)
+
+
+@pytest.fixture
+def cache():
+    return RecordingCache()
+
+
+@pytest.fixture
+def app(tmp_path, cache):
+    app = make_app('sqlite:///' + str(tmp_path / 'test.db'), USER_CACHE_BACKEND=cache)
+    yield app
+    dispose_app(app)
+
+
+@pytest.fixture
+def user_selects(app):
+    with app.app_context():
+        engine = db.engine
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if re.search(r'\bFROM user\b', statement):
+            seen.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    yield seen
+    event.remove(engine, 'before_cursor_execute', record)
+
+
+def test_pluggable_backend_serves_repeat_requests(app, client, cache, user_selects):
+    user = login(client)
+    assert app.extensions['user_cache'] is cache
+
+    assert client.get('/api/auth/me').get_json()['email'] == 'reader@example.com'
+    assert cache.get(user['id'])['email'] == 'reader@example.com'
+    del user_selects[:]
+    for _ in range(3):
+        response = client.get('/api/auth/me')
+        assert response.status_code == 200
+        assert response.get_json()['id'] == user['id']
+    assert user_selects == []
+
+
+def test_profile_and_password_changes_invalidate(app, client, cache):
+    user = login(client)
+    client.get('/api/auth/me')
+
+    response = client.put('/api/auth/me', json={'username': 'reader'})
+    assert response.status_code == 200
+    assert cache.deleted[-1] == user['id']
+    assert client.get('/api/auth/me').get_json()['username'] == 'reader'
+    assert cache.get(user['id'])['username'] == 'reader'
+
+    deleted = len(cache.deleted)
+    response = client.put('/api/auth/change-password',
+                          json={'current_password': 'Password1', 'new_password': 'Password2'})
+    assert response.status_code == 200
+    assert cache.deleted[deleted:] == [user['id']]
+    # the hash is never cached; the new password is what logs in now
+    assert 'password_hash' not in cache.get(user['id'], {})
+    client.post('/api/auth/logout')
+    assert client.post('/api/auth/login', json={'email': 'reader@example.com',
+                                                'password': 'Password2'}).status_code == 200
+
+
+def test_deleted_user_is_refused_once_invalidated(app, client, cache):
+    user = login(client)
+    assert client.get('/api/auth/me').status_code == 200
+
+    with app.app_context():
+        db.session.get(User, user['id']).is_deleted = True
+        db.session.commit()
+        invalidate_user(user['id'])
+
+    assert client.get('/api/auth/me').status_code == 401
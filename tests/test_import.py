@@ -0,0 +1,57 @@
+"""
+Bulk import: the upload is read without holding the SQLite write lock
+"""
+import io
+
+from tests.conftest import login, write_lock_is_free
+
+CSV = b'title,authors\nDune,Frank Herbert\nEmma,Jane Austen\nKindred,Octavia E. Butler\n'
+
+
+class SlowUpload(io.RawIOBase):
+    """Hands the body over one line per read and checks, at every read, whether another writer could get in"""
+
+    def __init__(self, app, body):
+        self.app = app
+        self.lines = body.splitlines(keepends=True)
+        self.size = len(body)
+        self.position = 0
+        self.lock_free = []
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        # only the test client seeks, to measure the body before anything is read
+        self.position = self.size if whence == io.SEEK_END else offset
+        return self.position
+
+    def tell(self):
+        return self.position
+
+    def readinto(self, buffer):
+        self.lock_free.append(write_lock_is_free(self.app))
+        if not self.lines:
+            return 0
+        line = self.lines.pop(0)
+        buffer[:len(line)] = line
+        return len(line)
+
+
+def test_import_does_not_hold_the_write_lock_while_reading_the_upload(app, client):
+    login(client)
+    cid = client.post('/api/collections', json={'name': 'Shelf'}).get_json()['collection']['id']
+    upload = SlowUpload(app, CSV)
+
+    response = client.post(f'/api/collections/{cid}/resources/import?format=csv&chunk_size=2',
+                           input_stream=upload, content_type='text/csv')
+    assert response.status_code == 200
+    assert response.get_json()['imported'] == 3
+    assert len(upload.lock_free) > 3
+    assert all(upload.lock_free)
+
+    titles = [r['title'] for r in client.get(f'/api/collections/{cid}/resources?sort=title').get_json()['resources']]
+    assert titles == ['Dune', 'Emma', 'Kindred']
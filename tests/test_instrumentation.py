@@ -0,0 +1,34 @@
+"""
+Request profiling: /metrics is only served to scrapers that are allowed to read it
+"""
+import pytest
+
+from tests.conftest import dispose_app, make_app
+
+
+@pytest.fixture
+def profiled(tmp_path):
+    apps = []
+
+    def build(**config):
+        apps.append(make_app('sqlite:///' + str(tmp_path / 'test.db'), REQUEST_PROFILING=True, **config))
+        return apps[-1].test_client()
+
+    yield build
+    for app in apps:
+        dispose_app(app)
+
+
+@pytest.mark.parametrize('config, headers, status', [
+    ({}, {}, 404),
+    ({'METRICS_PUBLIC': True}, {}, 200),
+    ({'METRICS_TOKEN': 's3cret'}, {}, 403),
+    ({'METRICS_TOKEN': 's3cret'}, {'Authorization': 'Bearer wrong'}, 403),
+    ({'METRICS_TOKEN': 's3cret'}, {'Authorization': 'Bearer s3cret'}, 200),
+])
+def test_metrics_are_denied_unless_a_token_or_public_access_is_configured(profiled, config, headers, status):
+    client = profiled(**config)
+    response = client.get('/metrics', headers=headers)
+    assert response.status_code == status
+    if status == 200:
+        assert b'# TYPE' in response.data
@@ -0,0 +1,162 @@
+"""
+MetadataClient (app/suggestions/client.py) against a stubbed metadata API
+"""
+import threading
+
+import pytest
+import requests
+
+from app.suggestions.client import CircuitOpenError, MetadataClient, UpstreamBusyError
+from tests.conftest import Clock, wait_for
+
+BASE = 'http://metadata.test'
+URL = BASE + '/search.json'
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def make_client(clock, **options):
+    options = dict({'retries': 0, 'backoff': 0, 'breaker_threshold': 3, 'breaker_reset': 30}, **options)
+    return MetadataClient(BASE, clock=clock, **options)
+
+
+def in_thread(fn):
+    result = {}
+
+    def run():
+        try:
+            result['value'] = fn()
+        except Exception as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, result
+
+
+def test_breaker_opens_after_threshold_and_lets_one_trial_through(clock, requests_mock):
+    client = make_client(clock)
+    requests_mock.get(URL, status_code=500)
+    for _ in range(3):
+        with pytest.raises(requests.HTTPError):
+            client.get_json('/search.json')
+
+    with pytest.raises(CircuitOpenError):
+        client.get_json('/search.json')
+    assert requests_mock.call_count == 3
+    assert client.metrics()['breakers'] == {'metadata.test': 'open'}
+
+    clock.now += 30
+    release = threading.Event()
+
+    def slow_ok(request, context):
+        release.wait(5)
+        return {'docs': []}
+
+    requests_mock.get(URL, json=slow_ok)
+    trial, result = in_thread(lambda: client.get_json('/search.json'))
+    wait_for(lambda: requests_mock.call_count == 4)
+    # half-open: the trial is in flight, everyone else is still turned away
+    with pytest.raises(CircuitOpenError):
+        client.get_json('/search.json')
+    release.set()
+    trial.join()
+
+    assert result == {'value': {'docs': []}}
+    assert client.metrics()['breakers'] == {'metadata.test': 'closed'}
+    assert client.get_json('/search.json') == {'docs': []}
+
+
+def test_failed_trial_reopens_the_breaker(clock, requests_mock):
+    client = make_client(clock)
+    requests_mock.get(URL, status_code=503)
+    for _ in range(3):
+        with pytest.raises(requests.HTTPError):
+            client.get_json('/search.json')
+
+    clock.now += 30
+    with pytest.raises(requests.HTTPError):
+        client.get_json('/search.json')
+    with pytest.raises(CircuitOpenError):
+        client.get_json('/search.json')
+    assert requests_mock.call_count == 4
+
+
+def test_busy_host_rejects_instead_of_queueing(clock, requests_mock):
+    client = make_client(clock, max_per_host=1, acquire_timeout=0.05)
+    release = threading.Event()
+
+    def slow_ok(request, context):
+        release.wait(5)
+        return {'docs': []}
+
+    requests_mock.get(URL, json=slow_ok)
+    first, result = in_thread(lambda: client.get_json('/search.json'))
+    wait_for(lambda: requests_mock.call_count == 1)
+    with pytest.raises(UpstreamBusyError):
+        client.get_json('/search.json')
+    release.set()
+    first.join()
+
+    assert result == {'value': {'docs': []}}
+    assert client.metrics()['rejected_busy'] == 1
+    assert requests_mock.call_count == 1
+
+
+def test_server_errors_are_retried(clock, requests_mock):
+    client = make_client(clock, retries=2)
+    requests_mock.get(URL, [{'status_code': 502}, {'status_code': 503}, {'json': {'docs': [1]}}])
+    assert client.get_json('/search.json') == {'docs': [1]}
+    assert requests_mock.call_count == 3
+    assert client.metrics()['retries'] == 2
+
+
+def test_client_errors_are_not_retried_and_do_not_trip_the_breaker(clock, requests_mock):
+    client = make_client(clock, retries=2)
+    requests_mock.get(URL, status_code=404)
+    for _ in range(5):
+        with pytest.raises(requests.HTTPError):
+            client.get_json('/search.json')
+    assert requests_mock.call_count == 5
+    assert client.metrics()['breakers'] == {'metadata.test': 'closed'}
+
+
+def test_retries_stop_at_the_total_timeout(clock, requests_mock):
+    client = make_client(clock, retries=5, connect_timeout=2, read_timeout=5, total_timeout=8)
+    timeouts = []
+
+    def hung(request, context):
+        timeouts.append(request.timeout)
+        clock.now += 5
+        raise requests.ReadTimeout('read timed out')
+
+    requests_mock.get(URL, json=hung)
+    with pytest.raises(requests.ReadTimeout):
+        client.get_json('/search.json')
+    # the second attempt only gets what is left of the 8 s; there is no time for a third
+    assert timeouts == [(2, 5), (2, 3)]
+    assert client.metrics()['failures'] == 1
+
+
+def test_bad_json_does_not_trip_the_breaker(clock, requests_mock):
+    client = make_client(clock)
+    requests_mock.get(URL, text='<html>maintenance</html>')
+    for _ in range(5):
+        with pytest.raises(ValueError):
+            client.get_json('/search.json')
+    assert client.metrics()['breakers'] == {'metadata.test': 'closed'}
+
+
+@pytest.mark.parametrize('error', [requests.exceptions.ChunkedEncodingError, requests.exceptions.ContentDecodingError,
+                                   requests.exceptions.SSLError, requests.exceptions.InvalidURL])
+def test_transport_errors_that_are_not_retried_still_trip_the_breaker(clock, requests_mock, error):
+    client = make_client(clock, retries=2)
+    requests_mock.get(URL, exc=error)
+    for _ in range(3):
+        with pytest.raises(error):
+            client.get_json('/search.json')
+    assert client.metrics()['breakers'] == {'metadata.test': 'open'}
+    assert client.metrics()['failures'] == 3
@@ -0,0 +1,80 @@
+"""
+Ownership checks: one joined query per object, memoized for the request
+"""
+import re
+
+import pytest
+from flask import g
+from sqlalchemy import event
+
+from app import db
+from app.models import Collection, Resource
+from app.utils import load_owned
+from tests.conftest import dispose_app, login, make_app
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app('sqlite:///' + str(tmp_path / 'test.db'), SQL_STATEMENT_COUNTING=True)
+    yield app
+    dispose_app(app)
+
+
+@pytest.fixture
+def owned(client):
+    login(client, email='other@example.com')
+    theirs = client.post('/api/collections', json={'name': 'Theirs'}).get_json()['collection']['id']
+    foreign = client.post(f'/api/collections/{theirs}/resources', json={'title': 'Not yours'}).get_json()['resource']['id']
+    client.post('/api/auth/logout')
+    user = login(client)
+    cid = client.post('/api/collections', json={'name': 'Shelf'}).get_json()['collection']['id']
+    rid = client.post(f'/api/collections/{cid}/resources', json={'title': 'Dune'}).get_json()['resource']['id']
+    return {'user': user['id'], 'collection': cid, 'resource': rid, 'foreign': foreign,
+            'foreign_collection': theirs}
+
+
+@pytest.fixture
+def statements(app):
+    seen = []
+    with app.app_context():
+        engine = db.engine
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(' '.join(statement.split()))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    yield seen
+    event.remove(engine, 'before_cursor_execute', record)
+
+
+def test_resource_ownership_is_one_joined_query_and_memoized(app, owned, statements):
+    with app.test_request_context():
+        assert load_owned(Resource, owned['resource'], owned['user']).title == 'Dune'
+        assert load_owned(Resource, owned['resource'], owned['user']).collection.id == owned['collection']
+        assert load_owned(Resource, owned['foreign'], owned['user']) is None
+        assert load_owned(Resource, owned['foreign'], owned['user']) is None
+        assert load_owned(Collection, owned['foreign_collection'], owned['user']) is None
+        # the collection a resource was loaded with counts as checked too
+        assert len(g._owned_objects) == 4
+
+    # (author links and metadata of the loaded resource come with it, as with any load)
+    checks = [s for s in statements if re.search(r'FROM (resource|collection)\b', s)]
+    assert len(checks) == 3
+    assert all('FROM resource JOIN collection' in s for s in checks[:2])
+
+
+def test_resource_routes_refuse_other_users_objects(client, owned):
+    foreign = owned['foreign']
+    assert client.get(f'/api/resources/{foreign}').status_code == 404
+    assert client.put(f'/api/resources/{foreign}', json={'title': 'Mine now'}).status_code == 404
+    assert client.delete(f'/api/resources/{foreign}').status_code == 404
+    assert client.get(f'/api/collections/{owned["foreign_collection"]}/resources').status_code == 404
+    assert client.get(f'/resources/{foreign}/edit').status_code == 302
+
+
+def test_statement_count_header_shows_a_single_ownership_query(client, owned, statements):
+    response = client.get(f'/api/resources/{owned["resource"]}')
+    assert response.status_code == 200
+    assert int(response.headers['X-SQL-Statements']) == len(statements)
+    assert sum(bool(re.search(r'FROM resource\b', s)) for s in statements) == 1
+    assert not any(re.search(r'FROM collection\b', s) for s in statements)
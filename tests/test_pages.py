@@ -0,0 +1,66 @@
+"""
+Pages embed the same JSON their first API fetch would return
+"""
+import json
+import re
+
+import pytest
+
+from tests.conftest import login
+
+NAME = 'Odd </script><script>alert(1)</script> & <b>names</b>'
+
+
+def embedded(html, element_id):
+    match = re.search(rf'<script type="application/json" id="{element_id}">(.*?)</script>', html, re.S)
+    return None if match is None else json.loads(match.group(1))
+
+
+@pytest.fixture
+def shelf(client):
+    login(client)
+    cid = client.post('/api/collections', json={'name': NAME, 'description': 'a > b'}).get_json()['collection']['id']
+    rid = client.post(f'/api/collections/{cid}/resources',
+                      json={'title': 'Dune </script>', 'authors': 'Frank Herbert'}).get_json()['resource']['id']
+    return cid, rid
+
+
+def test_pages_embed_the_api_bodies(client, shelf):
+    cid, rid = shelf
+    pages = [
+        ('/collections', 'initial-collections', '/api/collections'),
+        (f'/collections/{cid}', 'initial-collection', f'/api/collections/{cid}'),
+        (f'/collections/{cid}/edit', 'initial-collection', f'/api/collections/{cid}'),
+        (f'/resources/{rid}/edit', 'initial-resource', f'/api/resources/{rid}'),
+    ]
+    for page, element_id, api in pages:
+        html = client.get(page).get_data(as_text=True)
+        assert embedded(html, element_id) == client.get(api).get_json(), page
+
+    # a snapshot's cursor is taken at the time of the call; everything else is the same
+    html = client.get(f'/collections/{cid}').get_data(as_text=True)
+    changes = embedded(html, 'initial-changes')
+    fetched = client.get(f'/api/collections/{cid}/changes').get_json()
+    cursor = changes.pop('cursor')
+    fetched.pop('cursor')
+    assert changes == fetched and [r['id'] for r in changes['resources']] == [rid]
+    resumed = client.get(f'/api/collections/{cid}/changes', query_string={'since': cursor})
+    assert resumed.status_code == 200 and resumed.get_json()['reset'] is False
+
+
+def test_embedded_json_cannot_close_its_script_element(client, shelf):
+    html = client.get('/collections').get_data(as_text=True)
+    assert '<script>alert(1)' not in html
+    assert '\\u003c/script\\u003e' in html
+    assert embedded(html, 'initial-collections')['collections'][0]['name'] == NAME
+
+
+def test_nothing_is_embedded_for_a_query_string_or_when_disabled(app, client, shelf):
+    cid, _ = shelf
+    html = client.get('/collections?q=dune').get_data(as_text=True)
+    assert 'id="initial-collections"' not in html
+    html = client.get(f'/collections/{cid}?status=Completed').get_data(as_text=True)
+    assert 'id="initial-collection"' not in html and 'id="initial-changes"' not in html
+
+    app.config['EMBED_INITIAL_DATA'] = False
+    assert 'id="initial-collections"' not in client.get('/collections').get_data(as_text=True)
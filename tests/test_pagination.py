@@ -0,0 +1,76 @@
+"""
+Keyset pagination of GET /api/collections/<cid>/resources
+"""
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app.models import Resource
+from tests.conftest import login
+
+# several rows share each sort key, so only the id tiebreaker orders them
+TITLES = ['Dune', 'Emma', 'Dune', 'Beloved', 'Emma', 'Dune', 'Kindred']
+STATUSES = ['Completed', 'Not Started', 'Completed', 'Paused', 'Completed', 'Not Started', 'Paused']
+
+
+@pytest.fixture
+def collection(app, client):
+    login(client)
+    cid = client.post('/api/collections', json={'name': 'Shelf'}).get_json()['collection']['id']
+    for title, status in zip(TITLES, STATUSES):
+        client.post(f'/api/collections/{cid}/resources', json={'title': title, 'status': status})
+    with app.app_context():
+        # two timestamps for seven rows
+        for rid in [r.id for r in Resource.query]:
+            db.session.get(Resource, rid).created_at = datetime(2026, 1, 1 + rid % 2)
+        db.session.commit()
+    return cid
+
+
+def listing(client, cid, **params):
+    return client.get(f'/api/collections/{cid}/resources', query_string=params).get_json()
+
+
+def pages(client, cid, limit, **params):
+    seen, cursor = [], None
+    while True:
+        body = listing(client, cid, limit=limit, **params, **({'cursor': cursor} if cursor else {}))
+        assert len(body['resources']) <= limit
+        seen.extend(body['resources'])
+        cursor = body['next_cursor']
+        if cursor is None:
+            return seen
+
+
+@pytest.mark.parametrize('sort', ['created_at', 'title', 'status'])
+@pytest.mark.parametrize('limit', [1, 2, 3])
+def test_cursor_walk_returns_every_row_once_in_sort_order(client, collection, sort, limit):
+    everything = listing(client, collection, sort=sort, limit=100)['resources']
+    assert len(everything) == len(TITLES)
+
+    walked = pages(client, collection, limit, sort=sort)
+    assert [r['id'] for r in walked] == [r['id'] for r in everything]
+    assert len({r['id'] for r in walked}) == len(TITLES)
+    keys = [(r[sort], r['id']) for r in walked]
+    assert keys == (sorted(keys, reverse=True) if sort == 'created_at' else sorted(keys))
+
+
+def test_cursor_walk_keeps_the_filters(client, collection):
+    walked = pages(client, collection, 1, sort='title', status='Completed')
+    assert [r['title'] for r in walked] == ['Dune', 'Dune', 'Emma']
+
+
+def test_limit_is_capped_server_side(app, client, collection):
+    app.config['RESOURCES_PAGE_MAX'] = 3
+    body = client.get(f'/api/collections/{collection}/resources?limit=1000').get_json()
+    assert body['limit'] == 3
+    assert len(body['resources']) == 3
+    assert body['next_cursor']
+
+
+def test_a_cursor_only_works_with_its_sort(client, collection):
+    cursor = client.get(f'/api/collections/{collection}/resources?sort=title&limit=2').get_json()['next_cursor']
+    response = client.get(f'/api/collections/{collection}/resources?sort=status&limit=2&cursor={cursor}')
+    assert response.status_code == 400
+    assert client.get(f'/api/collections/{collection}/resources?cursor=not-a-cursor').status_code == 400
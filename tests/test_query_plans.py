@@ -0,0 +1,38 @@
+"""
+Every list and detail query walks an index (see app/query_plans.py)
+
+Set QUERY_PLANS_DATABASE_URL to check a disposable PostgreSQL database
+instead of a temporary SQLite file.
+"""
+import os
+
+import pytest
+
+from app import db, query_plans
+from tests.conftest import dispose_app, make_app
+
+
+@pytest.fixture(scope='module')
+def seeded(tmp_path_factory):
+    url = os.environ.get('QUERY_PLANS_DATABASE_URL') or 'sqlite:///' + str(tmp_path_factory.mktemp('plans') / 'plans.db')
+    # cached responses would skip the queries under test
+    app = make_app(url, RESPONSE_CACHE_SIZE=0)
+    client = app.test_client()
+    values = query_plans.seed(client)
+    with app.app_context():
+        engine = db.engine
+    yield engine, client, values
+    dispose_app(app)
+
+
+def _describe(entry):
+    return '\n'.join([entry['url'], entry['statement'] or '', *('    ' + line for line in entry['plan'])])
+
+
+@pytest.mark.parametrize('scenario', query_plans.SCENARIOS, ids=[s[0] for s in query_plans.SCENARIOS])
+def test_query_plan(seeded, scenario):
+    engine, client, values = seeded
+    report = query_plans.check_scenario(engine, client, values, scenario)
+    assert report, 'scenario issued no SELECT'
+    for entry in report:
+        assert entry['problems'] == [], _describe(entry)
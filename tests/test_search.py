@@ -0,0 +1,71 @@
+"""
+Full-text search (app/search.py): ranking, prefixes and an index kept in sync with writes
+"""
+import pytest
+
+from tests.conftest import login
+
+
+@pytest.fixture
+def collection(client):
+    login(client)
+    cid = client.post('/api/collections', json={'name': 'Shelf'}).get_json()['collection']['id']
+    for title, authors in (('Notes on the analytical engine', 'Ada Lovelace'),
+                           ('Engines of creation', 'Eric Drexler'),
+                           ('A history of computing', 'Paul Engine'),
+                           ('Café society', 'Émile Zola')):
+        client.post(f'/api/collections/{cid}/resources', json={'title': title, 'authors': authors})
+    return cid
+
+
+def titles(client, cid, **params):
+    response = client.get(f'/api/collections/{cid}/resources', query_string=params)
+    assert response.status_code == 200
+    return [r['title'] for r in response.get_json()['resources']]
+
+
+def test_search_is_on_the_index(app, client, collection):
+    from app.search import get_backend
+
+    titles(client, collection, q='engine')
+    with app.app_context():
+        assert get_backend().name == 'fts5'
+
+
+def test_title_matches_rank_above_author_matches(client, collection):
+    found = titles(client, collection, q='engine')
+    assert set(found) == {'Notes on the analytical engine', 'Engines of creation', 'A history of computing'}
+    assert found[-1] == 'A history of computing'
+    # an explicit sort still wins over relevance
+    assert titles(client, collection, q='engine', sort='title') == sorted(found)
+
+
+def test_every_word_must_match_as_a_prefix(client, collection):
+    assert titles(client, collection, q='analyt eng') == ['Notes on the analytical engine']
+    assert titles(client, collection, q='lovelace drexler') == []
+    assert titles(client, collection, q='cafe emile') == ['Café society']
+
+
+def test_relevance_pages_with_a_cursor(client, collection):
+    everything = titles(client, collection, q='engine')
+    first = client.get(f'/api/collections/{collection}/resources?q=engine&limit=2').get_json()
+    rest = client.get(f'/api/collections/{collection}/resources?q=engine&limit=2&cursor={first["next_cursor"]}')
+    assert [r['title'] for r in first['resources'] + rest.get_json()['resources']] == everything
+
+
+def test_index_follows_updates_and_deletes(client, collection):
+    rid = client.get(f'/api/collections/{collection}/resources?q=creation').get_json()['resources'][0]['id']
+    client.put(f'/api/resources/{rid}', json={'title': 'Nanosystems'})
+    assert titles(client, collection, q='creation') == []
+    assert titles(client, collection, q='nanosys') == ['Nanosystems']
+
+    client.delete(f'/api/resources/{rid}')
+    assert titles(client, collection, q='nanosys') == []
+
+
+def test_collections_search_by_name_and_description(client):
+    login(client)
+    for name, description in (('Physics', 'quantum field theory'), ('Quantum computing', ''), ('Poetry', '')):
+        client.post('/api/collections', json={'name': name, 'description': description})
+    found = [c['name'] for c in client.get('/api/collections?q=quantum').get_json()['collections']]
+    assert found == ['Quantum computing', 'Physics']
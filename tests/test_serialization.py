@@ -0,0 +1,80 @@
+"""
+List responses built from projected rows match to_dict(), field for field
+"""
+import json
+from datetime import datetime
+
+import pytest
+
+from app import db, serialization
+from app.collections.service import collection_summaries, collection_with_summary
+from app.models import Collection, Resource, ResourceMetadata, StatusEnum
+from tests.conftest import login
+
+
+@pytest.fixture
+def shelf(app, client):
+    login(client)
+    cid = client.post('/api/collections', json={'name': 'Shelf', 'description': 'to read'}).get_json()['collection']['id']
+    created = [client.post(f'/api/collections/{cid}/resources', json=fields).get_json()['resource']['id']
+               for fields in ({'title': 'Dune', 'authors': 'Frank Herbert', 'url': 'example.com/dune'},
+                              {'title': 'Good Omens', 'authors': 'Terry Pratchett, Neil Gaiman',
+                               'status': 'In Progress'},
+                              {'title': 'Untitled'})]
+    with app.app_context():
+        res = db.session.get(Resource, created[0])
+        res.last_read_date = datetime(2024, 5, 17, 20, 30, 15, 123456)
+        res.status = StatusEnum.COMPLETED
+        db.session.add(ResourceMetadata(resource_id=created[0], canonical_title='Dune', normalized_title='dune',
+                                        isbn='9780441013593', publish_year=1965))
+        # a row written before the author tables existed: authors_list falls back to the string
+        db.session.execute(Resource.__table__.insert().values(
+            title='Emma', authors='Jane Austen, ', status=StatusEnum.NOT_STARTED, collection_id=cid,
+            created_at=datetime(2021, 1, 1), updated_at=datetime(2021, 1, 1)))
+        db.session.commit()
+    return cid
+
+
+def expected_resources(app, cid):
+    with app.app_context():
+        rows = Resource.query.filter_by(collection_id=cid).order_by(Resource.created_at.desc(), Resource.id.desc())
+        return json.loads(json.dumps([res.to_dict() for res in rows]))
+
+
+def test_resource_rows_match_to_dict(app, client, shelf):
+    body = client.get(f'/api/collections/{shelf}/resources').get_json()
+    expected = expected_resources(app, shelf)
+    assert len(expected) == 4
+    assert body['resources'] == expected
+    assert expected[0]['metadata'] is None and expected[-1]['authors_list'] == ['Jane Austen']
+    assert any(item['metadata'] and item['last_read_date'] for item in expected)
+
+
+def test_stdlib_encoder_writes_the_same_json(app, client, shelf, monkeypatch):
+    fast = client.get(f'/api/collections/{shelf}/resources').get_json()
+    monkeypatch.setattr(serialization, 'orjson', None)
+    # a different query string, so the body is not the cached one
+    assert client.get(f'/api/collections/{shelf}/resources?limit=50').get_json()['resources'] == fast['resources']
+
+
+def test_collection_rows_match_collection_with_summary(app, client, shelf):
+    client.post('/api/collections', json={'name': 'Empty'})
+    body = client.get('/api/collections').get_json()
+    with app.app_context():
+        collections = Collection.query.order_by(Collection.created_at.desc()).all()
+        summaries = collection_summaries(collections)
+        expected = json.loads(json.dumps([collection_with_summary(col, summaries) for col in collections]))
+    assert body['collections'] == expected
+    assert [c['resource_count'] for c in expected] == [0, 4]
+
+
+def test_sparse_fieldsets(client, shelf):
+    resources = client.get(f'/api/collections/{shelf}/resources?fields=status, title,id').get_json()['resources']
+    assert resources and all(set(item) == {'id', 'title', 'status'} for item in resources)
+    collections = client.get('/api/collections?fields=name,resource_count').get_json()['collections']
+    assert collections == [{'name': 'Shelf', 'resource_count': 4}]
+
+    response = client.get(f'/api/collections/{shelf}/resources?fields=id,password_hash')
+    assert response.status_code == 400
+    assert 'password_hash' in response.get_json()['error']
+    assert client.get('/api/collections?fields=email').status_code == 400
@@ -0,0 +1,41 @@
+"""
+Reading statistics: buckets cut by the requested range
+"""
+from datetime import date
+
+import pytest
+
+from app import db
+from app.models import DailyStatusRollup, StatusEnum
+from tests.conftest import login
+
+
+@pytest.fixture
+def user_id(app, client):
+    uid = login(client)['id']
+    with app.app_context():
+        # Tuesday 2026-10-13 is before the range; Thursday 2026-10-15 and Tuesday 2026-10-27 are inside
+        for day in (date(2026, 10, 13), date(2026, 10, 15), date(2026, 10, 27)):
+            db.session.add(DailyStatusRollup(user_id=uid, day=day, status=StatusEnum.COMPLETED, entered=1))
+        db.session.commit()
+    return uid
+
+
+def test_edge_weeks_are_cut_to_the_range(client, user_id):
+    # Wednesday to Wednesday
+    body = client.get('/api/stats?bucket=week&from=2026-10-14&to=2026-10-28').get_json()
+    assert [(p['period'], p['period_end'], p['partial'], p['completed']) for p in body['series']] == [
+        ('2026-10-14', '2026-10-18', True, 1),
+        ('2026-10-19', '2026-10-25', False, 0),
+        ('2026-10-26', '2026-10-28', True, 1),
+    ]
+    assert body['completed'] == 2
+
+
+def test_whole_months_are_not_partial(client, user_id):
+    body = client.get('/api/stats?bucket=month&from=2026-10-01&to=2026-11-30').get_json()
+    assert [(p['period'], p['period_end'], p['partial']) for p in body['series']] == [
+        ('2026-10-01', '2026-10-31', False),
+        ('2026-11-01', '2026-11-30', False),
+    ]
+    assert body['series'][0]['completed'] == 3
@@ -0,0 +1,112 @@
+"""
+Suggestion cache (app/suggestions/cache.py) against a stubbed metadata API
+"""
+import threading
+
+import pytest
+
+from app.suggestions.cache import SuggestionCache
+from tests.conftest import Clock, login, wait_for
+
+
+def search_result(title):
+    return {'docs': [{'title': title, 'author_name': ['Frank Herbert'], 'first_publish_year': 1965}]}
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def cache(app, clock):
+    app.extensions['suggestions_cache'] = SuggestionCache(ttl=60, stale_ttl=600, clock=clock)
+    return app.extensions['suggestions_cache']
+
+
+@pytest.fixture
+def upstream(app):
+    return app.extensions['metadata_client'].base_url + '/search.json'
+
+
+def titles(response):
+    assert response.status_code == 200, response.get_json()
+    return [s['title'] for s in response.get_json()['suggestions']]
+
+
+def test_concurrent_misses_share_one_upstream_call(app, cache, upstream, requests_mock):
+    release = threading.Event()
+
+    def slow_search(request, context):
+        release.wait(5)
+        return search_result('Dune')
+
+    requests_mock.get(upstream, json=slow_search)
+    results = []
+
+    def lookup(q):
+        results.append(titles(app.test_client().get('/api/suggestions', query_string={'q': q})))
+
+    # different spellings of the same prefix normalize to one key
+    threads = [threading.Thread(target=lookup, args=(q,)) for q in ('dune', 'Dune', ' DUNE ', 'dune', 'dune ')]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: cache.metrics()['coalesced'] == len(threads) - 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert requests_mock.call_count == 1
+    assert results == [['Dune']] * len(threads)
+
+
+def test_stale_entry_is_served_while_it_refreshes(app, cache, clock, upstream, requests_mock):
+    client = app.test_client()
+    requests_mock.get(upstream, json=search_result('Dune'))
+    assert titles(client.get('/api/suggestions?q=dune')) == ['Dune']
+
+    release = threading.Event()
+
+    def slow_search(request, context):
+        release.wait(5)
+        return search_result('Dune Messiah')
+
+    requests_mock.get(upstream, json=slow_search)
+    clock.now += 61
+    # past ttl, inside stale_ttl: the old answer comes back at once, the refresh runs behind it
+    assert titles(client.get('/api/suggestions?q=dune')) == ['Dune']
+    wait_for(lambda: requests_mock.call_count == 2)
+    assert titles(client.get('/api/suggestions?q=dune')) == ['Dune']
+
+    release.set()
+    wait_for(lambda: not cache._flights)
+    assert titles(client.get('/api/suggestions?q=dune')) == ['Dune Messiah']
+    assert requests_mock.call_count == 2
+    assert cache.metrics()['refreshes'] == 1
+
+
+def test_fresh_entry_skips_upstream_and_expired_entry_is_refetched(app, cache, clock, upstream, requests_mock):
+    client = app.test_client()
+    requests_mock.get(upstream, json=search_result('Dune'))
+    titles(client.get('/api/suggestions?q=dune'))
+
+    clock.now += 59
+    assert titles(client.get('/api/suggestions?q=dune')) == ['Dune']
+    assert requests_mock.call_count == 1
+
+    requests_mock.get(upstream, json=search_result('Dune Messiah'))
+    clock.now += 602
+    # past ttl + stale_ttl the entry is gone and the lookup waits for upstream
+    assert titles(client.get('/api/suggestions?q=dune')) == ['Dune Messiah']
+    assert requests_mock.call_count == 2
+    assert cache.metrics()['stale_hits'] == 0
+
+
+def test_metrics_need_the_metrics_token(app, client):
+    login(client)
+    assert client.get('/api/suggestions/metrics').status_code == 404
+    app.config['METRICS_TOKEN'] = 's3cret'
+    assert client.get('/api/suggestions/metrics').status_code == 403
+    response = client.get('/api/suggestions/metrics', headers={'Authorization': 'Bearer s3cret'})
+    assert response.status_code == 200
+    assert 'upstream' in response.get_json()
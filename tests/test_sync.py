@@ -0,0 +1,54 @@
+"""
+Delta sync (app/sync.py): idle polls revalidate instead of re-running the query
+"""
+import pytest
+
+from tests.conftest import login
+
+
+@pytest.fixture
+def collection(app, client):
+    # no overlap, so rows written by the fixture are not sent again on every poll
+    app.config['DELTA_SYNC_OVERLAP_SECONDS'] = 0
+    login(client)
+    cid = client.post('/api/collections', json={'name': 'Reading list'}).get_json()['collection']['id']
+    for title in ('Dune', 'Emma'):
+        client.post(f'/api/collections/{cid}/resources', json={'title': title})
+    return cid
+
+
+def poll(client, cid, cursor, etag=None):
+    headers = {'If-None-Match': etag} if etag else {}
+    return client.get(f'/api/collections/{cid}/changes', query_string={'since': cursor}, headers=headers)
+
+
+def test_idle_polls_return_200_then_304(client, collection):
+    full = client.get(f'/api/collections/{collection}/changes').get_json()
+    assert full['reset'] and len(full['resources']) == 2
+
+    first = poll(client, collection, full['cursor'])
+    assert first.status_code == 200
+    body = first.get_json()
+    assert body['resources'] == [] and body['deleted'] == []
+    # nothing changed, so the cursor comes back as it went out and the next poll is the same URL
+    assert body['cursor'] == full['cursor']
+
+    second = poll(client, collection, body['cursor'], first.headers['ETag'])
+    assert second.status_code == 304
+
+
+def test_poll_after_a_change_sends_it_and_moves_the_cursor(client, collection):
+    cursor = client.get(f'/api/collections/{collection}/changes').get_json()['cursor']
+    idle = poll(client, collection, cursor)
+
+    rid = client.post(f'/api/collections/{collection}/resources', json={'title': 'Ulysses'}).get_json()['resource']['id']
+    changed = poll(client, collection, cursor, idle.headers['ETag'])
+    assert changed.status_code == 200
+    body = changed.get_json()
+    assert [r['id'] for r in body['resources']] == [rid]
+    assert body['cursor'] != cursor
+
+    assert client.delete(f'/api/resources/{rid}').status_code in (200, 204)
+    removed = poll(client, collection, body['cursor']).get_json()
+    assert removed['resources'] == [] and removed['deleted'] == [rid]
+    assert removed['cursor'] != body['cursor']
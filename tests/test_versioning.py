@@ -0,0 +1,44 @@
+"""
+ETag validators move with writes that bypass the ORM flush
+"""
+from datetime import timedelta
+
+from app import db
+from app.models import ResourceTombstone, utcnow
+from app.sync import prune_tombstones
+from tests.conftest import login
+
+
+def etags(client, cid):
+    return {url: client.get(url).headers['ETag']
+            for url in ('/api/collections', f'/api/collections/{cid}', f'/api/collections/{cid}/resources')}
+
+
+def assert_all_changed(client, before):
+    for url, etag in before.items():
+        assert client.get(url, headers={'If-None-Match': etag}).status_code == 200, url
+
+
+def test_import_changes_the_collection_validators(client):
+    login(client)
+    cid = client.post('/api/collections', json={'name': 'Shelf'}).get_json()['collection']['id']
+    before = etags(client, cid)
+    response = client.post(f'/api/collections/{cid}/resources/import?format=csv', data=b'title\nDune\n',
+                           content_type='text/csv')
+    assert response.get_json()['imported'] == 1
+    assert_all_changed(client, before)
+
+
+def test_pruning_tombstones_changes_the_collection_validators(app, client):
+    login(client)
+    cid = client.post('/api/collections', json={'name': 'Shelf'}).get_json()['collection']['id']
+    rid = client.post(f'/api/collections/{cid}/resources', json={'title': 'Dune'}).get_json()['resource']['id']
+    client.delete(f'/api/resources/{rid}')
+    with app.app_context():
+        db.session.query(ResourceTombstone).update({'deleted_at': utcnow() - timedelta(days=40)})
+        db.session.commit()
+    before = etags(client, cid)
+
+    with app.app_context():
+        assert prune_tombstones(30) == 1
+    assert_all_changed(client, before)